@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.contrib.auth.password_validation import validate_password
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from rest_framework.validators import UniqueValidator
+from .tokens import invite_token_generator
 
 User = get_user_model()
 
@@ -127,6 +131,30 @@ class ChangePasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError({"password": "Password fields didn't match."})
         return attrs
 
+class AcceptInviteSerializer(serializers.Serializer):
+    """Serializer for setting a first password with an invite token"""
+
+    uid = serializers.CharField(required=True)
+    token = serializers.CharField(required=True)
+    password = serializers.CharField(write_only=True, required=True)
+    password2 = serializers.CharField(write_only=True, required=True)
+
+    def validate(self, attrs):
+        try:
+            user = User.objects.get(pk=force_str(urlsafe_base64_decode(attrs['uid'])))
+        except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+            user = None
+        if user is None or not invite_token_generator.check_token(user, attrs['token']):
+            raise serializers.ValidationError({"token": "Invalid or expired invite link."})
+        if attrs['password'] != attrs['password2']:
+            raise serializers.ValidationError({"password": "Password fields didn't match."})
+        try:
+            validate_password(attrs['password'], user)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({"password": list(exc.messages)})
+        attrs['user'] = user
+        return attrs
+
 class UpdateUserSerializer(serializers.ModelSerializer):
     """Serializer for updating user profile"""
 
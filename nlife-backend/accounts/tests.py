@@ -1,3 +1,84 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from hospital.models import Patient
+from hospital.patient_import import import_patients
 
-# Create your tests here.
+User = get_user_model()
+
+ROWS = [
+    {'email': 'ada@example.com', 'first_name': 'Ada', 'last_name': 'Lovelace', 'blood_group': 'A+'},
+    {'email': 'grace@example.com', 'password': 'Compiler-1952', 'gender': 'female'},
+    {'email': 'not-an-email', 'first_name': 'Broken'},
+    {'email': 'ada@example.com', 'first_name': 'Duplicate'},
+    {'email': 'alan@example.com', 'blood_group': 'Q+', 'date_of_birth': '1912-06-23'},
+    {'email': 'short@example.com', 'password': '123'},
+]
+
+
+# The default hasher costs about half a second per password
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PatientImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.errors = {}
+        self.invites = {}
+
+    def run_import(self, rows=ROWS, **options):
+        return import_patients(
+            iter(rows), workers=0,
+            on_error=lambda number, email, messages: self.errors.setdefault(number, set(messages)),
+            on_invite=lambda email, uid, token: self.invites.setdefault(email, (uid, token)),
+            **options,
+        )
+
+    def test_valid_rows_are_imported_and_invalid_ones_reported(self):
+        stats = self.run_import()
+        self.assertEqual(stats, {'rows': 6, 'imported': 2, 'invalid': 4, 'hashed': 1, 'invited': 1})
+        self.assertEqual(self.errors, {3: {'email'}, 4: {'email'}, 5: {'blood_group'}, 6: {'password'}})
+        ada = User.objects.get(email='ada@example.com')
+        self.assertEqual((ada.user_type, ada.first_name, ada.has_usable_password()), ('patient', 'Ada', False))
+        self.assertEqual(Patient.objects.get(user=ada).blood_group, 'A+')
+        self.assertTrue(User.objects.get(email='grace@example.com').check_password('Compiler-1952'))
+        self.assertEqual(set(self.invites), {'ada@example.com'})
+
+    def test_dry_run_writes_nothing(self):
+        stats = self.run_import(dry_run=True)
+        self.assertEqual(stats['imported'], 2)
+        self.assertFalse(User.objects.exists())
+        self.assertEqual(self.invites, {})
+
+    def test_rerun_skips_existing_emails(self):
+        self.run_import()
+        self.errors = {}
+        stats = self.run_import(ROWS[:2])
+        self.assertEqual(stats['imported'], 0)
+        self.assertEqual(self.errors, {1: {'email'}, 2: {'email'}})
+
+    def test_invite_ignores_passwords(self):
+        stats = self.run_import(ROWS[:2], invite=True)
+        self.assertEqual((stats['hashed'], stats['invited']), (0, 2))
+        self.assertFalse(User.objects.get(email='grace@example.com').has_usable_password())
+
+    def accept(self, uid, token, password='Analytical-1843', password2=None):
+        return self.client.post('/api/auth/invite/accept/', {
+            'uid': uid, 'token': token, 'password': password, 'password2': password2 or password,
+        })
+
+    def test_invite_sets_the_first_password_once(self):
+        self.run_import(ROWS[:1])
+        uid, token = self.invites['ada@example.com']
+        self.assertEqual(self.accept(uid, token, password2='Analytical-1844').status_code, 400)
+        self.assertEqual(self.accept(uid, token, password='short').status_code, 400)
+        self.assertEqual(self.accept(uid, token).status_code, 200)
+        response = self.client.post('/api/auth/token/', {'email': 'ada@example.com', 'password': 'Analytical-1843'})
+        self.assertEqual(response.status_code, 200)
+        # Setting the password changes the hash the token is bound to
+        self.assertEqual(self.accept(uid, token, password='Another-Pass-1').status_code, 400)
+
+    def test_invalid_invite_links(self):
+        self.run_import(ROWS[:1])
+        uid, token = self.invites['ada@example.com']
+        self.assertEqual(self.accept(uid, token[:-1] + ('a' if token[-1] != 'a' else 'b')).status_code, 400)
+        self.assertEqual(self.accept('bm9wZQ', token).status_code, 400)
+        self.assertEqual(self.accept('%%%', token).status_code, 400)
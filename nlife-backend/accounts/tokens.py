@@ -0,0 +1,14 @@
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+
+
+class InviteTokenGenerator(PasswordResetTokenGenerator):
+    """
+    One-time tokens for users created without a password (bulk imports) to
+    choose their first one. A token stops working once the password is set,
+    or after PASSWORD_RESET_TIMEOUT seconds.
+    """
+
+    key_salt = 'accounts.tokens.InviteTokenGenerator'
+
+
+invite_token_generator = InviteTokenGenerator()
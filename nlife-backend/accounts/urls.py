@@ -2,7 +2,7 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     RegisterView, PatientRegisterView,
-    UserDetailView, UpdateUserView, ChangePasswordView, AdminUpdateUserView
+    UserDetailView, UpdateUserView, ChangePasswordView, AdminUpdateUserView, AcceptInviteView
 )
 from .views_doctor import DoctorRegisterAPIView
 from .views_admin import create_superuser_api
@@ -21,6 +21,7 @@ urlpatterns = [
     path('me/', UserDetailView.as_view(), name='user_detail'),
     path('me/update/', UpdateUserView.as_view(), name='update_user'),
     path('me/change-password/', ChangePasswordView.as_view(), name='change_password'),
+    path('invite/accept/', AcceptInviteView.as_view(), name='accept_invite'),
 
     # Admin endpoints
     path('users/<int:pk>/update/', AdminUpdateUserView.as_view(), name='admin_update_user'),
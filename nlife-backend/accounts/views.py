@@ -6,7 +6,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
 from .serializers import (
     UserSerializer, RegisterSerializer, DoctorRegisterSerializer,
-    PatientRegisterSerializer, ChangePasswordSerializer, UpdateUserSerializer
+    PatientRegisterSerializer, ChangePasswordSerializer, UpdateUserSerializer, AcceptInviteSerializer
 )
 from hospital.models import Doctor, Patient
 
@@ -335,6 +335,21 @@ class ChangePasswordView(generics.UpdateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AcceptInviteView(generics.GenericAPIView):
+    """View for imported users to set their first password from an invite link"""
+
+    serializer_class = AcceptInviteSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        user.set_password(serializer.validated_data['password'])
+        user.save(update_fields=['password'])
+        return Response({"message": "Password set successfully"}, status=status.HTTP_200_OK)
+
+
 class AdminUpdateUserView(generics.UpdateAPIView):
     """View for admin to update any user profile"""
 
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django import forms
 from django.utils.html import format_html
-from .models import Specialty, Doctor, Patient, Appointment, TimeSlot, MedicalRecord
+from .models import (
+    Specialty, Doctor, Patient, Appointment, ArchivedAppointment, TimeSlot, MedicalRecord, DailyAppointmentRollup,
+    AppointmentReminder, CareRelationship
+)
 
 class DoctorAdminForm(forms.ModelForm):
     """Custom form for Doctor admin to include profile picture field from User model"""
@@ -108,6 +111,15 @@ class AppointmentAdmin(admin.ModelAdmin):
     search_fields = ('doctor__user__first_name', 'doctor__user__last_name', 'patient__user__first_name', 'patient__user__last_name')
     date_hierarchy = 'appointment_date'
 
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'patient', 'appointment_date', 'appointment_time', 'status', 'payment_status', 'archived_at')
+    list_filter = ('status', 'payment_status')
+    search_fields = ('doctor__user__first_name', 'doctor__user__last_name', 'patient__user__first_name', 'patient__user__last_name')
+    date_hierarchy = 'appointment_date'
+    # Written by hospital.archive
+    readonly_fields = [field.name for field in ArchivedAppointment._meta.fields]
+
 
 
 @admin.register(TimeSlot)
@@ -121,3 +133,26 @@ class MedicalRecordAdmin(admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('patient__user__first_name', 'patient__user__last_name', 'doctor__user__first_name', 'doctor__user__last_name', 'diagnosis', 'prescription')
+
+@admin.register(DailyAppointmentRollup)
+class DailyAppointmentRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'doctor', 'status', 'payment_status', 'appointments', 'fee_total')
+    list_filter = ('status', 'payment_status')
+    date_hierarchy = 'day'
+    # Maintained by hospital.rollups; edit appointments instead
+    readonly_fields = ('day', 'doctor', 'status', 'payment_status', 'appointments', 'fee_total')
+
+@admin.register(AppointmentReminder)
+class AppointmentReminderAdmin(admin.ModelAdmin):
+    list_display = ('appointment', 'kind', 'recipient', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('recipient',)
+    raw_id_fields = ('appointment',)
+    # Written by hospital.reminders (manage.py send_appointment_reminders)
+    readonly_fields = ('appointment', 'kind', 'recipient', 'attempts', 'claimed_at', 'sent_at', 'created_at')
+
+@admin.register(CareRelationship)
+class CareRelationshipAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'patient', 'created_at')
+    search_fields = ('doctor__user__first_name', 'doctor__user__last_name', 'patient__user__first_name', 'patient__user__last_name')
+    raw_id_fields = ('doctor', 'patient')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HospitalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hospital'
+
+    def ready(self):
+        # Register signal handlers (directory cache invalidation)
+        from . import signals  # noqa: F401
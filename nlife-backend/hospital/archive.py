@@ -0,0 +1,111 @@
+"""
+Appointment archival.
+
+Finished appointments (completed or cancelled) whose date is older than
+``APPOINTMENT_ARCHIVE_AFTER_DAYS`` are moved to ArchivedAppointment, keeping
+their id, so the live table and its indexes only hold the rows the booking and
+dashboard paths actually touch. A medical record written for a moved
+appointment is re-pointed at the archived row in the same transaction; its
+reminders are deleted.
+
+Rows move in batches of ``batch_size``, each in its own short transaction:
+the batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` (so rows a
+request is changing are left for the next run), copied with one INSERT,
+linked records are updated with one UPDATE and the originals removed with one
+DELETE. Nothing holds a lock for longer than a single batch.
+
+The delete is issued directly rather than through the ORM so no post_delete
+signals fire: archived appointments keep counting in the daily rollups, and
+rebuild_rollups() reads both tables.
+
+Archived appointments are returned by the appointment list endpoints when
+``?archived=true`` is passed (see ``wants_archived``).
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Appointment, AppointmentReminder, ArchivedAppointment, MedicalRecord
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+DEFAULT_BATCH_SIZE = 1000
+
+_COPIED_FIELDS = ('id', 'doctor_id', 'patient_id', 'appointment_date', 'appointment_time', 'reason',
+                  'status', 'payment_status', 'created_at', 'updated_at')
+
+
+def archive_cutoff(older_than_days=None, today=None):
+    """Appointments dated before this day are old enough to archive"""
+    if older_than_days is None:
+        older_than_days = settings.APPOINTMENT_ARCHIVE_AFTER_DAYS
+    return (today or timezone.localdate()) - timedelta(days=older_than_days)
+
+
+def archivable_appointments(cutoff):
+    return Appointment.objects.filter(appointment_date__lt=cutoff, status__in=ARCHIVABLE_STATUSES)
+
+
+def _delete_appointments(ids):
+    table = connection.ops.quote_name(Appointment._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+
+
+def archive_batch(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Move up to ``batch_size`` archivable appointments; returns how many moved"""
+    with transaction.atomic():
+        rows = list(
+            archivable_appointments(cutoff).order_by('id')
+            .select_for_update(skip_locked=True)
+            .values(*_COPIED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [row['id'] for row in rows]
+        ArchivedAppointment.objects.bulk_create([ArchivedAppointment(**row) for row in rows])
+        MedicalRecord.objects.filter(appointment_id__in=ids).update(
+            archived_appointment_id=F('appointment_id'), appointment=None,
+        )
+        # Reminders only matter before the appointment; the raw delete below would trip their foreign key
+        AppointmentReminder.objects.filter(appointment_id__in=ids).delete()
+        _delete_appointments(ids)
+    return len(rows)
+
+
+def archive_appointments(older_than_days=None, batch_size=DEFAULT_BATCH_SIZE, max_batches=None, pause=0,
+                         today=None, progress=None):
+    """
+    Archive every appointment older than the cutoff in batches. ``pause``
+    seconds are slept between batches to leave room for other writers;
+    ``progress(moved_so_far)`` is called after each batch. Returns the total
+    number of appointments moved.
+    """
+    cutoff = archive_cutoff(older_than_days, today)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        if progress:
+            progress(moved)
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def wants_archived(request):
+    """Whether the request asked for archived appointments (``?archived=true``)"""
+    value = request.query_params.get('archived', '').lower()
+    if value in ('', 'false', '0'):
+        return False
+    if value in ('true', '1'):
+        return True
+    raise ValidationError({'archived': ['Expected true or false.']})
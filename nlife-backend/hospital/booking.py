@@ -0,0 +1,230 @@
+"""
+Contention-safe appointment writes.
+
+Double-booking is prevented by the ``unique_active_appointment_slot`` partial
+unique constraint, so correctness does not depend on a read-then-write check
+that concurrent requests could both pass. Each write runs in its own
+savepoint; when the database rejects it because the slot is already taken
+we raise SlotUnavailable, which DRF renders as a 409 Conflict.
+"""
+from collections import Counter, defaultdict
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .models import Appointment, Doctor, Patient
+from .care import link_care, qualifies, unlink_care
+from .events import publish_appointment_events
+from .rollups import apply_deltas, appointment_rollup_key, rollup_key
+
+
+class SlotUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This time slot is already booked. Please choose another time.'
+    default_code = 'slot_unavailable'
+
+
+def slot_taken(doctor_id, appointment_date, appointment_time, exclude_pk=None):
+    queryset = Appointment.objects.filter(
+        doctor_id=doctor_id,
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
+        status__in=Appointment.ACTIVE_STATUSES,
+    )
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return queryset.exists()
+
+
+def book_appointment(**fields):
+    """Create an appointment, raising SlotUnavailable if the slot is already held"""
+    try:
+        with transaction.atomic():
+            return Appointment.objects.create(**fields)
+    except IntegrityError:
+        doctor_id = fields.get('doctor_id') or fields['doctor'].pk
+        if slot_taken(doctor_id, fields['appointment_date'], fields['appointment_time']):
+            raise SlotUnavailable()
+        raise
+
+
+def save_appointment(appointment, update_fields=None):
+    """Save changes (e.g. reactivating a cancelled booking), mapping slot conflicts to SlotUnavailable"""
+    if update_fields is not None:
+        # auto_now only applies to listed fields; the change feed relies on updated_at
+        update_fields = {*update_fields, 'updated_at'}
+    try:
+        with transaction.atomic():
+            appointment.save(update_fields=update_fields)
+    except IntegrityError:
+        if slot_taken(appointment.doctor_id, appointment.appointment_date,
+                      appointment.appointment_time, exclude_pk=appointment.pk):
+            raise SlotUnavailable()
+        raise
+    return appointment
+
+
+# Bulk endpoints for front-desk processing. Each item gets a result entry
+# (``created``/``updated``, ``invalid``, ``not_found`` or ``conflict``) in request
+# order. The valid items are written in one transaction with bulk_create /
+# set-based UPDATEs.
+
+MAX_BULK_ITEMS = 1000
+
+
+def _conflict(index, **extra):
+    return {'index': index, 'status': 'conflict', 'detail': str(SlotUnavailable.default_detail), **extra}
+
+
+def bulk_book_appointments(items):
+    """
+    Book validated ``{'doctor', 'patient', 'appointment_date', 'appointment_time',
+    'reason'}`` items (doctor/patient as ids). Returns one result per item.
+    """
+    results = [None] * len(items)
+    doctors = set(Doctor.objects.filter(id__in={item['doctor'] for item in items}).values_list('id', flat=True))
+    patients = set(Patient.objects.filter(id__in={item['patient'] for item in items}).values_list('id', flat=True))
+    taken = set(Appointment.objects.filter(
+        doctor_id__in=doctors,
+        appointment_date__in={item['appointment_date'] for item in items},
+        status__in=Appointment.ACTIVE_STATUSES,
+    ).values_list('doctor_id', 'appointment_date', 'appointment_time'))
+
+    pending = []
+    for index, item in enumerate(items):
+        errors = {}
+        for field, known in (('doctor', doctors), ('patient', patients)):
+            if item[field] not in known:
+                errors[field] = [f'Invalid pk "{item[field]}" - object does not exist.']
+        if errors:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+            continue
+        slot = (item['doctor'], item['appointment_date'], item['appointment_time'])
+        if slot in taken:
+            results[index] = _conflict(index)
+            continue
+        taken.add(slot)
+        pending.append((index, Appointment(
+            doctor_id=item['doctor'], patient_id=item['patient'],
+            appointment_date=item['appointment_date'], appointment_time=item['appointment_time'],
+            reason=item.get('reason'),
+        )))
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Appointment.objects.bulk_create([appointment for _, appointment in pending])
+                # bulk_create skips post_save, so count the new rows here
+                apply_deltas(Counter(appointment_rollup_key(appointment) for _, appointment in pending))
+                link_care({(appointment.doctor_id, appointment.patient_id) for _, appointment in pending})
+                publish_appointment_events('created', [appointment for _, appointment in pending])
+        except IntegrityError:
+            # A concurrent booking claimed one of the slots after our check;
+            # retry row by row (through save(), so signals update the rollups)
+            # so only the colliding items fail
+            for _, appointment in pending:
+                appointment.pk = None
+            for index, appointment in pending:
+                try:
+                    with transaction.atomic():
+                        appointment.save()
+                except IntegrityError:
+                    results[index] = _conflict(index)
+        for index, appointment in pending:
+            if results[index] is None:
+                results[index] = {'index': index, 'status': 'created', 'id': appointment.pk}
+    return results
+
+
+def bulk_update_status(changes):
+    """
+    Apply validated ``{'id', 'status'?, 'payment_status'?}`` changes with one
+    UPDATE per distinct target. Returns one result per change.
+    """
+    results = [None] * len(changes)
+    current = {
+        pk: (doctor_id, day, at, current_status, payment_status, patient_id)
+        for pk, doctor_id, day, at, current_status, payment_status, patient_id in Appointment.objects.filter(
+            id__in={change['id'] for change in changes}
+        ).values_list('id', 'doctor_id', 'appointment_date', 'appointment_time', 'status', 'payment_status',
+                      'patient_id')
+    }
+
+    targets = {}
+    for index, change in enumerate(changes):
+        pk = change['id']
+        if pk not in current:
+            results[index] = {'index': index, 'id': pk, 'status': 'not_found'}
+        elif pk in targets:
+            results[index] = {'index': index, 'id': pk, 'status': 'invalid',
+                              'errors': {'id': ['Appointment is listed more than once.']}}
+        else:
+            targets[pk] = (index, tuple(sorted(
+                (field, change[field]) for field in ('status', 'payment_status') if field in change
+            )))
+
+    def new_status(pk):
+        return dict(targets[pk][1]).get('status', current[pk][3])
+
+    # Appointments moving back into an active status must not collide with a
+    # booking that stays active (including others activated in this batch)
+    reactivating = [
+        pk for pk in targets
+        if current[pk][3] not in Appointment.ACTIVE_STATUSES and new_status(pk) in Appointment.ACTIVE_STATUSES
+    ]
+    if reactivating:
+        occupied = {
+            (doctor_id, day, at)
+            for doctor_id, day, at, pk in Appointment.objects.filter(
+                doctor_id__in={current[pk][0] for pk in reactivating},
+                appointment_date__in={current[pk][1] for pk in reactivating},
+                status__in=Appointment.ACTIVE_STATUSES,
+            ).values_list('doctor_id', 'appointment_date', 'appointment_time', 'id')
+            if pk not in targets or new_status(pk) in Appointment.ACTIVE_STATUSES
+        }
+        for pk in reactivating:
+            slot = current[pk][:3]
+            if slot in occupied:
+                index, _ = targets.pop(pk)
+                results[index] = _conflict(index, id=pk)
+            else:
+                occupied.add(slot)
+
+    groups = defaultdict(list)
+    for pk, (_, fields) in targets.items():
+        groups[fields].append(pk)
+    # Free slots before claiming them so the unique constraint holds statement by statement
+    ordered = sorted(groups.items(), key=lambda group: dict(group[0]).get('status') in Appointment.ACTIVE_STATUSES)
+
+    now = timezone.now()
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                for fields, pks in ordered:
+                    Appointment.objects.filter(id__in=pks).update(updated_at=now, **dict(fields))
+        except IntegrityError:
+            for fields, pks in ordered:
+                for pk in pks:
+                    try:
+                        with transaction.atomic():
+                            Appointment.objects.filter(id=pk).update(updated_at=now, **dict(fields))
+                    except IntegrityError:
+                        index, _ = targets.pop(pk)
+                        results[index] = _conflict(index, id=pk)
+        # Set-based UPDATEs skip post_save, so move the rollup counts and push events here
+        deltas = Counter()
+        updated = []
+        for pk, (index, fields) in targets.items():
+            doctor_id, day, at, old_status, old_payment, patient_id = current[pk]
+            new = {'status': old_status, 'payment_status': old_payment, **dict(fields)}
+            deltas[rollup_key(day, doctor_id, old_status, old_payment)] -= 1
+            deltas[rollup_key(day, doctor_id, new['status'], new['payment_status'])] += 1
+            updated.append(Appointment(id=pk, doctor_id=doctor_id, patient_id=patient_id, appointment_date=day,
+                                       appointment_time=at, updated_at=now, **new))
+            results[index] = {'index': index, 'id': pk, 'status': 'updated'}
+        apply_deltas(deltas)
+        link_care({(appointment.doctor_id, appointment.patient_id) for appointment in updated if qualifies(appointment)})
+        unlink_care({(appointment.doctor_id, appointment.patient_id) for appointment in updated
+                     if not qualifies(appointment)})
+        publish_appointment_events('updated', updated)
+    return results
@@ -0,0 +1,132 @@
+"""
+Versioned response cache for the public doctor and specialty directories
+and the landing page payload.
+
+Every cached response key embeds a per-resource version number. Saving or
+deleting a Doctor, Specialty or doctor User bumps the version once the
+write commits (see hospital/signals.py), which orphans all previously cached entries at once
+instead of hunting down every search/filter permutation. Orphaned entries
+simply expire after DIRECTORY_CACHE_TIMEOUT.
+
+The version and the hit/miss counters live in the cache itself, so with a
+shared backend (REDIS_URL) invalidation and statistics cover all workers.
+"""
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+DIRECTORY_RESOURCES = ('doctors', 'specialties', 'home')
+
+_VERSION_KEY = 'directory:{resource}:version'
+_COUNTER_KEY = 'directory:{resource}:{counter}'
+
+
+def get_cache_timeout():
+    return getattr(settings, 'DIRECTORY_CACHE_TIMEOUT', 300)
+
+
+def get_version(resource):
+    """Current cache version for ``resource``, initialising it on first use"""
+    return cache.get_or_set(_VERSION_KEY.format(resource=resource), 1, None)
+
+
+def bump_version(*resources):
+    """Invalidate every cached response for the given resources"""
+    for resource in resources:
+        key = _VERSION_KEY.format(resource=resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Key missing (never used or evicted): any fresh value invalidates old entries
+            cache.set(key, 2, None)
+
+
+def bump_version_on_commit(*resources):
+    """
+    Bump once the surrounding transaction commits. Bumping earlier lets a
+    concurrent request re-cache the old rows under the new version until the
+    entry expires, and a rolled-back write would invalidate for nothing.
+    """
+    transaction.on_commit(lambda: bump_version(*resources))
+
+
+def _increment(resource, counter):
+    key = _COUNTER_KEY.format(resource=resource, counter=counter)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def response_cache_key(resource, action, request, pk=None):
+    """
+    Build the cache key for a directory response.
+
+    The key covers the viewset action, the object pk for detail routes and
+    every query parameter (search term included), plus the scheme/host since
+    file fields are rendered as absolute URLs.
+    """
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+    )
+    raw = f'{request.build_absolute_uri("/")}|{params!r}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'directory:{resource}:v{get_version(resource)}:{action}:{pk or "-"}:{digest}'
+
+
+def cache_directory_response(resource):
+    """
+    Decorator for viewset list/retrieve methods that caches successful
+    responses under a versioned key and marks them with an ``X-Cache`` header.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+            key = response_cache_key(resource, self.action, request, pk)
+
+            data = cache.get(key)
+            if data is not None:
+                _increment(resource, 'hits')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _increment(resource, 'misses')
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, get_cache_timeout())
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def get_cache_stats():
+    """Hit/miss counters and current version for every directory resource"""
+    stats = {}
+    for resource in DIRECTORY_RESOURCES:
+        hits = cache.get(_COUNTER_KEY.format(resource=resource, counter='hits'), 0)
+        misses = cache.get(_COUNTER_KEY.format(resource=resource, counter='misses'), 0)
+        total = hits + misses
+        stats[resource] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+            'version': get_version(resource),
+        }
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([
+        _COUNTER_KEY.format(resource=resource, counter=counter)
+        for resource in DIRECTORY_RESOURCES
+        for counter in ('hits', 'misses')
+    ])
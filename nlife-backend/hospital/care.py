@@ -0,0 +1,102 @@
+"""
+Doctor-patient care relationships.
+
+CareRelationship holds one row per (doctor, patient) pair with at least one
+qualifying source: an appointment (live or archived) that is not cancelled,
+or a medical record. "May this doctor see this patient's records" is then a
+single lookup on the unique (doctor, patient) index and a doctor's patient
+list is one join.
+
+Rows follow their sources (hospital/signals.py, and hospital/booking.py for
+the bulk paths that bypass signals): saving a qualifying source adds the
+pair, and cancelling, deleting or re-pointing the last one removes it, so
+booking and then cancelling an appointment leaves no lasting access.
+rebuild_care_relationships() resyncs the whole table after loads that bypass
+those paths (``manage.py rebuild_care_relationships``).
+
+Checks always read the table: a per-process cache would keep a revoked pair
+alive in every other worker until it expired.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from .models import Appointment, ArchivedAppointment, CareRelationship, MedicalRecord
+
+# Appointment statuses that give the doctor access to the patient's records
+QUALIFYING_STATUSES = ('pending', 'confirmed', 'completed')
+
+
+def qualifies(appointment):
+    return appointment.status in QUALIFYING_STATUSES
+
+
+def _sources():
+    """Querysets of the rows that establish a relationship"""
+    return (
+        Appointment.objects.filter(status__in=QUALIFYING_STATUSES),
+        ArchivedAppointment.objects.filter(status__in=QUALIFYING_STATUSES),
+        MedicalRecord.objects.all(),
+    )
+
+
+def _pairs_q(pairs):
+    condition = Q()
+    for doctor_id, patient_id in pairs:
+        condition |= Q(doctor_id=doctor_id, patient_id=patient_id)
+    return condition
+
+
+def _unsupported(relationships):
+    """The relationships in ``relationships`` that no source supports any more"""
+    for source in _sources():
+        relationships = relationships.exclude(Exists(
+            source.filter(doctor_id=OuterRef('doctor_id'), patient_id=OuterRef('patient_id'))
+        ))
+    return relationships
+
+
+def _insert(pairs, batch_size):
+    CareRelationship.objects.bulk_create(
+        [CareRelationship(doctor_id=doctor_id, patient_id=patient_id) for doctor_id, patient_id in pairs],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+
+
+def link_care(pairs, batch_size=1000):
+    """Record ``(doctor_id, patient_id)`` pairs whose source qualifies"""
+    pairs = {pair for pair in pairs if None not in pair}
+    if pairs:
+        _insert(pairs, batch_size)
+
+
+def unlink_care(pairs, batch_size=200):
+    """Remove the ``(doctor_id, patient_id)`` pairs left without a qualifying source"""
+    pairs = sorted({pair for pair in pairs if None not in pair})
+    # Batches keep the OR-ed pair conditions within SQLite's expression depth limit
+    for offset in range(0, len(pairs), batch_size):
+        _unsupported(CareRelationship.objects.filter(_pairs_q(pairs[offset:offset + batch_size]))).delete()
+
+
+def has_care_relationship(doctor_id, patient_id):
+    """Whether the doctor has a non-cancelled appointment with, or has written a record for, the patient"""
+    return CareRelationship.objects.filter(doctor_id=doctor_id, patient_id=patient_id).exists()
+
+
+def rebuild_care_relationships(batch_size=5000):
+    """
+    Resync the table with its sources: add missing pairs and remove those no
+    source supports. Returns ``(added, removed)``.
+    """
+    with transaction.atomic():
+        removed, _ = _unsupported(CareRelationship.objects.all()).delete()
+        before = CareRelationship.objects.count()
+        for source in _sources():
+            pairs = source.values_list('doctor_id', 'patient_id').distinct().order_by()
+            batch = []
+            for pair in pairs.iterator(chunk_size=batch_size):
+                batch.append(pair)
+                if len(batch) >= batch_size:
+                    _insert(batch, batch_size)
+                    batch = []
+            _insert(batch, batch_size)
+        added = CareRelationship.objects.count() - before
+    return added, removed
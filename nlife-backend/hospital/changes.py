@@ -0,0 +1,120 @@
+"""
+Appointment change feed (delta sync).
+
+Every appointment write bumps ``updated_at`` (``auto_now`` on save, set
+explicitly by the bulk status UPDATE), so walking the table in
+``(updated_at, id)`` order from a cursor yields exactly the rows created,
+updated or cancelled since that cursor. Clients keep the cursor from the
+previous response and poll with ``?since=<cursor>``; when nothing changed the
+response is an empty list and the same cursor, served by one index range scan.
+
+``updated_at`` is taken when the row is saved, not when its transaction
+commits, so a slow transaction can commit a timestamp older than rows other
+clients have already seen; a cursor that had moved past it would never return
+that row. The feed therefore stops at a horizon no uncommitted write can fall
+behind. On PostgreSQL that is the start of the oldest transaction that has
+written anything and is still open (``pg_stat_activity``): every row it
+stamps is newer than its start, however long it takes to commit. The app
+servers' and the database's clocks can disagree, so the horizon is pulled
+back a further SETTLE_SECONDS. This needs the database role to see the
+application's other sessions, which it does when they all connect as the same
+role (or the role has ``pg_read_all_stats``). SQLite runs one write
+transaction at a time and has no such view, so there the horizon is only
+SETTLE_SECONDS behind now; it is a development database.
+
+Deleted appointments are not reported (patients and doctors cancel rather
+than delete; deletion is an admin operation), nor are appointments moved to
+the archive.
+"""
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from .pagination import KeysetPagination
+
+SETTLE_SECONDS = 2
+
+
+def settled_horizon():
+    """Latest ``updated_at`` no uncommitted appointment write can be older than"""
+    horizon = timezone.now()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT MIN(xact_start) FROM pg_stat_activity '
+                'WHERE backend_xid IS NOT NULL AND datname = current_database() '
+                'AND pid <> pg_backend_pid()'
+            )
+            oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            horizon = min(horizon, oldest)
+    return horizon - timedelta(seconds=SETTLE_SECONDS)
+
+
+class AppointmentChangeFeed(KeysetPagination):
+    """
+    Keyset walk over ``(updated_at, id)``. ``?since=`` takes a cursor from a
+    previous response or an ISO 8601 timestamp; without it the feed starts at
+    the beginning (a full sync, one page at a time).
+    """
+
+    ordering = ('updated_at', 'id')
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'since'
+
+    @classmethod
+    def is_requested(cls, request):
+        return True
+
+    def decode_cursor(self, request, model=None):
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            try:
+                moment = parse_datetime(token)
+            except ValueError:
+                moment = None
+            if moment is not None:
+                if timezone.is_naive(moment):
+                    moment = timezone.make_aware(moment)
+                # (updated_at, id) > (moment, 0): everything changed at or after it
+                return [moment, 0]
+        try:
+            return super().decode_cursor(request, model)
+        except NotFound:
+            raise ValidationError({self.cursor_query_param: ['Expected a cursor or an ISO 8601 timestamp.']})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.since = self.decode_cursor(request, queryset.model)
+        horizon = settled_horizon()
+        page = list(super().paginate_queryset(queryset.filter(updated_at__lte=horizon), request, view))
+        self.has_more = len(page) > self.page_size_value
+        page = page[:self.page_size_value]
+        if page:
+            self.cursor = self.encode_cursor([page[-1].updated_at.isoformat(), page[-1].id])
+        elif self.since is not None:
+            self.cursor = request.query_params[self.cursor_query_param]
+        else:
+            # Nothing has ever changed in scope: start the next poll at the horizon
+            self.cursor = self.encode_cursor([horizon.isoformat(), 0])
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'cursor': self.cursor,
+            'has_more': self.has_more,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['cursor', 'has_more', 'results'],
+            'properties': {
+                'cursor': {'type': 'string'},
+                'has_more': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
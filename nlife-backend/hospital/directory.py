@@ -0,0 +1,134 @@
+"""
+Flat read model for the public doctor directory.
+
+The directory is read far more often than it is written, so instead of
+building a nested UserBasicSerializer and SpecialtySerializer per doctor we
+pull every column we need in one joined values_list() query and assemble the
+response dicts directly. The output matches DoctorListSerializer field for
+field so clients cannot tell the two paths apart.
+
+A sparse fieldset (see hospital/fieldsets.py) trims both the selected SQL
+columns and the rendered dicts.
+"""
+from rest_framework import serializers
+from django.contrib.auth import get_user_model
+from .models import Specialty
+
+User = get_user_model()
+
+# Column lists in DoctorListSerializer / UserBasicSerializer / SpecialtySerializer order
+DOCTOR_COLUMNS = [
+    'id', 'experience_years', 'consultation_fee', 'is_available', 'is_featured',
+    'bio', 'education', 'available_days', 'start_time', 'end_time',
+]
+USER_COLUMNS = [
+    'id', 'email', 'first_name', 'last_name', 'profile_picture',
+    'phone_number', 'gender', 'date_of_birth', 'blood_group',
+]
+SPECIALTY_COLUMNS = ['id', 'name', 'description', 'icon']
+
+# Top-level output order of DoctorListSerializer
+DIRECTORY_FIELDS = ['id', 'user', 'specialty'] + DOCTOR_COLUMNS[1:]
+
+# Schema for parse_fieldset(): nested objects list their allowed sub-fields
+DIRECTORY_SCHEMA = {name: None for name in DIRECTORY_FIELDS}
+DIRECTORY_SCHEMA['user'] = USER_COLUMNS
+DIRECTORY_SCHEMA['specialty'] = SPECIALTY_COLUMNS
+
+# Reuse DRF's own field formatting so decimals, dates and times render identically
+_fee_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+_time_field = serializers.TimeField()
+_date_field = serializers.DateField()
+
+_profile_picture_storage = User._meta.get_field('profile_picture').storage
+_icon_storage = Specialty._meta.get_field('icon').storage
+
+
+def _file_url(storage, name, request):
+    """Return the (absolute, when a request is available) URL for a stored file name"""
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _formatter(lookup, request):
+    """Value formatter for a column lookup, or None when the raw value is already JSON-ready"""
+    if lookup == 'consultation_fee':
+        field = _fee_field
+    elif lookup in ('start_time', 'end_time'):
+        field = _time_field
+    elif lookup == 'user__date_of_birth':
+        field = _date_field
+    elif lookup == 'user__profile_picture':
+        return lambda value: _file_url(_profile_picture_storage, value, request)
+    elif lookup == 'specialty__icon':
+        return lambda value: _file_url(_icon_storage, value, request)
+    else:
+        return None
+    return lambda value: field.to_representation(value) if value is not None else None
+
+
+def _build_plan(fieldset, request):
+    """
+    Work out the values_list() lookups and, per output field, how to read it
+    from a result row: ``(name, index, formatter)`` for plain columns and
+    ``(name, null_index, [(sub, index, formatter), ...])`` for nested objects.
+    """
+    lookups = []
+
+    def column(lookup):
+        lookups.append(lookup)
+        return len(lookups) - 1, _formatter(lookup, request)
+
+    plan = []
+    for name in DIRECTORY_FIELDS:
+        if fieldset is not None and name not in fieldset:
+            continue
+        if DIRECTORY_SCHEMA[name] is None:
+            plan.append((name, *column(name)))
+            continue
+
+        wanted = fieldset.get(name) if fieldset is not None else None
+        # Always select the related id so a missing specialty renders as null
+        null_index, _ = column(f'{name}__id')
+        subfields = []
+        for sub in DIRECTORY_SCHEMA[name]:
+            if wanted is not None and sub not in wanted:
+                continue
+            if sub == 'id':
+                subfields.append((sub, null_index, None))
+            else:
+                subfields.append((sub, *column(f'{name}__{sub}')))
+        plan.append((name, null_index, subfields))
+    return lookups, plan
+
+
+def doctor_directory(queryset, request=None, fieldset=None):
+    """
+    Build the directory payload for ``queryset`` using a single SQL query.
+
+    Filtering, ordering and slicing should already be applied to the
+    queryset; this only selects the columns and shapes the rows. Pass a
+    parsed ``fieldset`` to render (and select) only part of each doctor.
+    """
+    lookups, plan = _build_plan(fieldset, request)
+
+    results = []
+    for row in queryset.values_list(*lookups):
+        item = {}
+        for name, index, spec in plan:
+            if isinstance(spec, list):
+                if row[index] is None:
+                    item[name] = None
+                    continue
+                item[name] = {
+                    sub: formatter(row[sub_index]) if formatter else row[sub_index]
+                    for sub, sub_index, formatter in spec
+                }
+            else:
+                item[name] = spec(row[index]) if spec else row[index]
+        results.append(item)
+    return results
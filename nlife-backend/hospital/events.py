@@ -0,0 +1,282 @@
+"""
+Appointment push events.
+
+Appointment writes publish an event to the doctor's and the patient's user
+channels (``user:<id>``) and to the ``staff`` channel once their transaction
+commits. ``GET /api/appointments/events/`` streams a user's channels as
+Server-Sent Events (see views.appointment_events), so the UIs learn about
+bookings and status or payment changes without polling.
+
+Events travel through a broker chosen by ``APPOINTMENT_EVENTS_BROKER``:
+
+- InProcessBroker (default) fans out to streams served by the same process.
+  It needs nothing external and is enough for development and single-worker
+  deployments.
+- RedisBroker relays events over Redis pub/sub (``REDIS_URL``) so every
+  worker sees every event. It is the default when ``REDIS_URL`` is set.
+
+A broker provides ``publish(channel, message)`` (synchronous, callable from
+any thread) and ``async subscribe(channels)`` returning a subscription with
+``async get(timeout)`` (the next message or None on timeout) and
+``async close()``.
+
+EventSource cannot send headers, so browsers authenticate a stream with a
+ticket in the URL instead of their access token: ``POST
+/api/appointments/events/ticket/`` issues a random ticket that expires after
+STREAM_TICKET_SECONDS and is spent by the first stream that uses it, so a
+URL that ends up in a proxy or server log opens nothing. Tickets are kept in
+the default cache, which, like the broker, must be shared by every worker
+(Redis) when there are several.
+
+Each event carries the appointment's change-feed cursor (``cursor``, also
+sent as the SSE event id); after a disconnect, ``GET
+/api/appointments/changes/?since=<cursor>`` returns anything missed.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+from .changes import AppointmentChangeFeed
+from .models import Doctor, Patient
+
+logger = logging.getLogger(__name__)
+
+STAFF_CHANNEL = 'staff'
+
+# Messages a slow subscriber may have queued before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Sent instead of the events a subscriber missed because its queue was full
+RESYNC = {'type': 'resync'}
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class InProcessBroker:
+    """Deliver messages to subscribers in this process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.offer(message)
+
+    async def subscribe(self, channels):
+        subscription = InProcessSubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, message):
+        """Queue ``message`` from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The stream's event loop has shut down without closing it
+            self.broker._unsubscribe(self)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Drop the backlog: the client catches up from the change feed
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class RedisBroker:
+    """Relay messages through Redis pub/sub so every worker process receives them"""
+
+    prefix = 'nlife:events:'
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message, cls=JSONEncoder))
+
+    async def subscribe(self, channels):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*[self.prefix + channel for channel in channels])
+        return RedisSubscription(client, pubsub)
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return None
+            message = await self.pubsub.get_message(timeout=remaining)
+            if message is not None and message['type'] == 'message':
+                return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.APPOINTMENT_EVENTS_BROKER)()
+
+
+def appointment_event(kind, appointment):
+    """The message published for a created or updated ``Appointment``"""
+    return {
+        'type': kind,
+        'cursor': AppointmentChangeFeed().encode_cursor([appointment.updated_at.isoformat(), appointment.id]),
+        'appointment': {
+            'id': appointment.id,
+            'doctor': appointment.doctor_id,
+            'patient': appointment.patient_id,
+            'appointment_date': appointment.appointment_date,
+            'appointment_time': appointment.appointment_time,
+            'status': appointment.status,
+            'payment_status': appointment.payment_status,
+            'updated_at': appointment.updated_at,
+        },
+    }
+
+
+def publish_appointment_events(kind, appointments):
+    """
+    Publish ``kind`` ('created' or 'updated') events for ``appointments`` to
+    their doctors, patients and staff once the current transaction commits.
+    Two queries resolve the user ids whatever the number of appointments.
+    """
+    if not appointments:
+        return
+    doctor_users = dict(Doctor.objects.filter(
+        id__in={appointment.doctor_id for appointment in appointments}).values_list('id', 'user_id'))
+    patient_users = dict(Patient.objects.filter(
+        id__in={appointment.patient_id for appointment in appointments}).values_list('id', 'user_id'))
+    # Encode now: the instances may change again before the commit
+    messages = [
+        (json.loads(json.dumps(appointment_event(kind, appointment), cls=JSONEncoder)),
+         {doctor_users.get(appointment.doctor_id), patient_users.get(appointment.patient_id)} - {None})
+        for appointment in appointments
+    ]
+
+    def publish():
+        # The write has committed; a broker outage must not turn it into an error
+        try:
+            broker = get_broker()
+            for message, user_ids in messages:
+                broker.publish(STAFF_CHANNEL, message)
+                for user_id in user_ids:
+                    broker.publish(user_channel(user_id), message)
+        except Exception:
+            logger.exception('Could not publish appointment events')
+
+    transaction.on_commit(publish)
+
+
+# Seconds between SSE keep-alive comments (proxies drop idle connections)
+KEEPALIVE_SECONDS = 15
+# Streams end after this many seconds; the client reconnects with a new
+# ticket, which re-checks its access token
+STREAM_SECONDS = 15 * 60
+# Reconnect delay suggested to the client, in milliseconds
+RETRY_MILLISECONDS = 3000
+
+
+# Seconds a stream ticket stays valid before it is used
+STREAM_TICKET_SECONDS = 30
+
+_TICKET_KEY = 'events:ticket:{}'
+
+
+def issue_stream_ticket(user):
+    """A single-use ticket opening one event stream as ``user``"""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_TICKET_KEY.format(ticket), user.id, STREAM_TICKET_SECONDS)
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """The id of the user ``ticket`` was issued to, or None; each ticket redeems once"""
+    if len(ticket) > 64:
+        return None
+    key = _TICKET_KEY.format(ticket)
+    user_id = cache.get(key)
+    # delete() reports whether it removed the key, so only one of two
+    # concurrent redemptions wins
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def sse_frame(message):
+    """Render a broker message as one Server-Sent Events frame"""
+    if message['type'] == 'resync':
+        return 'event: resync\ndata: {}\n\n'
+    data = json.dumps(message, cls=JSONEncoder, separators=(',', ':'))
+    return f"id: {message['cursor']}\nevent: appointment\ndata: {data}\n\n"
+
+
+async def event_stream(channels):
+    """Yield SSE frames for ``channels`` until STREAM_SECONDS have passed"""
+    subscription = await get_broker().subscribe(channels)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_SECONDS
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            message = await subscription.get(min(KEEPALIVE_SECONDS, remaining))
+            yield ': keepalive\n\n' if message is None else sse_frame(message)
+    finally:
+        await subscription.close()
@@ -0,0 +1,78 @@
+"""
+Sparse fieldsets: ``?fields=id,consultation_fee,user.first_name,specialty.name``
+
+A fieldset maps each requested top-level field to either ``None`` (the whole
+field) or the set of requested sub-fields of a nested object. ``id`` is always
+included so clients and keyset pagination can identify rows.
+"""
+from rest_framework.exceptions import ValidationError
+
+FIELDS_QUERY_PARAM = 'fields'
+
+
+def parse_fieldset(request, schema):
+    """
+    Parse the ``fields`` query parameter against ``schema``.
+
+    ``schema`` maps top-level field names to ``None`` for plain fields or to
+    the allowed sub-field names for nested objects. Returns ``None`` when the
+    parameter is absent so callers fall back to the full representation.
+    """
+    raw = request.query_params.get(FIELDS_QUERY_PARAM)
+    if not raw:
+        return None
+
+    fieldset = {'id': None}
+    unknown = []
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, sub = item.partition('.')
+        if name not in schema or (sub and (schema[name] is None or sub not in schema[name])):
+            unknown.append(item)
+            continue
+        if not sub:
+            fieldset[name] = None
+        elif name not in fieldset:
+            fieldset[name] = {sub}
+        elif fieldset[name] is not None:
+            fieldset[name].add(sub)
+
+    if unknown:
+        raise ValidationError({FIELDS_QUERY_PARAM: [f'Unknown field(s): {", ".join(unknown)}']})
+    return fieldset
+
+
+def fieldset_lookups(fieldset, schema):
+    """ORM lookups (for only()/values()) needed to render ``fieldset``"""
+    lookups = []
+    for name, sub in fieldset.items():
+        if schema[name] is None:
+            lookups.append(name)
+        else:
+            for column in sorted(sub if sub is not None else schema[name]):
+                lookups.append(f'{name}__{column}')
+    return lookups
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that drops every field not named in the ``fieldset``
+    keyword argument, including sub-fields of nested serializers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fieldset = kwargs.pop('fieldset', None)
+        super().__init__(*args, **kwargs)
+
+        if fieldset is None:
+            return
+        for name in list(self.fields):
+            if name not in fieldset:
+                self.fields.pop(name)
+            elif fieldset[name] is not None:
+                nested = self.fields[name]
+                for sub in list(nested.fields):
+                    if sub not in fieldset[name]:
+                        nested.fields.pop(sub)
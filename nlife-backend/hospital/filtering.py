@@ -0,0 +1,229 @@
+"""
+Server-side doctor and appointment filters and doctor facet counts.
+
+DoctorFilter narrows the directory with query parameters:
+
+    ?specialty=1,4          specialty ids
+    ?min_fee=50&max_fee=200 consultation fee range (inclusive)
+    ?min_experience=5       experience years range (also max_experience)
+    ?is_available=true      availability / featured flags (also is_featured)
+    ?weekday=tuesday        doctors working on that weekday
+
+AppointmentFilter narrows appointment lists:
+
+    ?date_from=2025-01-01&date_to=2025-01-31  appointment date range (inclusive)
+    ?status=pending,confirmed                 one or more statuses
+    ?payment_status=unpaid                    one or more payment statuses
+
+doctors_available_at() answers "who can see a patient on date D at time T"
+entirely in SQL. doctor_facets() returns counts per specialty, fee bucket and weekday for a
+(filtered) queryset using one GROUP BY query.
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Q, Value, When
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from .models import Appointment, WEEKDAYS, masks_with_weekday
+
+# (label, inclusive lower bound, exclusive upper bound)
+FEE_BUCKETS = [
+    ('0-100', 0, 100),
+    ('100-200', 100, 200),
+    ('200-500', 200, 500),
+    ('500+', 500, None),
+]
+
+_TRUE_VALUES = {'true', '1', 'yes'}
+_FALSE_VALUES = {'false', '0', 'no'}
+
+
+def parse_weekday(value):
+    """Normalise a weekday name ('tue', 'Tuesday', ...) to its WEEKDAYS spelling"""
+    value = value.strip().lower()
+    for day in WEEKDAYS:
+        if len(value) >= 3 and day.lower().startswith(value):
+            return day
+    raise ValidationError({'weekday': [f'Unknown weekday: {value}']})
+
+
+def weekday_q(day):
+    """Q object matching doctors who work on ``day`` (an index lookup on the weekday mask)"""
+    return Q(available_weekdays__in=masks_with_weekday(day))
+
+
+def doctors_available_at(queryset, day, at_time=None):
+    """
+    Doctors in ``queryset`` who are available on ``day`` and, if ``at_time``
+    is given, whose working hours cover it and who have no active
+    appointment booked at that exact time.
+    """
+    queryset = queryset.filter(weekday_q(day.weekday()), is_available=True)
+    if at_time is None:
+        return queryset
+
+    booked = Appointment.objects.filter(
+        doctor_id=OuterRef('pk'),
+        appointment_date=day,
+        appointment_time=at_time,
+        status__in=Appointment.ACTIVE_STATUSES,
+    )
+    return queryset.filter(start_time__lte=at_time, end_time__gt=at_time).exclude(Exists(booked))
+
+
+class DoctorFilter(BaseFilterBackend):
+    """Filter backend for the doctor directory's structured filters"""
+
+    def _decimal(self, params, name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            number = None
+        # NaN and Infinity parse, but the database cannot compare against them
+        if number is None or not number.is_finite():
+            raise ValidationError({name: ['A valid number is required.']})
+        return number
+
+    def _integer(self, params, name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: ['A valid integer is required.']})
+
+    def _boolean(self, params, name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        if value.lower() in _TRUE_VALUES:
+            return True
+        if value.lower() in _FALSE_VALUES:
+            return False
+        raise ValidationError({name: ['Must be true or false.']})
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {}
+
+        specialty = params.get('specialty')
+        if specialty:
+            try:
+                filters['specialty_id__in'] = [int(pk) for pk in specialty.split(',') if pk.strip()]
+            except ValueError:
+                raise ValidationError({'specialty': ['Expected comma separated specialty ids.']})
+
+        for param, lookup, parse in (
+            ('min_fee', 'consultation_fee__gte', self._decimal),
+            ('max_fee', 'consultation_fee__lte', self._decimal),
+            ('min_experience', 'experience_years__gte', self._integer),
+            ('max_experience', 'experience_years__lte', self._integer),
+            ('is_available', 'is_available', self._boolean),
+            ('is_featured', 'is_featured', self._boolean),
+        ):
+            value = parse(params, param)
+            if value is not None:
+                filters[lookup] = value
+
+        if filters:
+            queryset = queryset.filter(**filters)
+
+        weekday = params.get('weekday')
+        if weekday:
+            queryset = queryset.filter(weekday_q(parse_weekday(weekday)))
+
+        return queryset
+
+
+class AppointmentFilter(BaseFilterBackend):
+    """Filter backend for appointment date ranges and statuses"""
+
+    def _date(self, params, name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({name: ['Date has wrong format. Use YYYY-MM-DD.']})
+
+    def _choices(self, params, name, choices):
+        value = params.get(name)
+        if not value:
+            return None
+        allowed = {choice for choice, _ in choices}
+        selected = [item.strip() for item in value.split(',') if item.strip()]
+        unknown = [item for item in selected if item not in allowed]
+        if unknown:
+            raise ValidationError({name: [f'Unknown value(s): {", ".join(unknown)}']})
+        return selected
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {}
+
+        for param, lookup in (('date_from', 'appointment_date__gte'), ('date_to', 'appointment_date__lte')):
+            value = self._date(params, param)
+            if value is not None:
+                filters[lookup] = value
+
+        for param, choices in (('status', Appointment.STATUS_CHOICES),
+                               ('payment_status', Appointment.PAYMENT_STATUS_CHOICES)):
+            value = self._choices(params, param, choices)
+            if value is not None:
+                filters[f'{param}__in'] = value
+
+        return queryset.filter(**filters) if filters else queryset
+
+
+def fee_bucket_expression():
+    whens = [
+        When(consultation_fee__lt=upper, then=Value(index))
+        for index, (_, _, upper) in enumerate(FEE_BUCKETS)
+        if upper is not None
+    ]
+    return Case(*whens, default=Value(len(FEE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def doctor_facets(queryset):
+    """
+    Counts per specialty, fee bucket and weekday for ``queryset``.
+
+    One query groups by (specialty, fee bucket) with a conditional count per
+    weekday; the small grouped result is then rolled up per facet.
+    """
+    weekday_counts = {day.lower(): Count('id', filter=weekday_q(day)) for day in WEEKDAYS}
+    rows = (
+        queryset.order_by()
+        .annotate(fee_bucket=fee_bucket_expression())
+        .values('specialty_id', 'specialty__name', 'fee_bucket')
+        .annotate(doctors=Count('id'), **weekday_counts)
+    )
+
+    total = 0
+    specialties = {}
+    fee_counts = [0] * len(FEE_BUCKETS)
+    day_counts = dict.fromkeys(WEEKDAYS, 0)
+    for row in rows:
+        total += row['doctors']
+        entry = specialties.setdefault(row['specialty_id'], {
+            'id': row['specialty_id'], 'name': row['specialty__name'], 'count': 0,
+        })
+        entry['count'] += row['doctors']
+        fee_counts[row['fee_bucket']] += row['doctors']
+        for day in WEEKDAYS:
+            day_counts[day] += row[day.lower()]
+
+    return {
+        'total': total,
+        'specialties': sorted(specialties.values(), key=lambda entry: (entry['name'] is None, entry['name'] or '')),
+        'fee_buckets': [
+            {'label': label, 'min': lower, 'max': upper, 'count': fee_counts[index]}
+            for index, (label, lower, upper) in enumerate(FEE_BUCKETS)
+        ],
+        'weekdays': [{'day': day, 'count': day_counts[day]} for day in WEEKDAYS],
+    }
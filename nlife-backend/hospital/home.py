@@ -0,0 +1,52 @@
+"""
+Landing page payload: featured doctors, specialties with doctor counts and
+headline numbers, built with three queries and served from the versioned
+``home`` cache (bumped whenever a Doctor, Specialty or doctor User changes).
+"""
+from django.db.models import Avg, Count, Q
+from rest_framework import serializers
+from .directory import doctor_directory
+from .models import Doctor, Specialty
+from .serializers import SpecialtySerializer
+
+HOME_FEATURED_LIMIT = 8
+
+
+class HomeSpecialtySerializer(SpecialtySerializer):
+    """Specialty plus the number of available doctors practising it"""
+
+    doctor_count = serializers.IntegerField(read_only=True)
+
+
+def featured_doctors(request=None, limit=HOME_FEATURED_LIMIT):
+    """Featured available doctors, most experienced first, in the directory shape"""
+    queryset = Doctor.objects.filter(is_featured=True, is_available=True).order_by('-experience_years', 'id')
+    return doctor_directory(queryset[:limit], request)
+
+
+def specialties_with_counts(request=None):
+    specialties = Specialty.objects.annotate(
+        doctor_count=Count('doctors', filter=Q(doctors__is_available=True))
+    ).order_by('name')
+    return HomeSpecialtySerializer(specialties, many=True, context={'request': request}).data
+
+
+def headline_stats():
+    return Doctor.objects.aggregate(
+        doctors=Count('id', filter=Q(is_available=True)),
+        featured_doctors=Count('id', filter=Q(is_available=True, is_featured=True)),
+        average_experience_years=Avg('experience_years', filter=Q(is_available=True)),
+    )
+
+
+def build_home_payload(request=None):
+    specialties = specialties_with_counts(request)
+    stats = headline_stats()
+    stats['specialties'] = len(specialties)
+    if stats['average_experience_years'] is not None:
+        stats['average_experience_years'] = round(stats['average_experience_years'], 1)
+    return {
+        'featured_doctors': featured_doctors(request),
+        'specialties': specialties,
+        'stats': stats,
+    }
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from hospital.archive import DEFAULT_BATCH_SIZE, archive_appointments, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = ('Move finished appointments older than APPOINTMENT_ARCHIVE_AFTER_DAYS (or --older-than-days) '
+            'to the archive table in short batched transactions. Safe to run while the site is live.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, help='Override APPOINTMENT_ARCHIVE_AFTER_DAYS')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Appointments moved per transaction')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches (default: until done)')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['older_than_days'] is not None and options['older_than_days'] < 0:
+            raise CommandError('--older-than-days cannot be negative')
+
+        cutoff = archive_cutoff(options['older_than_days'])
+        self.stdout.write(f'Archiving completed/cancelled appointments dated before {cutoff}')
+        moved = archive_appointments(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+            progress=lambda total: self.stdout.write(f'  {total} moved') if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} appointments'))
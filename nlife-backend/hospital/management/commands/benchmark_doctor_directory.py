@@ -0,0 +1,60 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from hospital.cache import bump_version
+from hospital.models import Doctor
+from hospital.serializers import DoctorListSerializer
+from hospital.synthetic import seed_doctors
+from hospital.views import DoctorViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query count and latency of the doctor directory (GET /api/doctors/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000,50000',
+                            help='Comma separated doctor counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per size')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also time the nested DoctorListSerializer path (slow on large sizes)')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        view = DoctorViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+
+        self.stdout.write(f'{"doctors":>8} {"queries":>8} {"median ms":>10} {"ms/1k":>8}'
+                          + (f' {"serializer q":>13} {"serializer ms":>14}' if options['compare'] else ''))
+
+        for size in sizes:
+            with transaction.atomic():
+                seed_doctors(size, prefix=f'bench{size}')
+
+                timings = []
+                for _ in range(options['repeat']):
+                    # Measure the database read path, not the response cache
+                    bump_version('doctors')
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        response = view(factory.get('/api/doctors/', HTTP_HOST='localhost'))
+                        response.render()
+                        timings.append((time.perf_counter() - started) * 1000)
+                    assert len(response.data) == size, (len(response.data), size)
+
+                median = statistics.median(timings)
+                line = f'{size:>8} {len(ctx.captured_queries):>8} {median:>10.1f} {median / size * 1000:>8.2f}'
+
+                if options['compare']:
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        DoctorListSerializer(Doctor.objects.all(), many=True).data
+                        elapsed = (time.perf_counter() - started) * 1000
+                    line += f' {len(ctx.captured_queries):>13} {elapsed:>14.1f}'
+
+                self.stdout.write(line)
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (synthetic data rolled back)'))
@@ -0,0 +1,61 @@
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from hospital.models import Specialty, Doctor
+from hospital.search import DoctorSearchFilter, refresh_doctor_search_vectors, search_vector_supported
+from hospital.synthetic import analyze, seed_doctors
+from hospital.views import DoctorViewSet
+
+User = get_user_model()
+
+DEFAULT_TERMS = 'smith,cardio,john williams,surgery,harvard,pediatrician nair,zzz'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the full-text doctor search against the icontains SearchFilter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=200000, help='Synthetic doctors to seed')
+        parser.add_argument('--terms', default=DEFAULT_TERMS, help='Comma separated search strings')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per term and backend')
+
+    def time_search(self, backend, term, repeat):
+        request = Request(APIRequestFactory().get('/api/doctors/', {'search': term}))
+        view = DoctorViewSet()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend.filter_queryset(request, Doctor.objects.all(), view)
+            matches = len(list(queryset.values_list('id', flat=True)))
+            timings.append((time.perf_counter() - started) * 1000)
+        return matches, statistics.median(timings)
+
+    def handle(self, *args, **options):
+        if not search_vector_supported():
+            self.stdout.write(self.style.WARNING('Full-text search is PostgreSQL only; nothing to compare'))
+            return
+
+        icontains = filters.SearchFilter()
+        fulltext = DoctorSearchFilter()
+
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {options["doctors"]} doctors...')
+            seed_doctors(options['doctors'], prefix='searchbench')
+            refresh_doctor_search_vectors()
+            analyze(User, Specialty, Doctor)
+
+            self.stdout.write(f'{"term":<22} {"icontains n":>11} {"ms":>9} {"fulltext n":>11} {"ms":>9} {"speedup":>8}')
+            for term in options['terms'].split(','):
+                old_matches, old_ms = self.time_search(icontains, term, options['repeat'])
+                new_matches, new_ms = self.time_search(fulltext, term, options['repeat'])
+                self.stdout.write(f'{term:<22} {old_matches:>11} {old_ms:>9.1f} {new_matches:>11} {new_ms:>9.1f} '
+                                  f'{old_ms / new_ms if new_ms else 0:>7.1f}x')
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (synthetic data rolled back)'))
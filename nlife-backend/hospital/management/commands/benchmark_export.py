@@ -0,0 +1,54 @@
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from hospital.export import table_extract
+from hospital.models import Appointment, Doctor, MedicalRecord, Patient
+from hospital.synthetic import analyze, seed_appointments, seed_doctors, seed_medical_records, seed_patients
+
+TARGET_ROWS_PER_SECOND = 100000
+
+
+class Command(BaseCommand):
+    help = 'Time table extracts of synthetic appointments and medical records to a local file in every format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Rows to seed per table')
+
+    def handle(self, *args, **options):
+        count = options['rows']
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {count} appointments and {count} medical records...')
+            doctors = seed_doctors(max(1, count // 2000), prefix='exportbench')
+            patients = seed_patients(max(1, count // 20), prefix='exportbench')
+            seed_appointments(count, doctors, patients)
+            seed_medical_records(count, doctors, patients)
+            analyze(Doctor, Patient, Appointment, MedicalRecord)
+            totals = {'appointments': Appointment.objects.count(), 'medical-records': MedicalRecord.objects.count()}
+
+            self.stdout.write(f'{"table":<16} {"format":<12} {"rows":>9} {"MiB":>8} {"s":>7} {"rows/s":>10}')
+            slow = []
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'extract')
+                for table, rows in totals.items():
+                    for fmt in ('csv', 'ndjson'):
+                        for compress in (False, True):
+                            started = time.perf_counter()
+                            with open(path, 'wb') as handle:
+                                for chunk in table_extract(table, fmt=fmt, compress=compress):
+                                    handle.write(chunk)
+                            elapsed = time.perf_counter() - started
+                            rate = rows / max(elapsed, 1e-9)
+                            label = fmt + ('.gz' if compress else '')
+                            self.stdout.write(f'{table:<16} {label:<12} {rows:>9} '
+                                              f'{os.path.getsize(path) / 2**20:>8.1f} {elapsed:>7.2f} {rate:>10,.0f}')
+                            if rate < TARGET_ROWS_PER_SECOND:
+                                slow.append(f'{table} {label}')
+
+            transaction.set_rollback(True)
+
+        if slow:
+            self.stdout.write(self.style.WARNING(
+                f'Below {TARGET_ROWS_PER_SECOND:,} rows/s: {", ".join(slow)}'))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (synthetic data rolled back)'))
@@ -0,0 +1,67 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from hospital.models import Appointment
+from hospital.synthetic import analyze, seed_appointments, seed_doctors, seed_patients
+from hospital.views import AppointmentViewSet
+
+
+class Command(BaseCommand):
+    help = ('Query-count regression check for GET /api/appointments/my_appointments/: the number of '
+            'queries per page must not grow with the number of appointments a user has')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,1000,100000',
+                            help='Comma separated appointment counts (all owned by one patient)')
+        parser.add_argument('--doctors', type=int, default=50, help='Doctors the appointments are spread over')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per size and role')
+
+    def measure(self, view, factory, user, path):
+        timings = []
+        for _ in range(self._repeat):
+            request = factory.get(path, HTTP_HOST='localhost')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}: {response.data}')
+        return len(ctx.captured_queries), statistics.median(timings), response.data
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self._repeat = options['repeat']
+        view = AppointmentViewSet.as_view({'get': 'my_appointments'})
+        factory = APIRequestFactory()
+        baseline = {}
+
+        self.stdout.write(f'{"appointments":>12} {"role":>8} {"queries":>8} {"page 1 ms":>10} {"page 2 ms":>10}')
+        for size in sizes:
+            with transaction.atomic():
+                doctors = seed_doctors(options['doctors'], prefix=f'mine{size}')
+                patient, = seed_patients(1, prefix=f'mine{size}')
+                seed_appointments(size, doctors, [patient])
+                analyze(Appointment)
+
+                for role, user in (('patient', patient.user), ('doctor', doctors[0].user)):
+                    path = '/api/appointments/my_appointments/?status=pending,confirmed,completed,cancelled'
+                    queries, first_ms, data = self.measure(view, factory, user, path)
+                    second_ms = None
+                    if data['next']:
+                        next_queries, second_ms, _ = self.measure(view, factory, user, data['next'])
+                        if next_queries != queries:
+                            raise CommandError(f'{role}: page 2 ran {next_queries} queries, page 1 ran {queries}')
+                    if baseline.setdefault(role, queries) != queries:
+                        raise CommandError(f'{role}: {queries} queries at {size} appointments, '
+                                           f'{baseline[role]} at {sizes[0]}')
+                    second = f'{second_ms:>10.1f}' if second_ms is not None else f'{"-":>10}'
+                    self.stdout.write(f'{size:>12} {role:>8} {queries:>8} {first_ms:>10.1f} {second}')
+
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Query count is constant across sizes (synthetic data rolled back)'))
@@ -0,0 +1,76 @@
+import csv
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from hospital.patient_import import DEFAULT_BATCH_SIZE, import_patients, read_rows
+from hospital.synthetic import FIRST_NAMES, LAST_NAMES
+
+TARGET_SECONDS = 10 * 60
+
+
+def write_csv(path, count, passwords=0, seed=0):
+    """Write ``count`` patient rows, the first ``passwords`` of them with a password"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(('email', 'password', 'first_name', 'last_name', 'phone_number', 'gender',
+                         'date_of_birth', 'blood_group', 'allergies'))
+        for i in range(count):
+            writer.writerow((
+                f'import.patient{i}@example.com', f'Clinic-{rng.getrandbits(48):x}' if i < passwords else '',
+                rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f'+1555{i:07d}',
+                rng.choice(['male', 'female', 'other']),
+                f'{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                rng.choice(['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']), rng.choice(['', 'None', 'Penicillin']),
+            ))
+
+
+class Command(BaseCommand):
+    help = ('Time importing synthetic patients without passwords (invites) and with passwords hashed on a '
+            'process pool; flags a projected 100k-patient import slower than 10 minutes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=100000, help='Patients to import by invite')
+        parser.add_argument('--passwords', type=int, default=200, help='Patients to import with a password')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, help='Hashing processes (default: one per CPU)')
+
+    def run(self, label, path, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            stats = import_patients(read_rows(path), **options)
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        rate = stats['imported'] / max(elapsed, 1e-9)
+        self.stdout.write(f"{label:<22} {stats['imported']:>8} {elapsed:>9.1f}s {rate:>10,.0f}/s "
+                          f"{100000 / max(rate, 1e-9) / 60:>10.1f} min")
+        return rate
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or os.cpu_count() or 1
+        with tempfile.TemporaryDirectory() as directory:
+            invited = os.path.join(directory, 'invited.csv')
+            hashed = os.path.join(directory, 'hashed.csv')
+            write_csv(invited, options['patients'])
+            write_csv(hashed, options['passwords'], passwords=options['passwords'])
+
+            self.stdout.write(f"{'run':<22} {'patients':>8} {'time':>10} {'rate':>12} {'100k takes':>14}")
+            slow = []
+            runs = [
+                ('invites', invited, {}),
+                ('passwords, 1 process', hashed, {'workers': 0}),
+                (f'passwords, pool of {workers}', hashed, {'workers': workers}),
+            ]
+            for label, path, extra in runs:
+                rate = self.run(label, path, batch_size=options['batch_size'], **extra)
+                if 100000 / max(rate, 1e-9) > TARGET_SECONDS:
+                    slow.append(label)
+        if slow:
+            self.stdout.write(self.style.WARNING(
+                f"Projected above {TARGET_SECONDS // 60} minutes for 100k patients: {', '.join(slow)} "
+                f"(password hashing is CPU-bound; add cores or use invites)"
+            ))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (imported patients rolled back)'))
@@ -0,0 +1,81 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from hospital.models import Doctor, MedicalRecord, Patient
+from hospital.search import search_medical_records, search_vector_supported
+from hospital.synthetic import analyze, seed_doctors, seed_medical_records, seed_patients
+
+DEFAULT_TERMS = 'hypertension,metformin,follow up,amoxicillin 7 days,asthma salbutamol,cardiologist,zzz'
+PAGE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the full-text medical record search against icontains on a synthetic corpus '
+            'and report the size of the search index')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=1000000, help='Synthetic medical records to seed')
+        parser.add_argument('--terms', default=DEFAULT_TERMS, help='Comma separated search strings')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per term and backend')
+
+    def time_page(self, queryset, repeat):
+        """Median ms to count the matches and fetch the first page, as the search endpoint does"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            matches = queryset.count()
+            list(queryset[:PAGE_SIZE])
+            timings.append((time.perf_counter() - started) * 1000)
+        return matches, statistics.median(timings)
+
+    def icontains(self, term):
+        queryset = MedicalRecord.objects.all()
+        for word in term.split():
+            queryset = queryset.filter(
+                Q(diagnosis__icontains=word) | Q(prescription__icontains=word) | Q(notes__icontains=word)
+            )
+        return queryset.order_by('-created_at', '-id')
+
+    def relation_size(self, cursor, name):
+        cursor.execute('SELECT pg_relation_size(%s::regclass)', [name])
+        return cursor.fetchone()[0]
+
+    def handle(self, *args, **options):
+        if not search_vector_supported():
+            self.stdout.write(self.style.WARNING('Full-text search is PostgreSQL only; nothing to compare'))
+            return
+
+        count = options['records']
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {count} medical records...')
+            doctors = seed_doctors(max(1, count // 1000), prefix='recordsearch')
+            patients = seed_patients(max(1, count // 20), prefix='recordsearch')
+            started = time.perf_counter()
+            seed_medical_records(count, doctors, patients)
+            self.stdout.write(f'Seeded and indexed in {time.perf_counter() - started:.1f}s')
+            analyze(Doctor, Patient, MedicalRecord)
+
+            with connection.cursor() as cursor:
+                # Merge the GIN pending list so the size reflects the steady state
+                cursor.execute("SELECT gin_clean_pending_list('hospital_medicalrecord_search_vector_gin'::regclass)")
+                table = self.relation_size(cursor, 'hospital_medicalrecord')
+                index = self.relation_size(cursor, 'hospital_medicalrecord_search_vector_gin')
+            total = MedicalRecord.objects.count()
+            self.stdout.write(
+                f'{total} records: table {table / 2**20:.1f} MiB, search index {index / 2**20:.1f} MiB '
+                f'({index / max(total, 1):.0f} bytes per record)'
+            )
+
+            self.stdout.write(f'{"term":<22} {"icontains n":>11} {"ms":>9} {"fulltext n":>11} {"ms":>9} {"speedup":>8}')
+            for term in options['terms'].split(','):
+                old_matches, old_ms = self.time_page(self.icontains(term), options['repeat'])
+                new_matches, new_ms = self.time_page(
+                    search_medical_records(MedicalRecord.objects.all(), term), options['repeat'])
+                self.stdout.write(f'{term:<22} {old_matches:>11} {old_ms:>9.1f} {new_matches:>11} {new_ms:>9.1f} '
+                                  f'{old_ms / new_ms if new_ms else 0:>7.1f}x')
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (synthetic data rolled back)'))
@@ -0,0 +1,77 @@
+import math
+import threading
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from hospital.models import Appointment, AppointmentReminder, Doctor, Patient
+from hospital.reminders import BaseSink, get_sink, run_reminders
+from hospital.synthetic import analyze, seed_appointments, seed_doctors, seed_patients
+
+SLOTS_PER_DAY = 16
+
+
+class CountingSink(BaseSink):
+    """Accepts every message and counts them"""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self.lock:
+            self.count += len(messages)
+        return {}
+
+
+class Command(BaseCommand):
+    help = ('Time a reminder run over synthetic appointments and check that it issues no per-reminder '
+            'queries and that a rerun sends nothing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reminders', type=int, default=100000, help='Due appointments to seed')
+        parser.add_argument('--days', type=int, default=7, help='Days the appointments are spread over')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--sink', help='Sink class to deliver through (default: count in memory)')
+
+    def handle(self, *args, **options):
+        count, days = options['reminders'], options['days']
+        sink = get_sink(options['sink']) if options['sink'] else CountingSink()
+        start = timezone.localdate() + timedelta(days=1)
+
+        with transaction.atomic():
+            doctors = seed_doctors(math.ceil(count / (SLOTS_PER_DAY * days)), prefix='remind')
+            patients = seed_patients(max(1, count // 10), prefix='remind')
+            seeded = seed_appointments(count, doctors, patients, start=start)
+            # Make every seeded appointment due (slots are unique per doctor, so this cannot double-book)
+            Appointment.objects.filter(doctor__in=doctors).update(status='confirmed')
+            analyze(Appointment, Doctor, Patient, get_user_model())
+            window = timedelta(days=days + 2)
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                stats = run_reminders(window, batch_size=options['batch_size'], workers=options['workers'],
+                                      sink=sink)
+                elapsed = time.perf_counter() - started
+            queries = len(ctx.captured_queries)
+            self.stdout.write(
+                f"{len(seeded)} appointments: {stats['sent']} sent, {stats['failed']} failed in {elapsed:.2f}s "
+                f"({stats['sent'] / max(elapsed, 1e-9):,.0f}/s), {queries} queries"
+            )
+            analyze(AppointmentReminder)
+            rerun = run_reminders(window, batch_size=options['batch_size'], workers=options['workers'], sink=sink)
+            self.stdout.write(f"rerun: {rerun['sent']} sent")
+
+            transaction.set_rollback(True)
+
+        # A query per reminder would take at least ``count`` queries on its own
+        if queries >= count:
+            raise CommandError(f'{queries} queries for {count} reminders: reminders are being handled row by row')
+        if rerun['sent']:
+            raise CommandError(f"A rerun sent {rerun['sent']} reminders again")
+        if stats['sent'] + stats['failed'] != count:
+            raise CommandError(f"Expected {count} reminders, dispatched {stats['sent'] + stats['failed']}")
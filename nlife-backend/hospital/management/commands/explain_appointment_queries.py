@@ -0,0 +1,102 @@
+import re
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from hospital.models import Appointment
+from hospital.archive import ARCHIVABLE_STATUSES
+from hospital.reminders import window_filter
+from hospital.synthetic import analyze, seed_appointments, seed_doctors, seed_patients
+
+ACTIVE = Appointment.ACTIVE_STATUSES
+
+# Full table scans in EXPLAIN output: PostgreSQL "Seq Scan on t", SQLite "SCAN t" (without an index)
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+def hot_queries(doctor_id, patient_id, day):
+    """The appointment queries the API and admin run most, with representative arguments"""
+    objects = Appointment.objects
+    week = (day, day + timedelta(days=6))
+    now = timezone.now()
+    return [
+        ('slot conflict check', objects.filter(
+            doctor_id=doctor_id, appointment_date=day, appointment_time='09:00', status__in=ACTIVE)),
+        ('open slots: booked starts', objects.filter(
+            doctor_id__in=[doctor_id], appointment_date__range=week).exclude(status='cancelled')
+            .values_list('doctor_id', 'appointment_date', 'appointment_time')),
+        ('my_appointments (patient)', objects.filter(patient_id=patient_id).order_by('-created_at', '-id')[:51]),
+        ('my_appointments (doctor)', objects.filter(doctor_id=doctor_id).order_by('-created_at', '-id')[:51]),
+        ('my_appointments (admin)', objects.order_by('-created_at', '-id')[:51]),
+        ('patient timeline', objects.filter(patient_id=patient_id)
+            .order_by('-appointment_date', '-appointment_time', '-id')[:51]),
+        ('changes feed (doctor)', objects.filter(
+            doctor_id=doctor_id, updated_at__gt=now - timedelta(minutes=5)).order_by('updated_at', 'id')[:101]),
+        ('changes feed (patient)', objects.filter(
+            patient_id=patient_id, updated_at__gt=now - timedelta(minutes=5)).order_by('updated_at', 'id')[:101]),
+        ('changes feed (admin)', objects.filter(
+            updated_at__gt=now - timedelta(minutes=5)).order_by('updated_at', 'id')[:101]),
+        ('status filter', objects.filter(status='pending', appointment_date__range=week)),
+        ('archive candidates', objects.filter(
+            appointment_date__lt=day - timedelta(days=365), status__in=ARCHIVABLE_STATUSES)),
+        ('admin date hierarchy', objects.filter(appointment_date__range=week)
+            .annotate(month=TruncMonth('appointment_date')).values('month').distinct()),
+        ('rollup rebuild window', objects.filter(appointment_date__range=week)
+            .values('appointment_date', 'doctor_id', 'status', 'payment_status')),
+        ('reminders due', objects.filter(window_filter(now, now + timedelta(hours=24)), status__in=ACTIVE)),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the hot appointment queries and report sequential scans. Run it against a '
+            'production-sized copy (or --seed) since planners seq-scan tiny tables on purpose.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed this many synthetic appointments first (rolled back afterwards)')
+        parser.add_argument('--analyze', action='store_true', help='Use EXPLAIN ANALYZE (PostgreSQL)')
+        parser.add_argument('--no-seqscan', action='store_true',
+                            help='Disable seq scans for the session to check every query has a usable index '
+                                 '(PostgreSQL)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plans')
+        parser.add_argument('--strict', action='store_true', help='Exit with an error if any query seq-scans')
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Unsupported database vendor: {connection.vendor}')
+
+        with transaction.atomic():
+            if options['seed']:
+                doctors = seed_doctors(max(1, options['seed'] // 2000), prefix='explain')
+                patients = seed_patients(max(1, options['seed'] // 20), prefix='explain')
+                seed_appointments(options['seed'], doctors, patients)
+                analyze(Appointment)
+            if options['no_seqscan'] and connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            sample = Appointment.objects.order_by('-id').values_list('doctor_id', 'patient_id').first() or (0, 0)
+            explain_options = {'analyze': True} if options['analyze'] and connection.vendor == 'postgresql' else {}
+
+            offenders = []
+            for name, queryset in hot_queries(*sample, timezone.localdate()):
+                plan = queryset.explain(**explain_options)
+                scans = sorted(set(pattern.findall(plan)))
+                if scans:
+                    offenders.append(name)
+                    self.stdout.write(self.style.WARNING(f'SEQ SCAN  {name}: {", ".join(scans)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'index     {name}'))
+                if options['verbose_plans'] or scans:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+            transaction.set_rollback(True)
+
+        if offenders and options['strict']:
+            raise CommandError(f'{len(offenders)} queries use a sequential scan: {", ".join(offenders)}')
+        self.stdout.write(f'{len(offenders)} of {len(hot_queries(0, 0, timezone.localdate()))} queries seq-scan')
@@ -0,0 +1,55 @@
+import sys
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from hospital.export import EXTRACT_CHUNK_SIZE, EXTRACT_FORMATS, EXTRACT_TABLES, table_extract
+
+
+class Command(BaseCommand):
+    help = 'Stream appointments, archived appointments or medical records to a CSV or NDJSON file (optionally gzipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXTRACT_TABLES))
+        parser.add_argument('--output', '-o', default='-', help='File to write (default: stdout)')
+        parser.add_argument('--format', dest='fmt', choices=sorted(EXTRACT_FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Gzip-compress the output')
+        parser.add_argument('--start', help='First date to include (YYYY-MM-DD): appointment date, or record creation date')
+        parser.add_argument('--end', help='Last date to include (YYYY-MM-DD)')
+        parser.add_argument('--doctor', type=int, help='Only rows for this doctor id')
+        parser.add_argument('--chunk-size', type=int, default=EXTRACT_CHUNK_SIZE, help='Rows fetched and written per chunk')
+
+    def _date(self, value, name):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'--{name} must be a date in YYYY-MM-DD format')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        chunks = table_extract(
+            options['table'], fmt=options['fmt'], compress=options['gzip'],
+            start=self._date(options['start'], 'start'), end=self._date(options['end'], 'end'),
+            doctor=options['doctor'], chunk_size=options['chunk_size'],
+        )
+
+        started = time.perf_counter()
+        written = 0
+        to_stdout = options['output'] == '-'
+        handle = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                handle.write(chunk)
+                written += len(chunk)
+        finally:
+            if to_stdout:
+                handle.flush()
+            else:
+                handle.close()
+        elapsed = time.perf_counter() - started
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {written / 2**20:.1f} MiB to {options["output"]} in {elapsed:.1f}s'
+            ))
@@ -0,0 +1,95 @@
+import csv
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hospital.patient_import import DEFAULT_BATCH_SIZE, IMPORT_COLUMNS, import_patients, read_rows
+
+
+class LazyCsv:
+    """CSV file that is only opened once the first row is written"""
+
+    def __init__(self, path, header, append=False):
+        self.path = path
+        self.header = header
+        self.append = append
+        self.handle = self.writer = None
+        self.rows = 0
+
+    def writerow(self, row):
+        if self.writer is None:
+            new = not self.append or not os.path.exists(self.path) or not os.path.getsize(self.path)
+            self.handle = open(self.path, 'a' if self.append else 'w', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.handle)
+            if new:
+                self.writer.writerow(self.header)
+        self.writer.writerow(row)
+        self.rows += 1
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+
+
+class Command(BaseCommand):
+    help = (f'Import patients from a CSV, JSON or NDJSON file with the columns: {", ".join(IMPORT_COLUMNS)} '
+            '(only email is required). Patients without a password get an invite token instead.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv (with a header), .json (array of objects), .ndjson or .jsonl')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without importing')
+        parser.add_argument('--invite', action='store_true',
+                            help='Ignore any passwords in the file and invite every patient instead')
+        parser.add_argument('--errors', help='Error report to write (default: <path>.errors.csv)')
+        parser.add_argument('--invites', help='File to append invite tokens to (default: <path>.invites.csv)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int,
+                            help='Password hashing processes (default: one per CPU, 0 to hash in this process)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        stem = os.path.splitext(path)[0]
+        errors = LazyCsv(options['errors'] or f'{stem}.errors.csv', ('row', 'email', 'column', 'message'))
+        # Appended to: tokens from an earlier run must not be lost to a rerun
+        invites = LazyCsv(options['invites'] or f'{stem}.invites.csv', ('email', 'uid', 'token'), append=True)
+
+        def on_error(number, email, messages):
+            for column, column_messages in messages.items():
+                for message in column_messages:
+                    errors.writerow((number, email, column, message))
+
+        def progress(stats):
+            self.stdout.write(f"{stats['rows']} rows read, {stats['imported']} "
+                              f"{'valid' if options['dry_run'] else 'imported'}, {stats['invalid']} invalid")
+
+        started = time.perf_counter()
+        try:
+            stats = import_patients(
+                read_rows(path), batch_size=options['batch_size'], workers=options['workers'],
+                invite=options['invite'], dry_run=options['dry_run'],
+                on_error=on_error, on_invite=lambda *row: invites.writerow(row), progress=progress,
+            )
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+        finally:
+            errors.close()
+            invites.close()
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            summary = f"Dry run: {stats['imported']} of {stats['rows']} rows would be imported"
+        else:
+            summary = (f"Imported {stats['imported']} of {stats['rows']} patients in {elapsed:.1f}s "
+                       f"({stats['imported'] / max(elapsed, 1e-9):,.0f}/s): {stats['hashed']} with passwords, "
+                       f"{stats['invited']} invited")
+        self.stdout.write(self.style.SUCCESS(summary))
+        if invites.rows:
+            self.stdout.write(f'Invite tokens written to {invites.path}; each patient sets a password at '
+                              'POST /api/auth/invite/accept/ with their uid and token')
+        if errors.rows:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['invalid']} rows rejected; see {errors.path}"
+            ))
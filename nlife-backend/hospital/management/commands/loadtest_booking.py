@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, time as dt_time, timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+from hospital.models import Doctor, Patient, Appointment
+from hospital.views import AppointmentViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Hammer the appointment booking endpoint from many threads against the same slots and '
+            'verify no slot is double-booked. Needs a database with real concurrency (PostgreSQL); '
+            'synthetic users are committed and deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent booking threads')
+        parser.add_argument('--attempts', type=int, default=2000, help='Total booking requests')
+        parser.add_argument('--slots', type=int, default=50, help='Distinct doctor slots being contested')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic data for inspection')
+
+    def setup(self, run_id, threads):
+        password = make_password(None)
+        doctor_user = User.objects.create(email=f'loadtest.{run_id}.doctor@example.com', user_type='doctor',
+                                          first_name='Load', last_name='Test', password=password)
+        doctor = Doctor.objects.create(user=doctor_user, available_days='Monday,Tuesday,Wednesday,Thursday,Friday',
+                                       start_time=dt_time(8), end_time=dt_time(20))
+        patients = []
+        for index in range(threads):
+            user = User.objects.create(email=f'loadtest.{run_id}.patient{index}@example.com', user_type='patient',
+                                       first_name='Patient', last_name=str(index), password=password)
+            patients.append(Patient.objects.create(user=user))
+        return doctor, patients
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        if connection.vendor == 'sqlite' and threads > 1:
+            self.stdout.write(self.style.WARNING('SQLite serialises writers; running with a single thread'))
+            threads = 1
+        if options['slots'] < 1 or options['attempts'] < options['slots']:
+            raise CommandError('--attempts must be at least --slots (and --slots at least 1)')
+
+        run_id = uuid.uuid4().hex[:8]
+        doctor, patients = self.setup(run_id, threads)
+
+        base_day = date.today() + timedelta(days=30)
+        slots = [
+            (base_day + timedelta(days=index // 20),
+             (datetime.combine(base_day, dt_time(8)) + timedelta(minutes=30 * (index % 20))).time())
+            for index in range(options['slots'])
+        ]
+        work = [slots[index % len(slots)] for index in range(options['attempts'])]
+        random.shuffle(work)
+
+        lock = threading.Lock()
+        statuses = Counter()
+        view = AppointmentViewSet.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+
+        def worker(patient):
+            local = Counter()
+            try:
+                while True:
+                    with lock:
+                        if not work:
+                            break
+                        day, at = work.pop()
+                    request = factory.post('/api/appointments/', {
+                        'doctor': doctor.id,
+                        'patient': patient.id,
+                        'appointment_date': day.isoformat(),
+                        'appointment_time': at.strftime('%H:%M'),
+                        'reason': 'load test',
+                    }, format='json')
+                    force_authenticate(request, user=patient.user)
+                    try:
+                        local[view(request).status_code] += 1
+                    except Exception as exc:
+                        local[type(exc).__name__] += 1
+            finally:
+                connection.close()
+                with lock:
+                    statuses.update(local)
+
+        self.stdout.write(f'Booking {options["attempts"]} requests over {len(slots)} slots with {threads} threads...')
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(patients[index],)) for index in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        active = Counter(
+            Appointment.objects.filter(doctor=doctor, status__in=Appointment.ACTIVE_STATUSES)
+            .values_list('appointment_date', 'appointment_time')
+        )
+        double_booked = [slot for slot, count in active.items() if count > 1]
+
+        self.stdout.write(f'Responses: {dict(statuses)}')
+        self.stdout.write(f'Throughput: {options["attempts"] / elapsed:.0f} requests/s ({elapsed:.2f}s)')
+        self.stdout.write(f'Active bookings: {sum(active.values())} for {len(slots)} slots')
+
+        if not options['keep']:
+            User.objects.filter(email__startswith=f'loadtest.{run_id}.').delete()
+
+        if double_booked or statuses[201] != len(slots) or len(active) != len(slots):
+            raise CommandError(f'Booking invariant violated: {len(double_booked)} double-booked slots, '
+                               f'{statuses[201]} successful bookings for {len(slots)} slots')
+        self.stdout.write(self.style.SUCCESS('No slot was double-booked'))
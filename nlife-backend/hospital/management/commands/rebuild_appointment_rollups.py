@@ -0,0 +1,29 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from hospital.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily appointment rollups from the live and archived appointment tables (backfills / drift repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First appointment date to rebuild (YYYY-MM-DD); default: all')
+        parser.add_argument('--end', help='Last appointment date to rebuild (YYYY-MM-DD); default: all')
+        parser.add_argument('--window-days', type=int, default=7,
+                            help='Days of appointments rebuilt per transaction (default: 7)')
+
+    def _date(self, value, name):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'--{name} must be a date in YYYY-MM-DD format')
+
+    def handle(self, *args, **options):
+        start = self._date(options['start'], 'start')
+        end = self._date(options['end'], 'end')
+        if options['window_days'] < 1:
+            raise CommandError('--window-days must be at least 1')
+        written = rebuild_rollups(start, end, window_days=options['window_days'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from hospital.care import rebuild_care_relationships
+
+
+class Command(BaseCommand):
+    help = ('Resync doctor-patient care relationships with non-cancelled appointments and medical records '
+            '(after bulk loads)')
+
+    def handle(self, *args, **options):
+        added, removed = rebuild_care_relationships()
+        self.stdout.write(self.style.SUCCESS(f'Added {added} and removed {removed} care relationships'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from hospital.search import refresh_doctor_search_vectors, search_vector_supported
+
+
+class Command(BaseCommand):
+    help = 'Recompute the full-text search vector of every doctor (e.g. after bulk imports)'
+
+    def handle(self, *args, **options):
+        if not search_vector_supported():
+            self.stdout.write(self.style.WARNING('Full-text search vectors are only maintained on PostgreSQL'))
+            return
+
+        updated = refresh_doctor_search_vectors()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search vectors for {updated} doctors'))
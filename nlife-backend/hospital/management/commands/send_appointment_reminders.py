@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from hospital.reminders import DEFAULT_BATCH_SIZE, DEFAULT_KIND, DEFAULT_WORKERS, get_sink, run_reminders
+
+
+class Command(BaseCommand):
+    help = ('Send reminders for appointments starting within the next APPOINTMENT_REMINDER_HOURS '
+            '(or --window-hours). Each reminder is recorded, so reruns never send it twice. '
+            'Use --loop to keep running every --interval seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=float, help='Override APPOINTMENT_REMINDER_HOURS')
+        parser.add_argument('--kind', default=DEFAULT_KIND,
+                            help='Reminder kind; each appointment gets at most one reminder per kind')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Reminders per batch')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Sink threads')
+        parser.add_argument('--sink', help='Dotted path of the sink class (default: APPOINTMENT_REMINDER_SINK)')
+        parser.add_argument('--loop', action='store_true', help='Run until interrupted')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+        hours = options['window_hours'] if options['window_hours'] is not None else settings.APPOINTMENT_REMINDER_HOURS
+        if hours <= 0:
+            raise CommandError('--window-hours must be positive')
+        try:
+            sink = get_sink(options['sink'])
+        except ImportError as exc:
+            raise CommandError(f'Unknown sink: {exc}')
+
+        while True:
+            started = time.perf_counter()
+            stats = run_reminders(
+                window=timedelta(hours=hours), kind=options['kind'], batch_size=options['batch_size'],
+                workers=options['workers'], sink=sink,
+            )
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{stats['scheduled']} due, {stats['sent']} sent, {stats['failed']} failed, "
+                f"{stats['skipped']} skipped in {elapsed:.1f}s"
+            )
+            if not options['loop']:
+                break
+            try:
+                time.sleep(max(0, options['interval'] - elapsed))
+            except KeyboardInterrupt:
+                break
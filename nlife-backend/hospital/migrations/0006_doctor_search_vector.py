@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:45
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index and initial vectors; the column stays unused on other databases"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS hospital_doctor_search_vector_gin '
+        'ON hospital_doctor USING gin (search_vector)'
+    )
+
+    Doctor = apps.get_model('hospital', 'Doctor')
+    User = apps.get_model('accounts', 'User')
+    Specialty = apps.get_model('hospital', 'Specialty')
+    user = User.objects.filter(pk=OuterRef('user_id'))
+    specialty = Specialty.objects.filter(pk=OuterRef('specialty_id'))
+    Doctor.objects.update(search_vector=(
+        SearchVector(
+            Subquery(user.values('first_name')[:1]),
+            Subquery(user.values('last_name')[:1]),
+            weight='A', config='english',
+        )
+        + SearchVector(Subquery(specialty.values('name')[:1]), weight='B', config='english')
+        + SearchVector('bio', 'education', weight='C', config='english')
+    ))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS hospital_doctor_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_gender'),
+        ('hospital', '0005_remove_reviews_safe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
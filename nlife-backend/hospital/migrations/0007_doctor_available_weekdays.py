@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:47
+
+from django.db import migrations, models
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def weekday_mask(available_days):
+    """Frozen copy of hospital.models.weekday_mask"""
+    mask = 0
+    for token in (available_days or '').replace(';', ',').replace('/', ',').split(','):
+        token = token.strip().lower()
+        if len(token) < 3:
+            continue
+        for index, day in enumerate(WEEKDAYS):
+            if day.startswith(token):
+                mask |= 1 << index
+                break
+    return mask
+
+
+def populate_weekday_masks(apps, schema_editor):
+    Doctor = apps.get_model('hospital', 'Doctor')
+    batch = []
+    for doctor in Doctor.objects.only('id', 'available_days').iterator(chunk_size=2000):
+        doctor.available_weekdays = weekday_mask(doctor.available_days)
+        if doctor.available_weekdays:
+            batch.append(doctor)
+        if len(batch) >= 2000:
+            Doctor.objects.bulk_update(batch, ['available_weekdays'])
+            batch = []
+    if batch:
+        Doctor.objects.bulk_update(batch, ['available_weekdays'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0006_doctor_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='available_weekdays',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(populate_weekday_masks, migrations.RunPython.noop),
+    ]
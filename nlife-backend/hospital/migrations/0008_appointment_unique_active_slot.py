@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_double_bookings(apps, schema_editor):
+    """
+    Existing duplicates would block the constraint. They are real patient
+    bookings, so rather than pick one to cancel, stop and list them: cancel or
+    move the extra bookings (admin or API, so the change feed and rollups see
+    it) and run the migration again.
+    """
+    Appointment = apps.get_model('hospital', 'Appointment')
+    active = Appointment.objects.filter(status__in=['pending', 'confirmed'])
+    duplicates = (
+        active.values('doctor_id', 'appointment_date', 'appointment_time')
+        .annotate(bookings=Count('id'))
+        .filter(bookings__gt=1)
+        .order_by('appointment_date', 'appointment_time', 'doctor_id')
+    )
+    conflicts = []
+    for slot in duplicates.iterator():
+        ids = active.filter(
+            doctor_id=slot['doctor_id'],
+            appointment_date=slot['appointment_date'],
+            appointment_time=slot['appointment_time'],
+        ).order_by('id').values_list('id', flat=True)
+        conflicts.append(f"  doctor {slot['doctor_id']} on {slot['appointment_date']} at "
+                         f"{slot['appointment_time']}: appointments {', '.join(map(str, ids))}")
+    if conflicts:
+        raise RuntimeError(
+            f'{len(conflicts)} doctor slots hold more than one pending/confirmed appointment. Cancel or move '
+            'all but one booking in each, then migrate again:\n' + '\n'.join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0007_doctor_available_weekdays'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('doctor', 'appointment_date', 'appointment_time'), name='unique_active_appointment_slot'),
+        ),
+    ]
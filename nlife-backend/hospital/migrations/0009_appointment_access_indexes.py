@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from hospital.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('hospital', '0008_appointment_unique_active_slot'),
+    ]
+
+    # Build the composite indexes before dropping the FK indexes they make redundant
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date', 'appointment_time'], name='appt_doctor_date_time_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', '-created_at', '-id'], name='appt_doctor_created_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date', 'appointment_time', 'id'], name='appt_patient_date_time_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['-created_at', '-id'], name='appt_created_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'status'], name='appt_date_status_idx'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='hospital.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='hospital.patient'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    """Frozen copy of hospital.rollups.rebuild_rollups for the whole table"""
+    Appointment = apps.get_model('hospital', 'Appointment')
+    DailyAppointmentRollup = apps.get_model('hospital', 'DailyAppointmentRollup')
+    rows = (
+        Appointment.objects.values('appointment_date', 'doctor_id', 'status', 'payment_status')
+        .annotate(count=Count('id'), fees=Sum('doctor__consultation_fee'))
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=5000):
+        batch.append(DailyAppointmentRollup(
+            day=row['appointment_date'], doctor_id=row['doctor_id'], status=row['status'],
+            payment_status=row['payment_status'], appointments=row['count'], fee_total=row['fees'],
+        ))
+        if len(batch) >= 5000:
+            DailyAppointmentRollup.objects.bulk_create(batch)
+            batch = []
+    DailyAppointmentRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0009_appointment_access_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAppointmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=10)),
+                ('payment_status', models.CharField(choices=[('unpaid', 'Unpaid'), ('paid', 'Paid'), ('refunded', 'Refunded')], max_length=10)),
+                ('appointments', models.IntegerField(default=0)),
+                ('fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='hospital.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor', 'status', 'payment_status'), name='unique_daily_appointment_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
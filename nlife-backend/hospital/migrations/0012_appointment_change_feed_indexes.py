@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:10
+
+from django.db import migrations, models
+from hospital.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('hospital', '0011_appointment_archive'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'updated_at', 'id'], name='appt_doctor_updated_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at', 'id'], name='appt_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_care_relationships(apps, schema_editor):
+    """Frozen copy of hospital.care.rebuild_care_relationships"""
+    CareRelationship = apps.get_model('hospital', 'CareRelationship')
+    for name in ('Appointment', 'ArchivedAppointment', 'MedicalRecord'):
+        pairs = apps.get_model('hospital', name).objects.values_list('doctor_id', 'patient_id').distinct().order_by()
+        batch = []
+        for doctor_id, patient_id in pairs.iterator(chunk_size=5000):
+            batch.append(CareRelationship(doctor_id=doctor_id, patient_id=patient_id))
+            if len(batch) >= 5000:
+                CareRelationship.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        CareRelationship.objects.bulk_create(batch, ignore_conflicts=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0013_appointment_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CareRelationship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='care_relationships', to='hospital.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='care_relationships', to='hospital.patient')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'patient'), name='unique_care_relationship')],
+            },
+        ),
+        migrations.RunPython(backfill_care_relationships, migrations.RunPython.noop),
+    ]
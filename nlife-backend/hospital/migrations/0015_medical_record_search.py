@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:52
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index and initial vectors; the column stays unused on other databases"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS hospital_medicalrecord_search_vector_gin '
+        'ON hospital_medicalrecord USING gin (search_vector)'
+    )
+
+    MedicalRecord = apps.get_model('hospital', 'MedicalRecord')
+    MedicalRecord.objects.update(search_vector=(
+        SearchVector('diagnosis', weight='A', config='english')
+        + SearchVector('prescription', weight='B', config='english')
+        + SearchVector('notes', weight='C', config='english')
+    ))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS hospital_medicalrecord_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0014_care_relationships'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalrecord',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:37
+
+from django.db import migrations, models
+from hospital.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('hospital', '0015_medical_record_search'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='archivedappointment',
+            index=models.Index(fields=['patient', 'appointment_date', 'appointment_time', 'id'], name='archived_appt_patient_date_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='medicalrecord',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='record_patient_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+def remove_unsupported_relationships(apps, schema_editor):
+    """Frozen copy of the removal half of hospital.care.rebuild_care_relationships"""
+    CareRelationship = apps.get_model('hospital', 'CareRelationship')
+    relationships = CareRelationship.objects.all()
+    for name, statuses in (('Appointment', True), ('ArchivedAppointment', True), ('MedicalRecord', False)):
+        source = apps.get_model('hospital', name).objects.all()
+        if statuses:
+            source = source.filter(status__in=('pending', 'confirmed', 'completed'))
+        relationships = relationships.exclude(Exists(
+            source.filter(doctor_id=OuterRef('doctor_id'), patient_id=OuterRef('patient_id'))
+        ))
+    relationships.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0016_patient_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_unsupported_relationships, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,40 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def weekday_bit(day):
+    """Bit for a weekday, by index (0 = Monday, as date.weekday()) or WEEKDAYS name"""
+    index = day if isinstance(day, int) else WEEKDAYS.index(day)
+    return 1 << index
+
+
+def weekday_mask(available_days):
+    """
+    Parse a free-form weekday list ('Monday,Tuesday', 'mon, wed', ...) into a
+    bitmask with bit 0 = Monday. Unrecognised entries are ignored.
+    """
+    mask = 0
+    for token in (available_days or '').replace(';', ',').replace('/', ',').split(','):
+        token = token.strip().lower()
+        if len(token) < 3:
+            continue
+        for index, day in enumerate(WEEKDAYS):
+            if day.lower().startswith(token):
+                mask |= 1 << index
+                break
+    return mask
+
+
+def masks_with_weekday(day):
+    """All 7-bit masks that include ``day``; lets weekday lookups use the mask index"""
+    bit = weekday_bit(day)
+    return [mask for mask in range(1 << len(WEEKDAYS)) if mask & bit]
+
+
 class Specialty(models.Model):
     """Medical specialties for doctors"""
     name = models.CharField(max_length=100)
@@ -23,10 +56,22 @@ class Doctor(models.Model):
     experience_years = models.PositiveIntegerField(default=0)
     consultation_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     available_days = models.CharField(max_length=100, blank=True, null=True, help_text="Comma separated days, e.g., 'Monday,Tuesday,Wednesday'")
+    # Bitmask of available_days (bit 0 = Monday), derived on save so weekday queries run in SQL
+    available_weekdays = models.PositiveSmallIntegerField(default=0, editable=False, db_index=True)
     start_time = models.TimeField(blank=True, null=True)
     end_time = models.TimeField(blank=True, null=True)
     is_available = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # Weighted full-text vector over name, specialty, bio and education, maintained by
+    # hospital.search (PostgreSQL only; GIN index created in migration 0006)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.available_weekdays = weekday_mask(self.available_days)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'available_days' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'available_weekdays'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Dr. {self.user.first_name} {self.user.last_name}"
@@ -45,8 +90,9 @@ class Patient(models.Model):
 
 class Appointment(models.Model):
     """Appointment model for booking doctor appointments"""
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments')
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments')
+    # The composite indexes in Meta lead with these columns, so single-column FK indexes would be redundant
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments', db_index=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments', db_index=False)
     appointment_date = models.DateField()
     appointment_time = models.TimeField()
     reason = models.TextField(blank=True, null=True)
@@ -57,6 +103,8 @@ class Appointment(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     )
+    # Statuses that still occupy the doctor's slot
+    ACTIVE_STATUSES = ('pending', 'confirmed')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
 
     PAYMENT_STATUS_CHOICES = (
@@ -69,10 +117,74 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # At most one pending/confirmed booking per doctor slot; enforced by the
+            # database so concurrent requests cannot double-book (see hospital.booking)
+            models.UniqueConstraint(
+                fields=['doctor', 'appointment_date', 'appointment_time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='unique_active_appointment_slot',
+            ),
+        ]
+        # Access paths, each labelled with the query it serves in `manage.py
+        # explain_appointment_queries`; every booking write pays for each one, so
+        # only queries that would otherwise scan many rows get an index. The
+        # active-slot conflict check is served by the unique constraint above.
+        indexes = [
+            # open slots: booked starts (doctor, date range, any status but cancelled,
+            # so the active-only constraint cannot serve it)
+            models.Index(fields=['doctor', 'appointment_date', 'appointment_time'], name='appt_doctor_date_time_idx'),
+            # my_appointments (doctor / admin): newest first, keyset on created_at, id
+            models.Index(fields=['doctor', '-created_at', '-id'], name='appt_doctor_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='appt_created_idx'),
+            # patient timeline: keyset on appointment_date, appointment_time, id. A
+            # patient has few appointments, so my_appointments and the changes feed
+            # for a patient read them all through this index and sort
+            models.Index(fields=['patient', 'appointment_date', 'appointment_time', 'id'], name='appt_patient_date_time_idx'),
+            # changes feed (doctor / admin): keyset on updated_at, id
+            models.Index(fields=['doctor', 'updated_at', 'id'], name='appt_doctor_updated_idx'),
+            models.Index(fields=['updated_at', 'id'], name='appt_updated_idx'),
+            # Date ranges with or without a status filter: admin date hierarchy,
+            # list date_from/date_to, exports, rollup rebuild windows, status filter,
+            # archive candidates and reminders due (a day or two of rows each)
+            models.Index(fields=['appointment_date', 'status'], name='appt_date_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.patient} - {self.doctor} - {self.appointment_date}"
 
 
+class ArchivedAppointment(models.Model):
+    """
+    Finished appointments moved out of Appointment by hospital.archive. Rows
+    keep their original id and columns; ``archived_at`` records the move.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='archived_appointments', db_index=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='archived_appointments', db_index=False)
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    reason = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    payment_status = models.CharField(max_length=10, choices=Appointment.PAYMENT_STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', '-created_at', '-id'], name='archived_appt_doctor_idx'),
+            models.Index(fields=['patient', '-created_at', '-id'], name='archived_appt_patient_idx'),
+            models.Index(fields=['patient', 'appointment_date', 'appointment_time', 'id'],
+                         name='archived_appt_patient_date_idx'),
+            models.Index(fields=['appointment_date'], name='archived_appt_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient} - {self.doctor} - {self.appointment_date} (archived)"
+
+
 
 class TimeSlot(models.Model):
     """Time slots for doctor availability"""
@@ -98,11 +210,99 @@ class MedicalRecord(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='medical_records')
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='medical_records')
     appointment = models.OneToOneField(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='medical_record')
+    # Set instead of ``appointment`` once the appointment has been archived
+    archived_appointment = models.OneToOneField(ArchivedAppointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='medical_record')
     diagnosis = models.TextField()
     prescription = models.TextField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted full-text vector over diagnosis, prescription and notes, maintained by
+    # hospital.search (PostgreSQL only; GIN index created in migration 0015)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Patient timeline (keyset on created_at, id)
+            models.Index(fields=['patient', 'created_at', 'id'], name='record_patient_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.patient} - {self.doctor} - {self.created_at.date()}"
+
+class DailyAppointmentRollup(models.Model):
+    """
+    Appointments per day, doctor, status and payment status, maintained
+    incrementally by hospital.rollups so analytics never scan Appointment.
+    ``fee_total`` is ``appointments`` times the doctor's current consultation fee.
+    """
+    day = models.DateField()
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='daily_rollups')
+    status = models.CharField(max_length=10, choices=Appointment.STATUS_CHOICES)
+    payment_status = models.CharField(max_length=10, choices=Appointment.PAYMENT_STATUS_CHOICES)
+    appointments = models.IntegerField(default=0)
+    fee_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'doctor', 'status', 'payment_status'],
+                                    name='unique_daily_appointment_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.doctor} - {self.status}/{self.payment_status}: {self.appointments}"
+
+class AppointmentReminder(models.Model):
+    """
+    A reminder for one appointment, recorded before it is sent so that
+    scheduler reruns never send it twice (see hospital/reminders.py).
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    )
+
+    # Leads the unique constraint below, so it needs no index of its own
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='reminders', db_index=False)
+    kind = models.CharField(max_length=20, default='upcoming')
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'kind'], name='unique_appointment_reminder'),
+        ]
+        indexes = [
+            # Claiming the next batch of unsent reminders
+            models.Index(fields=['kind', 'id'], condition=models.Q(status__in=['pending', 'sending']),
+                         name='reminder_unsent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} reminder for appointment {self.appointment_id}: {self.status}"
+
+class CareRelationship(models.Model):
+    """
+    A doctor and a patient who share an appointment or a medical record,
+    maintained by hospital.care so access checks are one indexed lookup.
+    """
+    # Leads the unique constraint below, so it needs no index of its own
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='care_relationships', db_index=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='care_relationships')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'patient'], name='unique_care_relationship'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} - {self.patient}"
@@ -0,0 +1,27 @@
+"""
+Migration operations.
+
+Appointment and its neighbours are large tables, so their indexes are built
+with CREATE INDEX CONCURRENTLY on PostgreSQL: a plain CREATE INDEX blocks
+every booking write for the length of the build. Other databases have no
+concurrent build and get a plain one. Migrations using these operations
+must set ``atomic = False``.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrentlyIfSupported(AddIndexConcurrently):
+    """AddIndexConcurrently on PostgreSQL, AddIndex elsewhere"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
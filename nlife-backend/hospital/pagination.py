@@ -0,0 +1,122 @@
+"""
+Keyset (seek) pagination.
+
+Unlike page-number pagination the cost of a page does not grow with its
+position: each page is ``WHERE (key) > (last key seen) ORDER BY key LIMIT n``,
+which an index on the key columns answers directly. The cursor is an opaque
+token holding the key values of the last row of the previous page.
+"""
+import base64
+import json
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate a queryset over ``ordering``, a tuple of columns whose combined
+    value is unique (end it with ``id``). Prefix a column with ``-`` for
+    descending order; all columns must use the same direction.
+
+    ``paginate_queryset`` returns an unevaluated, sliced queryset so callers
+    can render it however they like (serializer, values(), ...), as long as
+    every rendered item exposes the ordering columns under the same names.
+    """
+
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        """Keyset pagination is opt-in: enabled by a page size or a cursor"""
+        return cls.page_size_query_param in request.query_params or cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @property
+    def _columns(self):
+        return [column.lstrip('-') for column in self.ordering]
+
+    @property
+    def _descending(self):
+        return self.ordering[0].startswith('-')
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request, model=None):
+        """
+        The key values in the request's cursor, or None without one. With
+        ``model`` each value is converted with its ordering field, so a
+        tampered cursor is rejected here rather than failing in the query.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.ordering) or None in values:
+                raise ValueError
+            if model is not None:
+                values = [model._meta.get_field(column).to_python(value)
+                          for column, value in zip(self._columns, values)]
+        except (TypeError, ValueError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def seek_filter(self, values):
+        """Row-value comparison ``(a, b) > (x, y)`` spelled out as OR-ed prefixes"""
+        operator = 'lt' if self._descending else 'gt'
+        condition = Q()
+        for index, column in enumerate(self._columns):
+            prefix = {self._columns[i]: values[i] for i in range(index)}
+            condition |= Q(**prefix, **{f'{column}__{operator}': values[index]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+
+        values = self.decode_cursor(request, queryset.model)
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values))
+
+        # Fetch one extra row to learn whether another page exists
+        return queryset.order_by(*self.ordering)[:self.page_size_value + 1]
+
+    def get_next_link(self, results):
+        if len(results) <= self.page_size_value:
+            return None
+        last = results[self.page_size_value - 1]
+        cursor = self.encode_cursor([last[column] for column in self._columns])
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(data),
+            'results': data[:self.page_size_value],
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,262 @@
+"""
+Appointment reminders.
+
+A run has two phases, both working in batches so the number of queries grows
+with ``appointments / batch_size`` rather than with appointments:
+
+1. Schedule: pending and confirmed appointments starting within the window
+   are read with one range query over the partial (date, time) index on
+   active appointments and recorded as AppointmentReminder rows with
+   ``bulk_create(ignore_conflicts=True)``. The (appointment, kind) unique
+   constraint makes recording idempotent across reruns and concurrent runs.
+   Rescheduling an appointment deletes its reminders (hospital/signals.py),
+   so the new date and time get one of their own.
+2. Dispatch: batches of unsent reminders are claimed with ``SELECT ... FOR
+   UPDATE SKIP LOCKED`` and marked ``sending``, then handed to the sink on a
+   bounded thread pool. Outcomes are written back with one UPDATE per
+   outcome. A reminder is only claimed once per run; failures are retried by
+   later runs until MAX_ATTEMPTS. Claims abandoned by a crashed run are taken
+   over after CLAIM_TIMEOUT, so a crash mid-send can repeat that batch (the
+   only case where a reminder may be delivered twice). Claims count as
+   attempts: an abandoned claim that has used up MAX_ATTEMPTS is marked
+   ``failed`` instead, so a batch that keeps crashing its sender is dropped.
+
+Sinks deliver messages (``{'id', 'to', 'subject', 'body'}`` dicts) and are
+chosen by ``APPOINTMENT_REMINDER_SINK``: ConsoleSink, FileSink (NDJSON lines
+appended to ``APPOINTMENT_REMINDER_FILE``) or EmailSink (Django's mail
+settings; point it at a local SMTP stub for testing). ``send_batch`` returns
+``{message id: error}`` for the messages that failed.
+"""
+import json
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Appointment, AppointmentReminder
+
+DEFAULT_KIND = 'upcoming'
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 4
+MAX_ATTEMPTS = 3
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+class BaseSink:
+    """Deliver reminder messages; subclasses implement ``send`` or ``send_batch``"""
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def send_batch(self, messages):
+        failures = {}
+        for message in messages:
+            try:
+                self.send(message)
+            except Exception as exc:
+                failures[message['id']] = str(exc) or exc.__class__.__name__
+        return failures
+
+
+class ConsoleSink(BaseSink):
+    """Print reminders to stdout"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        lines = ''.join(f"[reminder] to={message['to']} {message['subject']}\n" for message in messages)
+        with self.lock:
+            self.stream.write(lines)
+            self.stream.flush()
+        return {}
+
+
+class FileSink(BaseSink):
+    """Append reminders as JSON lines to a file"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.APPOINTMENT_REMINDER_FILE
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        lines = ''.join(json.dumps(message, ensure_ascii=False) + '\n' for message in messages)
+        with self.lock, open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(lines)
+        return {}
+
+
+class EmailSink(BaseSink):
+    """Send reminders by email, one SMTP connection per batch"""
+
+    def send_batch(self, messages):
+        failures = {}
+        try:
+            connection = get_connection()
+            connection.open()
+        except Exception as exc:
+            return {message['id']: str(exc) or exc.__class__.__name__ for message in messages}
+        try:
+            for message in messages:
+                try:
+                    EmailMessage(message['subject'], message['body'], settings.DEFAULT_FROM_EMAIL,
+                                 [message['to']], connection=connection).send()
+                except Exception as exc:
+                    failures[message['id']] = str(exc) or exc.__class__.__name__
+        finally:
+            connection.close()
+        return failures
+
+
+def get_sink(path=None):
+    return import_string(path or settings.APPOINTMENT_REMINDER_SINK)()
+
+
+def window_filter(start, end):
+    """Q for appointments starting in ``[start, end]`` (aware datetimes, compared in local time)"""
+    start, end = timezone.localtime(start), timezone.localtime(end)
+    if start.date() == end.date():
+        return Q(appointment_date=start.date(), appointment_time__range=(start.time(), end.time()))
+    # The date range bounds the index scan; the ends are trimmed by time
+    return Q(appointment_date__range=(start.date(), end.date())) & (
+        Q(appointment_date__gt=start.date(), appointment_date__lt=end.date())
+        | Q(appointment_date=start.date(), appointment_time__gte=start.time())
+        | Q(appointment_date=end.date(), appointment_time__lte=end.time())
+    )
+
+
+def due_appointments(start, end, kind=DEFAULT_KIND):
+    """Active appointments starting in the window that have no ``kind`` reminder yet"""
+    return Appointment.objects.filter(window_filter(start, end), status__in=Appointment.ACTIVE_STATUSES).filter(
+        ~Exists(AppointmentReminder.objects.filter(appointment=OuterRef('pk'), kind=kind))
+    )
+
+
+def schedule_reminders(start, end, kind=DEFAULT_KIND, batch_size=DEFAULT_BATCH_SIZE):
+    """Record a reminder for every due appointment; returns how many were due"""
+    # Read the (id, email) pairs up front rather than through a cursor: the
+    # inserts below would otherwise grow the table the anti-join is scanning
+    rows = list(due_appointments(start, end, kind).values_list('id', 'patient__user__email'))
+    for offset in range(0, len(rows), batch_size):
+        AppointmentReminder.objects.bulk_create([
+            AppointmentReminder(appointment_id=appointment_id, kind=kind, recipient=email)
+            for appointment_id, email in rows[offset:offset + batch_size]
+        ], ignore_conflicts=True)
+    return len(rows)
+
+
+def claim_batch(kind, batch_size, run_started):
+    """Mark up to ``batch_size`` unsent reminders ``sending``; returns their ids"""
+    now = timezone.now()
+    abandoned = Q(status='sending', claimed_at__lt=now - CLAIM_TIMEOUT)
+    with transaction.atomic():
+        AppointmentReminder.objects.filter(abandoned, kind=kind, attempts__gte=MAX_ATTEMPTS).update(
+            status='failed', last_error='Abandoned while sending',
+        )
+        ids = list(
+            # The status__in lets the planner use the partial index on unsent reminders
+            AppointmentReminder.objects.filter(kind=kind, status__in=('pending', 'sending'))
+            .filter(
+                Q(status='pending', attempts__lt=MAX_ATTEMPTS)
+                & (Q(claimed_at__isnull=True) | Q(claimed_at__lt=run_started))
+                | abandoned & Q(attempts__lt=MAX_ATTEMPTS)
+            )
+            .order_by('id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            AppointmentReminder.objects.filter(id__in=ids).update(
+                status='sending', claimed_at=now, attempts=F('attempts') + 1,
+            )
+    return ids
+
+
+def build_messages(ids):
+    """Messages for the claimed reminders, plus the ids whose appointment is no longer active"""
+    rows = AppointmentReminder.objects.filter(id__in=ids).values_list(
+        'id', 'recipient', 'appointment__status', 'appointment__appointment_date', 'appointment__appointment_time',
+        'appointment__patient__user__first_name', 'appointment__doctor__user__first_name',
+        'appointment__doctor__user__last_name',
+    )
+    messages, skipped = [], []
+    for pk, recipient, current_status, day, at, patient_name, doctor_first, doctor_last in rows:
+        if current_status not in Appointment.ACTIVE_STATUSES:
+            skipped.append(pk)
+            continue
+        doctor = f'Dr. {doctor_first} {doctor_last}'.strip()
+        when = f"{day:%A %d %B %Y} at {at:%H:%M}"
+        messages.append({
+            'id': pk,
+            'to': recipient,
+            'subject': f'Reminder: your appointment with {doctor} on {when}',
+            'body': (f'Hello {patient_name or "there"},\n\n'
+                     f'This is a reminder of your appointment with {doctor} on {when}.\n\n'
+                     'If you can no longer attend, please cancel it from My Appointments.\n\nNLife'),
+        })
+    return messages, skipped
+
+
+def record_results(messages, failures):
+    """Write back one batch's outcome with one UPDATE per outcome (and per distinct error)"""
+    now = timezone.now()
+    sent = [message['id'] for message in messages if message['id'] not in failures]
+    if sent:
+        AppointmentReminder.objects.filter(id__in=sent).update(status='sent', sent_at=now, last_error='')
+    by_error = {}
+    for pk, error in failures.items():
+        by_error.setdefault(error, []).append(pk)
+    for error, ids in by_error.items():
+        reminders = AppointmentReminder.objects.filter(id__in=ids)
+        reminders.filter(attempts__gte=MAX_ATTEMPTS).update(status='failed', last_error=error)
+        reminders.filter(attempts__lt=MAX_ATTEMPTS).update(status='pending', last_error=error)
+    return len(sent)
+
+
+def run_reminders(window=None, kind=DEFAULT_KIND, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                  sink=None, now=None):
+    """
+    Schedule and dispatch reminders for appointments starting within
+    ``window`` (default APPOINTMENT_REMINDER_HOURS) of ``now``. At most
+    ``2 * workers`` batches are in flight. Returns counts per outcome.
+    """
+    sink = sink or get_sink()
+    run_started = timezone.now()
+    now = now or run_started
+    window = window if window is not None else timedelta(hours=settings.APPOINTMENT_REMINDER_HOURS)
+    stats = {'scheduled': schedule_reminders(now, now + window, kind, batch_size),
+             'sent': 0, 'failed': 0, 'skipped': 0}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < 2 * workers:
+                ids = claim_batch(kind, batch_size, run_started)
+                if not ids:
+                    exhausted = True
+                    break
+                messages, skipped = build_messages(ids)
+                if skipped:
+                    AppointmentReminder.objects.filter(id__in=skipped).update(status='skipped')
+                    stats['skipped'] += len(skipped)
+                if messages:
+                    in_flight[pool.submit(sink.send_batch, messages)] = messages
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                messages = in_flight.pop(future)
+                try:
+                    failures = future.result()
+                except Exception as exc:
+                    failures = {message['id']: str(exc) or exc.__class__.__name__ for message in messages}
+                stats['sent'] += record_results(messages, failures)
+                stats['failed'] += len(failures)
+    return stats
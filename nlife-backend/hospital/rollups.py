@@ -0,0 +1,144 @@
+"""
+Daily appointment rollups.
+
+DailyAppointmentRollup holds one row per (day, doctor, status, payment
+status) with the number of appointments and their fee total. Rows are kept
+current incrementally: every appointment create, change or delete turns into
+at most two ``+n``/``-n`` deltas applied with ``UPDATE ... SET appointments =
+appointments + n`` (see hospital/signals.py, and hospital/booking.py for the
+bulk paths that bypass signals). Changing a doctor's fee rescales that
+doctor's fee totals.
+
+rebuild_rollups() recomputes a date range from Appointment and
+ArchivedAppointment for backfills or to repair drift (``manage.py
+rebuild_appointment_rollups``), one short transaction per week of dates. Archiving an appointment leaves its rollup
+row untouched (see hospital/archive.py).
+"""
+from datetime import timedelta
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Max, Min
+from .models import Appointment, ArchivedAppointment, DailyAppointmentRollup, Doctor
+
+_DATE_FIELD = Appointment._meta.get_field('appointment_date')
+
+# Appointment fields that decide which rollup row an appointment counts towards
+ROLLUP_SOURCE_FIELDS = ('appointment_date', 'doctor', 'status', 'payment_status')
+
+
+def rollup_key(appointment_date, doctor_id, status, payment_status):
+    return (_DATE_FIELD.to_python(appointment_date), doctor_id, status, payment_status)
+
+
+def appointment_rollup_key(appointment):
+    return rollup_key(appointment.appointment_date, appointment.doctor_id,
+                      appointment.status, appointment.payment_status)
+
+
+def apply_deltas(deltas):
+    """Add ``{rollup key: change in appointments}`` to the rollup table"""
+    deltas = {key: change for key, change in deltas.items() if change}
+    if not deltas:
+        return
+    fees = dict(Doctor.objects.filter(id__in={key[1] for key in deltas}).values_list('id', 'consultation_fee'))
+
+    # A fixed key order keeps concurrent writers from deadlocking on each other's rows
+    for (day, doctor_id, status, payment_status), change in sorted(deltas.items()):
+        if doctor_id not in fees:
+            continue
+        row = DailyAppointmentRollup.objects.filter(
+            day=day, doctor_id=doctor_id, status=status, payment_status=payment_status,
+        )
+        fee = fees[doctor_id] * change
+        increment = {'appointments': F('appointments') + change, 'fee_total': F('fee_total') + fee}
+        if row.update(**increment) or change < 0:
+            # A decrement with no row to apply to means the row went with its
+            # doctor (cascade delete); there is nothing left to count against
+            continue
+        try:
+            with transaction.atomic():
+                DailyAppointmentRollup.objects.create(
+                    day=day, doctor_id=doctor_id, status=status, payment_status=payment_status,
+                    appointments=change, fee_total=fee,
+                )
+        except IntegrityError:
+            # Another transaction created the row first
+            row.update(**increment)
+
+
+def rescale_doctor_fees(doctor):
+    """Recompute a doctor's fee totals after their consultation fee changed"""
+    DailyAppointmentRollup.objects.filter(doctor=doctor).update(
+        fee_total=F('appointments') * doctor.consultation_fee
+    )
+
+
+def _date_bounds(start, end):
+    """Fill in a missing ``start``/``end`` from the earliest/latest date in the sources and the rollups"""
+    if start and end:
+        return start, end
+    bounds = [
+        queryset.aggregate(first=Min(field), last=Max(field))
+        for queryset, field in (
+            (Appointment.objects.all(), 'appointment_date'),
+            (ArchivedAppointment.objects.all(), 'appointment_date'),
+            (DailyAppointmentRollup.objects.all(), 'day'),
+        )
+    ]
+    firsts = [bound['first'] for bound in bounds if bound['first']]
+    lasts = [bound['last'] for bound in bounds if bound['last']]
+    if not firsts:
+        return None, None
+    return start or min(firsts), end or max(lasts)
+
+
+def _rebuild_window(start, end):
+    """
+    Replace the rollup rows for ``[start, end]`` with one INSERT ... SELECT
+    grouping the live and archived appointments together in the database.
+    """
+    sources = [
+        model.objects.filter(appointment_date__range=(start, end))
+        .values_list('appointment_date', 'doctor_id', 'status', 'payment_status').order_by().query.sql_with_params()
+        for model in (Appointment, ArchivedAppointment)
+    ]
+    quote = connection.ops.quote_name
+    sql = f"""
+        INSERT INTO {quote(DailyAppointmentRollup._meta.db_table)}
+            (day, doctor_id, status, payment_status, appointments, fee_total)
+        SELECT source.appointment_date, source.doctor_id, source.status, source.payment_status,
+               COUNT(*), COUNT(*) * doctor.consultation_fee
+        FROM ({sources[0][0]} UNION ALL {sources[1][0]}) AS source
+        INNER JOIN {quote(Doctor._meta.db_table)} AS doctor ON doctor.id = source.doctor_id
+        GROUP BY source.appointment_date, source.doctor_id, source.status, source.payment_status,
+                 doctor.consultation_fee
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Hold off incremental updates until this window's rows are
+            # committed; the window keeps the lock to one short statement pair
+            with connection.cursor() as cursor:
+                table = quote(DailyAppointmentRollup._meta.db_table)
+                cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+        DailyAppointmentRollup.objects.filter(day__range=(start, end)).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, sources[0][1] + sources[1][1])
+            return cursor.rowcount
+
+
+def rebuild_rollups(start=None, end=None, window_days=7):
+    """
+    Recompute the rollup rows for appointment dates in ``[start, end]`` (both
+    optional) from Appointment and ArchivedAppointment. Each ``window_days``
+    span is rebuilt in its own short transaction, so incremental updates are
+    only held up for one window at a time and the aggregation never leaves
+    the database. Returns the number of rows written.
+    """
+    start, end = _date_bounds(start, end)
+    if start is None or start > end:
+        return 0
+    written = 0
+    while start <= end:
+        window_end = min(start + timedelta(days=window_days - 1), end)
+        written += _rebuild_window(start, window_end)
+        start = window_end + timedelta(days=1)
+    return written
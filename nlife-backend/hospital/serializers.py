@@ -1,6 +1,10 @@
 from rest_framework import serializers
-from .models import Specialty, Doctor, Patient, Appointment, TimeSlot, MedicalRecord
+from .models import Specialty, Doctor, Patient, Appointment, ArchivedAppointment, TimeSlot, MedicalRecord
 from django.contrib.auth import get_user_model
+from .fieldsets import SparseFieldsetMixin
+from .booking import book_appointment, save_appointment
+from .care import has_care_relationship
+from .search import highlight_snippet
 
 User = get_user_model()
 
@@ -28,7 +32,7 @@ class UserBasicSerializer(serializers.ModelSerializer):
             return obj.profile_picture.url
         return None
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the Doctor model"""
 
     user = UserBasicSerializer(read_only=True)
@@ -41,8 +45,8 @@ class DoctorSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Doctor
-        fields = '__all__'
-        read_only_fields = ['rating', 'total_reviews']
+        # Internal indexes: available_weekdays is derived from available_days
+        exclude = ['search_vector', 'available_weekdays']
 
 class DoctorListSerializer(serializers.ModelSerializer):
     """Serializer for listing doctors"""
@@ -53,7 +57,7 @@ class DoctorListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = ['id', 'user', 'specialty', 'experience_years', 'consultation_fee',
-                  'is_available', 'is_featured', 'rating', 'total_reviews',
+                  'is_available', 'is_featured',
                   'bio', 'education', 'available_days', 'start_time', 'end_time']
 
 class DoctorUpdateSerializer(serializers.ModelSerializer):
@@ -136,6 +140,22 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = ['doctor', 'patient', 'appointment_date', 'appointment_time', 'reason']
 
+    def validate(self, attrs):
+        # An appointment gives the doctor access to the patient's records, so
+        # only staff may book for someone else
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and not (user.is_staff or user.user_type == 'admin'):
+            if user.user_type == 'doctor' and attrs['doctor'].user_id != user.id:
+                raise serializers.ValidationError({'doctor': ['Doctors can only book their own appointments.']})
+            if user.user_type != 'doctor' and attrs['patient'].user_id != user.id:
+                raise serializers.ValidationError({'patient': ['Patients can only book appointments for themselves.']})
+        return attrs
+
+    def create(self, validated_data):
+        # The slot is claimed by the database constraint, not a racy pre-check
+        return book_appointment(**validated_data)
+
 class AppointmentSerializer(serializers.ModelSerializer):
     """Serializer for the Appointment model"""
 
@@ -146,6 +166,16 @@ class AppointmentSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = '__all__'
 
+class ArchivedAppointmentSerializer(serializers.ModelSerializer):
+    """Serializer for archived appointments, in the same shape as AppointmentSerializer"""
+
+    doctor = DoctorListSerializer(read_only=True)
+    patient = PatientListSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedAppointment
+        fields = '__all__'
+
 class AppointmentUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating appointments"""
 
@@ -153,6 +183,32 @@ class AppointmentUpdateSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = ['status', 'payment_status']
 
+    def update(self, instance, validated_data):
+        # Reactivating a cancelled booking can collide with a newer one for the same slot
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        return save_appointment(instance)
+
+class AppointmentBulkCreateSerializer(serializers.Serializer):
+    """One item of a bulk booking; doctor and patient ids are resolved in bulk"""
+
+    doctor = serializers.IntegerField(min_value=1)
+    patient = serializers.IntegerField(min_value=1)
+    appointment_date = serializers.DateField()
+    appointment_time = serializers.TimeField()
+    reason = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class AppointmentStatusChangeSerializer(serializers.Serializer):
+    """One item of a bulk status/payment transition"""
+
+    id = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=Appointment.STATUS_CHOICES, required=False)
+    payment_status = serializers.ChoiceField(choices=Appointment.PAYMENT_STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if 'status' not in attrs and 'payment_status' not in attrs:
+            raise serializers.ValidationError('Provide status and/or payment_status.')
+        return attrs
 
 
 class MedicalRecordSerializer(serializers.ModelSerializer):
@@ -163,8 +219,17 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = MedicalRecord
-        fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        exclude = ['search_vector']
+        read_only_fields = ['archived_appointment', 'created_at', 'updated_at']
+
+class MedicalRecordSearchSerializer(MedicalRecordSerializer):
+    """A medical record search hit with its relevance and highlighted snippet"""
+
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    snippet = serializers.SerializerMethodField()
+
+    def get_snippet(self, obj):
+        return highlight_snippet(obj.search_snippet)
 
 class MedicalRecordCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating medical records"""
@@ -172,3 +237,22 @@ class MedicalRecordCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = ['patient', 'doctor', 'appointment', 'diagnosis', 'prescription', 'notes']
+
+    def validate(self, attrs):
+        # A record gives its doctor access to the patient's records, so only
+        # staff may write one for someone else, and doctors only for patients
+        # they already care for
+        appointment = attrs.get('appointment')
+        if appointment is not None and (appointment.doctor_id, appointment.patient_id) != (
+                attrs['doctor'].id, attrs['patient'].id):
+            raise serializers.ValidationError({'appointment': ['The appointment is not between this doctor and patient.']})
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and not (user.is_staff or user.user_type == 'admin'):
+            if user.user_type != 'doctor':
+                raise serializers.ValidationError('Only doctors can write medical records.')
+            if attrs['doctor'].user_id != user.id:
+                raise serializers.ValidationError({'doctor': ['Doctors can only write their own medical records.']})
+            if not has_care_relationship(attrs['doctor'].id, attrs['patient'].id):
+                raise serializers.ValidationError({'patient': ['You have no appointment with this patient.']})
+        return attrs
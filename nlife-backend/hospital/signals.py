@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Specialty, Doctor, Appointment, AppointmentReminder, ArchivedAppointment, MedicalRecord
+from .cache import bump_version_on_commit
+from .directory import USER_COLUMNS
+from .search import RECORD_SEARCH_FIELDS, refresh_doctor_search_vectors, refresh_medical_record_search_vectors
+from .care import link_care, qualifies, unlink_care
+from .events import publish_appointment_events
+from .rollups import ROLLUP_SOURCE_FIELDS, apply_deltas, appointment_rollup_key, rescale_doctor_fees, rollup_key
+
+_DATE_FIELD = Appointment._meta.get_field('appointment_date')
+_TIME_FIELD = Appointment._meta.get_field('appointment_time')
+
+# Doctor columns that feed the search vector
+SEARCH_VECTOR_SOURCE_FIELDS = {'user', 'specialty', 'bio', 'education'}
+# User columns that feed the doctor search vector
+USER_SEARCH_VECTOR_FIELDS = {'first_name', 'last_name'}
+
+
+def _doctor_user_changed(instance, update_fields, fields):
+    """
+    Whether a User save can touch a doctor's directory data. Only doctor users
+    have a Doctor row, so no query is needed, and partial saves such as the
+    ``last_login`` update on every login are skipped unless they write ``fields``.
+    """
+    if instance.user_type != 'doctor':
+        return False
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_doctor_directory(sender, instance, **kwargs):
+    """Doctor rows feed the doctor list and detail responses and the home page"""
+    bump_version_on_commit('doctors', 'home')
+
+
+@receiver([post_save, post_delete], sender=Specialty)
+def invalidate_specialty_directory(sender, instance, **kwargs):
+    """Specialties are listed on their own and nested inside every doctor"""
+    bump_version_on_commit('specialties', 'doctors', 'home')
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_doctor_user(sender, instance, update_fields=None, **kwargs):
+    """Doctor names, emails and pictures come from the User row"""
+    if _doctor_user_changed(instance, update_fields, set(USER_COLUMNS)):
+        bump_version_on_commit('doctors', 'home')
+
+
+@receiver(post_save, sender=Doctor)
+def refresh_doctor_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_VECTOR_SOURCE_FIELDS.intersection(update_fields):
+        return
+    refresh_doctor_search_vectors(Doctor.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_doctor_user_search_vector(sender, instance, update_fields=None, **kwargs):
+    if not _doctor_user_changed(instance, update_fields, USER_SEARCH_VECTOR_FIELDS):
+        return
+    refresh_doctor_search_vectors(Doctor.objects.filter(user_id=instance.pk))
+
+
+@receiver(post_save, sender=Specialty)
+def refresh_specialty_search_vectors(sender, instance, **kwargs):
+    refresh_doctor_search_vectors(Doctor.objects.filter(specialty_id=instance.pk))
+
+
+@receiver(post_delete, sender=Specialty)
+def refresh_orphaned_search_vectors(sender, instance, **kwargs):
+    """Deleting a specialty nulls Doctor.specialty with a bulk UPDATE, bypassing post_save"""
+    refresh_doctor_search_vectors(Doctor.objects.filter(specialty__isnull=True))
+
+
+@receiver(post_save, sender=MedicalRecord)
+def refresh_medical_record_search_vector(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not set(RECORD_SEARCH_FIELDS).intersection(update_fields)):
+        return
+    refresh_medical_record_search_vectors(MedicalRecord.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_previous_appointment(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Load the stored row's rollup key, care pair and start so post_save can move them"""
+    instance._rollup_previous = instance._care_previous = instance._start_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {
+            *ROLLUP_SOURCE_FIELDS, 'doctor_id', 'patient', 'patient_id', 'appointment_time'}.intersection(update_fields):
+        return
+    previous = Appointment.objects.filter(pk=instance.pk).values_list(
+        'appointment_date', 'doctor_id', 'status', 'payment_status', 'patient_id', 'appointment_time'
+    ).first()
+    if previous:
+        instance._rollup_previous = rollup_key(*previous[:4])
+        instance._care_previous = (previous[1], previous[4])
+        instance._start_previous = (_DATE_FIELD.to_python(previous[0]), _TIME_FIELD.to_python(previous[5]))
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = appointment_rollup_key(instance)
+    previous = getattr(instance, '_rollup_previous', None)
+    if created:
+        apply_deltas({current: 1})
+    elif previous is not None and previous != current:
+        apply_deltas({previous: -1, current: 1})
+
+
+@receiver(post_save, sender=Appointment)
+def reset_rescheduled_reminders(sender, instance, created, raw=False, **kwargs):
+    """A reminder names the old date and time, so a moved appointment is reminded afresh"""
+    previous = getattr(instance, '_start_previous', None)
+    if raw or created or previous is None:
+        return
+    current = (_DATE_FIELD.to_python(instance.appointment_date), _TIME_FIELD.to_python(instance.appointment_time))
+    if previous != current:
+        AppointmentReminder.objects.filter(appointment=instance).delete()
+
+
+@receiver(post_save, sender=Appointment)
+def push_appointment_event(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        publish_appointment_events('created' if created else 'updated', [instance])
+
+
+@receiver(pre_save, sender=MedicalRecord)
+def remember_record_care_pair(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._care_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {'doctor', 'doctor_id', 'patient', 'patient_id'}.intersection(update_fields):
+        return
+    instance._care_previous = MedicalRecord.objects.filter(pk=instance.pk).values_list('doctor_id', 'patient_id').first()
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=MedicalRecord)
+def sync_care_relationship(sender, instance, raw=False, **kwargs):
+    """Link the pair while it has a qualifying source; unlink the pair a change took the source from"""
+    if raw:
+        return
+    pair = (instance.doctor_id, instance.patient_id)
+    previous = getattr(instance, '_care_previous', None)
+    stale = {previous} if previous is not None and previous != pair else set()
+    if sender is MedicalRecord or qualifies(instance):
+        link_care([pair])
+    else:
+        stale.add(pair)
+    unlink_care(stale)
+
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=ArchivedAppointment)
+@receiver(post_delete, sender=MedicalRecord)
+def remove_care_relationship(sender, instance, **kwargs):
+    unlink_care([(instance.doctor_id, instance.patient_id)])
+
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=ArchivedAppointment)
+def remove_appointment_from_rollup(sender, instance, **kwargs):
+    apply_deltas({appointment_rollup_key(instance): -1})
+
+
+@receiver(post_save, sender=Doctor)
+def rescale_rollup_fees(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and 'consultation_fee' not in update_fields):
+        return
+    rescale_doctor_fees(instance)
@@ -0,0 +1,176 @@
+"""
+Open-slot computation.
+
+A doctor's week is described by their TimeSlot rows (falling back to
+Doctor.available_days/start_time/end_time when they have none). For a date
+window we:
+
+1. load every template interval for the requested doctors in one query and
+   merge overlapping intervals per (doctor, weekday);
+2. cut each merged week day into fixed-length slot starts once, not per date;
+3. load every non-cancelled appointment in the window in one query;
+4. walk the dates, reusing the precomputed weekday slots and subtracting the
+   booked intervals with a sorted sweep.
+
+So the number of queries is constant (three) regardless of the number of
+doctors or days, and dates without bookings cost a list lookup.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from django.conf import settings
+from django.utils import timezone
+from .models import Appointment, Doctor, TimeSlot, WEEKDAYS
+
+MAX_WINDOW_DAYS = 90
+
+
+def get_slot_minutes():
+    return getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+@lru_cache(maxsize=None)
+def _label(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def merge_intervals(intervals):
+    """Merge overlapping or touching ``(start, end)`` minute intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _slot_starts(intervals, slot_minutes):
+    starts = []
+    for start, end in merge_intervals(intervals):
+        starts.extend(range(start, end - slot_minutes + 1, slot_minutes))
+    return starts
+
+
+def weekly_templates(doctor_ids, slot_minutes):
+    """
+    ``{doctor_id: {weekday_index: [slot start minutes, ...]}}`` built from
+    the available TimeSlot rows, or from the doctor's working hours when they
+    have no TimeSlot rows at all (a doctor whose templates are all switched
+    off is not bookable).
+    Doctors who are not taking appointments (``Doctor.is_available``) get none.
+    """
+    intervals = defaultdict(lambda: defaultdict(list))
+    weekday_index = {day: index for index, day in enumerate(WEEKDAYS)}
+    templated = set()
+
+    for doctor_id, day, start, end, available in TimeSlot.objects.filter(
+        doctor_id__in=doctor_ids, doctor__is_available=True,
+    ).values_list('doctor_id', 'day_of_week', 'start_time', 'end_time', 'is_available'):
+        templated.add(doctor_id)
+        if available and day in weekday_index and end > start:
+            intervals[doctor_id][weekday_index[day]].append((_minutes(start), _minutes(end)))
+
+    fallback = Doctor.objects.filter(
+        id__in=[pk for pk in doctor_ids if pk not in templated],
+        is_available=True, start_time__isnull=False, end_time__isnull=False,
+    ).values_list('id', 'available_weekdays', 'start_time', 'end_time')
+    for doctor_id, mask, start, end in fallback:
+        if end <= start:
+            continue
+        for index in range(len(WEEKDAYS)):
+            if mask & (1 << index):
+                intervals[doctor_id][index].append((_minutes(start), _minutes(end)))
+
+    return {
+        doctor_id: {
+            index: _slot_starts(day_intervals, slot_minutes)
+            for index, day_intervals in days.items()
+        }
+        for doctor_id, days in intervals.items()
+    }
+
+
+def booked_starts(doctor_ids, start_date, end_date):
+    """``{(doctor_id, date): sorted [start minutes, ...]}`` of non-cancelled appointments"""
+    booked = defaultdict(list)
+    for doctor_id, day, at in Appointment.objects.filter(
+        doctor_id__in=doctor_ids,
+        appointment_date__gte=start_date,
+        appointment_date__lte=end_date,
+    ).exclude(status='cancelled').values_list('doctor_id', 'appointment_date', 'appointment_time'):
+        booked[(doctor_id, day)].append(_minutes(at))
+    for starts in booked.values():
+        starts.sort()
+    return booked
+
+
+def _subtract(candidates, booked, slot_minutes):
+    """Drop candidate starts overlapping any booked [t, t + slot) interval"""
+    free = []
+    for start in candidates:
+        # First booking that could still overlap this candidate
+        index = bisect_left(booked, start - slot_minutes + 1)
+        if index < len(booked) and booked[index] < start + slot_minutes:
+            continue
+        free.append(start)
+    return free
+
+
+def open_slots(doctor_ids, start_date, days, slot_minutes=None, now=None):
+    """
+    Free appointment start times for each doctor over ``days`` days from
+    ``start_date``: ``{doctor_id: [{'date': date, 'slots': ['09:00', ...]}, ...]}``.
+    Dates without any free slot are omitted and slots in the past are skipped.
+    """
+    slot_minutes = slot_minutes or get_slot_minutes()
+    doctor_ids = list(doctor_ids)
+    end_date = start_date + timedelta(days=days - 1)
+    now = timezone.localtime(now or timezone.now())
+
+    templates = weekly_templates(doctor_ids, slot_minutes)
+    booked = booked_starts(doctor_ids, start_date, end_date)
+    result = {}
+    for doctor_id in doctor_ids:
+        week = templates.get(doctor_id, {})
+        dates = []
+        for offset in range(days):
+            day = start_date + timedelta(days=offset)
+            candidates = week.get(day.weekday())
+            if not candidates or day < now.date():
+                continue
+            if day == now.date():
+                cutoff = _minutes(now) + 1
+                candidates = candidates[bisect_left(candidates, cutoff):]
+            taken = booked.get((doctor_id, day))
+            if taken:
+                candidates = _subtract(candidates, taken, slot_minutes)
+            if candidates:
+                dates.append({
+                    'date': day,
+                    'slots': [_label(start) for start in candidates],
+                })
+        result[doctor_id] = dates
+    return result
+
+
+def parse_window(params, default_days=14):
+    """Validate ``start`` (date, default today) and ``days`` query parameters"""
+    start = params.get('start')
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else timezone.localdate()
+    except ValueError:
+        raise ValueError('start must be a date in YYYY-MM-DD format')
+    try:
+        days = int(params.get('days', default_days))
+    except ValueError:
+        raise ValueError('days must be an integer')
+    if not 1 <= days <= MAX_WINDOW_DAYS:
+        raise ValueError(f'days must be between 1 and {MAX_WINDOW_DAYS}')
+    return start_date, days
@@ -0,0 +1,113 @@
+"""
+Admin dashboard statistics computed with aggregate SQL.
+
+Appointment figures are summed from DailyAppointmentRollup (see
+hospital/rollups.py), whose size grows with days x doctors rather than
+appointments; only the five most recent appointments are read from the
+appointment table, through its created_at index. The number of queries (six)
+and the response size stay the same however much data exists. Revenue is the
+consultation fee of the doctor for each paid appointment (appointments carry
+no amount of their own).
+"""
+from datetime import date
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from .models import Appointment, DailyAppointmentRollup, Doctor, Patient
+
+DEFAULT_TREND_MONTHS = 6
+MAX_TREND_MONTHS = 24
+
+_ZERO = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _month_starts(today, months):
+    """First day of each of the last ``months`` months, oldest first"""
+    year, month = today.year, today.month
+    starts = []
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def appointment_totals():
+    statuses = [choice for choice, _ in Appointment.STATUS_CHOICES]
+    totals = DailyAppointmentRollup.objects.aggregate(
+        total=Coalesce(Sum('appointments'), 0),
+        revenue=Coalesce(Sum('fee_total', filter=Q(payment_status='paid')), _ZERO),
+        **{status: Coalesce(Sum('appointments', filter=Q(status=status)), 0) for status in statuses},
+    )
+    by_status = {status: totals.pop(status) for status in statuses}
+    return {'appointments': totals['total'], 'revenue': totals['revenue']}, by_status
+
+
+def monthly_trend(months=DEFAULT_TREND_MONTHS, today=None):
+    """Appointments per month of their date for the last ``months`` months, zero-filled"""
+    today = today or timezone.localdate()
+    starts = _month_starts(today, months)
+    next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    counts = {
+        (row['month'].year, row['month'].month): row['count']
+        for row in DailyAppointmentRollup.objects.filter(day__gte=starts[0], day__lt=next_month)
+        .annotate(month=TruncMonth('day'))
+        .values('month').annotate(count=Sum('appointments')).order_by()
+    }
+    return [
+        {'month': start.strftime('%Y-%m'), 'appointments': counts.get((start.year, start.month), 0)}
+        for start in starts
+    ]
+
+
+def revenue_by_specialty():
+    rows = (
+        DailyAppointmentRollup.objects.filter(payment_status='paid', appointments__gt=0)
+        .values('doctor__specialty__name')
+        .annotate(revenue=Sum('fee_total'), count=Sum('appointments'))
+        .order_by('-revenue')
+    )
+    return [
+        {
+            'specialty': row['doctor__specialty__name'] or 'Unassigned',
+            'revenue': row['revenue'],
+            'appointments': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def recent_appointments(limit=5):
+    rows = Appointment.objects.order_by('-created_at', '-id').values_list(
+        'id', 'appointment_date', 'appointment_time', 'status', 'payment_status',
+        'doctor__user__first_name', 'doctor__user__last_name', 'doctor__specialty__name',
+        'patient__user__first_name', 'patient__user__last_name',
+    )[:limit]
+    return [
+        {
+            'id': pk,
+            'date': day,
+            'time': at,
+            'status': status,
+            'payment_status': payment_status,
+            'doctor_name': f'{doctor_first} {doctor_last}'.strip(),
+            'specialty': specialty,
+            'patient_name': f'{patient_first} {patient_last}'.strip(),
+        }
+        for (pk, day, at, status, payment_status, doctor_first, doctor_last,
+             specialty, patient_first, patient_last) in rows
+    ]
+
+
+def dashboard_stats(months=DEFAULT_TREND_MONTHS, today=None):
+    totals, by_status = appointment_totals()
+    return {
+        'totals': {
+            'doctors': Doctor.objects.count(),
+            'patients': Patient.objects.count(),
+            **totals,
+        },
+        'appointments_by_status': by_status,
+        'monthly_trend': monthly_trend(months, today),
+        'revenue_by_specialty': revenue_by_specialty(),
+        'recent_appointments': recent_appointments(),
+    }
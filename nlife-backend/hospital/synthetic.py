@@ -0,0 +1,178 @@
+"""
+Synthetic data builders for the benchmark management commands.
+
+Everything here uses bulk_create so large tables can be seeded quickly.
+Callers are expected to run inside a transaction they roll back afterwards.
+"""
+import random
+from decimal import Decimal
+from datetime import date, datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from .models import Specialty, Doctor, Patient, Appointment, MedicalRecord, WEEKDAYS, weekday_mask
+from .care import link_care, qualifies
+from .rollups import rebuild_rollups
+from .search import refresh_medical_record_search_vectors
+
+User = get_user_model()
+
+SPECIALTY_NAMES = [
+    'General physician', 'Cardiologist', 'Dermatologist', 'Neurologist', 'Orthopedic',
+    'Pediatrician', 'Psychiatrist', 'Gynecologist', 'Ophthalmologist', 'Dentist',
+]
+FIRST_NAMES = ['John', 'Sarah', 'Michael', 'Emily', 'Robert', 'Priya', 'Ahmed', 'Li', 'Maria', 'David']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Davis', 'Nair', 'Khan', 'Wang', 'Garcia', 'Miller']
+DIAGNOSES = [
+    'Essential hypertension', 'Type 2 diabetes mellitus', 'Acute bronchitis', 'Migraine without aura',
+    'Iron deficiency anaemia', 'Atopic dermatitis', 'Gastroesophageal reflux disease', 'Lower back pain',
+    'Generalised anxiety disorder', 'Community acquired pneumonia', 'Hypothyroidism', 'Allergic rhinitis',
+    'Osteoarthritis of the knee', 'Urinary tract infection', 'Asthma exacerbation', 'Vitamin D deficiency',
+    'Atrial fibrillation', 'Otitis media', 'Conjunctivitis', 'Dental caries',
+]
+PRESCRIPTIONS = [
+    'Amlodipine 5mg once daily', 'Metformin 500mg twice daily', 'Amoxicillin 500mg three times daily for 7 days',
+    'Sumatriptan 50mg as needed', 'Ferrous sulfate 325mg daily', 'Hydrocortisone cream twice daily',
+    'Omeprazole 20mg before breakfast', 'Ibuprofen 400mg as needed', 'Sertraline 50mg daily',
+    'Levothyroxine 50mcg daily', 'Cetirizine 10mg daily', 'Salbutamol inhaler as needed',
+    'Paracetamol 1g up to four times daily', 'Cholecalciferol 1000 IU daily', 'Apixaban 5mg twice daily',
+]
+NOTES = [
+    'Follow up in {weeks} weeks.', 'Advised lifestyle changes and regular exercise.', 'Blood pressure {bp}.',
+    'Review blood results at next visit.', 'Patient reports improvement since last visit.',
+    'Referred to {specialty} for further assessment.', 'No known drug allergies.', 'Symptoms for {days} days.',
+]
+
+
+def analyze(*models):
+    """Refresh planner statistics so freshly seeded (uncommitted) rows are costed realistically"""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def seed_specialties():
+    specialties = []
+    for name in SPECIALTY_NAMES:
+        specialty, _ = Specialty.objects.get_or_create(
+            name=name, defaults={'description': f'{name} services'}
+        )
+        specialties.append(specialty)
+    return specialties
+
+
+def seed_doctors(count, prefix='bench', batch_size=2000, seed=0):
+    """Create ``count`` doctor users and profiles, returning the Doctor objects"""
+    rng = random.Random(seed)
+    specialties = seed_specialties()
+    password = make_password(None)
+
+    users = User.objects.bulk_create([
+        User(
+            email=f'{prefix}.doctor{i}@example.com',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            user_type='doctor',
+            gender=rng.choice(['male', 'female']),
+            password=password,
+        )
+        for i in range(count)
+    ], batch_size=batch_size)
+
+    doctors = []
+    for user in users:
+        specialty = rng.choice(specialties)
+        days = sorted(rng.sample(range(7), rng.randint(2, 6)))
+        available_days = ','.join(WEEKDAYS[d] for d in days)
+        doctors.append(Doctor(
+            user=user,
+            specialty=specialty,
+            bio=f'{specialty.name} with a focus on {rng.choice(["prevention", "surgery", "chronic care", "diagnostics"])}.',
+            education=f'MD, {rng.choice(["Harvard", "Stanford", "AIIMS", "Oxford", "Yale"])} Medical School',
+            experience_years=rng.randint(1, 35),
+            consultation_fee=Decimal(rng.randrange(50, 500, 10)),
+            available_days=available_days,
+            available_weekdays=weekday_mask(available_days),
+            start_time=time(9, 0),
+            end_time=time(17, 0),
+            is_available=rng.random() < 0.9,
+            is_featured=rng.random() < 0.05,
+        ))
+    return Doctor.objects.bulk_create(doctors, batch_size=batch_size)
+
+
+def seed_patients(count, prefix='bench', batch_size=2000, seed=0):
+    """Create ``count`` patient users and profiles, returning the Patient objects"""
+    rng = random.Random(seed)
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(
+            email=f'{prefix}.patient{i}@example.com',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            user_type='patient',
+            password=password,
+        )
+        for i in range(count)
+    ], batch_size=batch_size)
+    return Patient.objects.bulk_create([Patient(user=user) for user in users], batch_size=batch_size)
+
+
+def seed_appointments(count, doctors, patients, start=None, batch_size=5000, seed=0):
+    """
+    Create ``count`` appointments spread round-robin over ``doctors`` and
+    randomly over ``patients``. Every doctor's appointments get consecutive
+    30 minute slots (16 per day) so the active-slot constraint always holds.
+    """
+    rng = random.Random(seed)
+    start = start or date.today()
+    statuses = [choice for choice, _ in Appointment.STATUS_CHOICES]
+    payments = [choice for choice, _ in Appointment.PAYMENT_STATUS_CHOICES]
+    appointments = []
+    for i in range(count):
+        slot = i // len(doctors)
+        appointments.append(Appointment(
+            doctor=doctors[i % len(doctors)],
+            patient=rng.choice(patients),
+            appointment_date=start + timedelta(days=slot // 16),
+            appointment_time=(datetime.combine(start, time(9)) + timedelta(minutes=30 * (slot % 16))).time(),
+            reason='Synthetic appointment',
+            status=rng.choice(statuses),
+            payment_status=rng.choice(payments),
+        ))
+    appointments = Appointment.objects.bulk_create(appointments, batch_size=batch_size)
+    if appointments:
+        # bulk_create bypasses the signals that maintain the daily rollups and care relationships
+        rebuild_rollups(start, max(appointment.appointment_date for appointment in appointments))
+        link_care({(appointment.doctor_id, appointment.patient_id) for appointment in appointments
+                   if qualifies(appointment)})
+    return appointments
+
+
+def seed_medical_records(count, doctors, patients, batch_size=5000, seed=0):
+    """
+    Create ``count`` medical records with varied diagnosis, prescription and
+    notes text spread randomly over ``doctors`` and ``patients``.
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        notes = ' '.join(rng.sample(NOTES, rng.randint(1, 3))).format(
+            weeks=rng.randint(1, 12), days=rng.randint(1, 30), specialty=rng.choice(SPECIALTY_NAMES).lower(),
+            bp=f'{rng.randint(100, 180)}/{rng.randint(60, 110)}',
+        )
+        records.append(MedicalRecord(
+            doctor=rng.choice(doctors),
+            patient=rng.choice(patients),
+            diagnosis=rng.choice(DIAGNOSES),
+            prescription=rng.choice(PRESCRIPTIONS) if rng.random() < 0.8 else None,
+            notes=notes,
+        ))
+    records = MedicalRecord.objects.bulk_create(records, batch_size=batch_size)
+    if records:
+        # bulk_create bypasses the signals that maintain search vectors and care relationships
+        refresh_medical_record_search_vectors(MedicalRecord.objects.filter(id__gte=min(record.id for record in records)))
+        link_care({(record.doctor_id, record.patient_id) for record in records})
+    return records
@@ -1,3 +1,1093 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import threading
+import warnings
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+from unittest import mock, skipUnless
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .cache import get_version
+from .archive import archive_appointments
+from .booking import bulk_book_appointments, bulk_update_status
+from .care import has_care_relationship, rebuild_care_relationships
+from .events import STAFF_CHANNEL, user_channel
+from .home import HOME_FEATURED_LIMIT
+from .models import Appointment, AppointmentReminder, ArchivedAppointment, TimeSlot, CareRelationship, DailyAppointmentRollup, Doctor, MedicalRecord
+from .reminders import CLAIM_TIMEOUT, MAX_ATTEMPTS, BaseSink, run_reminders
+from .rollups import rebuild_rollups
+from .search import refresh_doctor_search_vectors, search_vector_supported
+from .slots import open_slots
+from .stats import dashboard_stats
+from .synthetic import seed_appointments, seed_doctors, seed_medical_records, seed_patients
+from .views import _event_stream_user
 
-# Create your tests here.
+
+# my_appointments: the caller's patient or doctor profile, then the page with both users joined in
+QUERIES_PER_PAGE = 2
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class HospitalTestCase(TestCase):
+    def setUp(self):
+        # The directory cache lives outside the test transaction
+        cache.clear()
+        self.client = APIClient()
+
+
+class DoctorFieldsetTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = seed_doctors(1, prefix='fieldset')[0]
+
+    def test_retrieve_without_relations(self):
+        response = self.client.get(f'/api/doctors/{self.doctor.id}/?fields=id,consultation_fee')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'id', 'consultation_fee'})
+
+    def test_retrieve_hides_internal_columns(self):
+        response = self.client.get(f'/api/doctors/{self.doctor.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('available_days', response.json())
+        self.assertFalse({'available_weekdays', 'search_vector'} & set(response.json()))
+
+    def test_retrieve_with_one_relation(self):
+        response = self.client.get(f'/api/doctors/{self.doctor.id}/?fields=id,user.email')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': self.doctor.id, 'user': {'email': self.doctor.user.email}})
+
+
+class DirectoryCacheTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = seed_doctors(1, prefix='cached')[0]
+
+    def get_doctors(self):
+        response = self.client.get('/api/doctors/')
+        return response['X-Cache'], {row['id']: row for row in response.json()}
+
+    def test_commit_invalidates_cached_list(self):
+        self.assertEqual(self.get_doctors()[0], 'MISS')
+        self.assertEqual(self.get_doctors()[0], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.user.first_name = 'Renamed'
+            self.doctor.user.save()
+        state, rows = self.get_doctors()
+        self.assertEqual(state, 'MISS')
+        self.assertEqual(rows[self.doctor.id]['user']['first_name'], 'Renamed')
+
+    def test_rolled_back_write_keeps_version(self):
+        version = get_version('doctors')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.doctor.bio = 'Never committed'
+                self.doctor.save()
+                transaction.set_rollback(True)
+        self.assertEqual(get_version('doctors'), version)
+
+    def test_bump_waits_for_commit(self):
+        version = get_version('doctors')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.doctor.save()
+            self.assertEqual(get_version('doctors'), version)
+        self.assertTrue(callbacks)
+
+    def test_login_update_is_free(self):
+        version = get_version('doctors')
+        user = self.doctor.user
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_version('doctors'), version)
+
+    def test_patient_save_does_not_invalidate(self):
+        patient = seed_patients(1, prefix='cached')[0]
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(1):
+            patient.user.first_name = 'Changed'
+            patient.user.save()
+        self.assertEqual(callbacks, [])
+
+
+class HomePayloadTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctors = seed_doctors(12, prefix='home')
+        Doctor.objects.update(is_featured=True, is_available=True)
+        Doctor.objects.filter(id=self.doctors[0].id).update(is_available=False)
+
+    def get_home(self):
+        response = self.client.get('/api/home/')
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], response.json()
+
+    def test_payload_shape(self):
+        _, payload = self.get_home()
+        self.assertEqual(set(payload), {'featured_doctors', 'specialties', 'stats'})
+        available = Doctor.objects.filter(is_available=True)
+        expected = available.order_by('-experience_years', 'id').values_list('id', flat=True)[:HOME_FEATURED_LIMIT]
+        self.assertEqual([row['id'] for row in payload['featured_doctors']], list(expected))
+        self.assertEqual(set(payload['featured_doctors'][0]), set(self.client.get('/api/doctors/').json()[0]))
+        counts = {row['id']: row['doctor_count'] for row in payload['specialties']}
+        for specialty_id, count in counts.items():
+            self.assertEqual(count, available.filter(specialty_id=specialty_id).count())
+        self.assertEqual(payload['stats']['doctors'], 11)
+        self.assertEqual(payload['stats']['featured_doctors'], 11)
+        self.assertEqual(payload['stats']['specialties'], len(counts))
+
+    def test_doctor_change_bumps_the_cache(self):
+        self.assertEqual(self.get_home()[0], 'MISS')
+        self.assertEqual(self.get_home()[0], 'HIT')
+        version = get_version('home')
+        featured = self.get_home()[1]['featured_doctors'][0]['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            doctor = Doctor.objects.get(id=featured)
+            doctor.is_featured = False
+            doctor.save()
+        self.assertNotEqual(get_version('home'), version)
+        state, payload = self.get_home()
+        self.assertEqual(state, 'MISS')
+        self.assertNotIn(featured, [row['id'] for row in payload['featured_doctors']])
+        self.assertEqual(payload['stats']['featured_doctors'], 10)
+
+
+class DoctorFilterTests(HospitalTestCase):
+    def test_fee_range(self):
+        doctors = seed_doctors(6, prefix='fee')
+        low = min(doctor.consultation_fee for doctor in doctors)
+        response = self.client.get(f'/api/doctors/?max_fee={low}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json())
+        self.assertTrue(all(Decimal(row['consultation_fee']) <= low for row in response.json()))
+
+    def test_non_finite_fees_are_rejected(self):
+        for query in ('min_fee=NaN', 'max_fee=Infinity', 'min_fee=-inf', 'max_fee=sNaN', 'min_fee=abc'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/doctors/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+
+class DoctorSearchTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.named, self.mentioned, self.other = seed_doctors(3, prefix='search')
+        self.named.user.last_name = 'Hartley'
+        self.named.user.save()
+        self.mentioned.bio = 'Trained under Dr Hartley.'
+        self.mentioned.save()
+        refresh_doctor_search_vectors()
+
+    def search(self, text):
+        response = self.client.get(f'/api/doctors/?search={text}')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()]
+
+    def test_partial_words_match_names_and_bio(self):
+        self.assertEqual(set(self.search('hart')), {self.named.id, self.mentioned.id})
+        self.assertEqual(self.search('hartley%20zzz'), [])
+
+    def test_name_matches_rank_first(self):
+        ids = self.search('hartley')
+        if search_vector_supported():
+            self.assertEqual(ids, [self.named.id, self.mentioned.id])
+        else:
+            # The icontains fallback matches the same doctors, unranked
+            self.assertEqual(set(ids), {self.named.id, self.mentioned.id})
+
+
+class KeysetCursorTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        doctors = seed_doctors(2, prefix='cursor')
+        self.patient = seed_patients(1, prefix='cursor')[0]
+        seed_appointments(5, doctors, [self.patient])
+        self.client.force_authenticate(self.patient.user)
+
+    def test_pages_follow_next(self):
+        response = self.client.get('/api/appointments/my_appointments/?page_size=2')
+        ids = [row['id'] for row in response.json()['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            ids += [row['id'] for row in response.json()['results']]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_malformed_cursors_are_rejected(self):
+        for token in ('not-base64!', cursor(['a']), cursor(['2026-01-01T00:00:00+00:00', 'a']),
+                      cursor(['yesterday', 1]), cursor([None, 1]), cursor({'id': 1})):
+            with self.subTest(token=token):
+                response = self.client.get(f'/api/appointments/my_appointments/?cursor={token}')
+                self.assertEqual(response.status_code, 404)
+
+    def test_doctor_directory_rejects_malformed_cursor(self):
+        response = self.client.get(f"/api/doctors/?cursor={cursor(['a'])}")
+        self.assertEqual(response.status_code, 404)
+
+    def test_change_feed_rejects_malformed_cursor(self):
+        response = self.client.get(f"/api/appointments/changes/?since={cursor(['2026-01-01T00:00:00+00:00', 'a'])}")
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeFeedTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        doctors = seed_doctors(1, prefix='feed')
+        self.patient = seed_patients(1, prefix='feed')[0]
+        seed_appointments(3, doctors, [self.patient])
+        Appointment.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.client.force_authenticate(self.patient.user)
+
+    def poll(self, since=None):
+        response = self.client.get('/api/appointments/changes/' + (f'?since={since}' if since else ''))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_resumes_after_the_last_change(self):
+        first = self.poll()
+        self.assertEqual(len(first['results']), 3)
+        appointment = Appointment.objects.get(id=first['results'][0]['id'])
+        appointment.reason = 'Follow-up'
+        appointment.save()
+        # Unsettled until SETTLE_SECONDS have passed
+        self.assertEqual(self.poll(first['cursor'])['results'], [])
+        with mock.patch('hospital.changes.timezone.now', return_value=timezone.now() + timedelta(minutes=1)):
+            second = self.poll(first['cursor'])
+        self.assertEqual([row['id'] for row in second['results']], [appointment.id])
+
+    def test_empty_poll_returns_the_same_cursor(self):
+        first = self.poll()
+        again = self.poll(first['cursor'])
+        self.assertEqual((again['results'], again['cursor'], again['has_more']), ([], first['cursor'], False))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite runs one write transaction at a time')
+class ChangeFeedLateCommitTests(TransactionTestCase):
+    """A transaction that commits long after stamping updated_at is not skipped"""
+
+    def setUp(self):
+        self.doctors = seed_doctors(2, prefix='late')
+        self.patient = seed_patients(1, prefix='late')[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient.user)
+
+    def book(self, doctor, day):
+        # Separate doctors and days, so the two bookings share no rollup or care rows to wait on
+        return Appointment.objects.create(doctor=doctor, patient=self.patient, appointment_date=day,
+                                          appointment_time='09:00')
+
+    def poll(self, since=None):
+        # Long after every stamp below, so only the open transaction holds the feed back
+        with mock.patch('hospital.changes.timezone.now', return_value=timezone.now() + timedelta(hours=1)):
+            response = self.client.get('/api/appointments/changes/' + (f'?since={since}' if since else ''))
+        return response.json()
+
+    def test_late_commit_is_delivered(self):
+        stamped, release = threading.Event(), threading.Event()
+
+        def slow_booking():
+            try:
+                with transaction.atomic():
+                    self.slow = self.book(self.doctors[0], date(2031, 1, 6))
+                    stamped.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=slow_booking)
+        writer.start()
+        stamped.wait(10)
+        fast = self.book(self.doctors[1], date(2031, 1, 7))
+        first = self.poll()
+        release.set()
+        writer.join()
+        self.assertEqual(first['results'], [])
+        second = self.poll(first['cursor'])
+        self.assertEqual([row['id'] for row in second['results']], [self.slow.id, fast.id])
+
+
+class CareTestCase(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor, self.other_doctor = seed_doctors(2, prefix='care')
+        self.patient, self.other_patient = seed_patients(2, prefix='care')
+
+    def book(self, user, doctor=None, patient=None, at='10:00'):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/appointments/', {
+            'doctor': (doctor or self.doctor).id, 'patient': (patient or self.patient).id,
+            'appointment_date': '2030-01-07', 'appointment_time': at,
+        })
+
+    def can_see_records(self, doctor=None):
+        self.client.force_authenticate((doctor or self.doctor).user)
+        return self.client.get(f'/api/patients/{self.patient.id}/medical_records/').status_code == 200
+
+
+class CareRelationshipTests(CareTestCase):
+    def test_booking_grants_and_cancelling_revokes(self):
+        self.assertFalse(self.can_see_records())
+        response = self.book(self.patient.user)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(self.can_see_records())
+        appointment = Appointment.objects.get(doctor=self.doctor, patient=self.patient)
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertFalse(self.can_see_records())
+
+    def test_access_survives_while_another_source_remains(self):
+        self.book(self.patient.user, at='10:00')
+        self.book(self.patient.user, at='11:00')
+        first, second = Appointment.objects.filter(doctor=self.doctor, patient=self.patient).order_by('id')
+        first.delete()
+        self.assertTrue(has_care_relationship(self.doctor.id, self.patient.id))
+        second.delete()
+        self.assertFalse(has_care_relationship(self.doctor.id, self.patient.id))
+
+    def test_records_count_until_deleted(self):
+        record = MedicalRecord.objects.create(doctor=self.doctor, patient=self.patient, diagnosis='Migraine')
+        self.assertTrue(self.can_see_records())
+        record.doctor = self.other_doctor
+        record.save()
+        self.assertFalse(self.can_see_records())
+        self.assertTrue(self.can_see_records(self.other_doctor))
+        record.delete()
+        self.assertFalse(self.can_see_records(self.other_doctor))
+
+    def test_bulk_status_cancellation_revokes(self):
+        self.book(self.patient.user)
+        appointment = Appointment.objects.get(doctor=self.doctor, patient=self.patient)
+        staff = seed_patients(1, prefix='care-staff')[0].user
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(staff)
+        response = self.client.post('/api/appointments/bulk_status/',
+                                    [{'id': appointment.id, 'status': 'cancelled'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(has_care_relationship(self.doctor.id, self.patient.id))
+
+    def test_cannot_book_for_someone_else(self):
+        response = self.book(self.other_patient.user)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(has_care_relationship(self.doctor.id, self.patient.id))
+        response = self.book(self.other_doctor.user)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.book(self.doctor.user).status_code, 201)
+
+    def test_rebuild_resyncs(self):
+        self.book(self.patient.user)
+        CareRelationship.objects.create(doctor=self.other_doctor, patient=self.other_patient)
+        CareRelationship.objects.filter(doctor=self.doctor).delete()
+        self.assertEqual(rebuild_care_relationships(), (1, 1))
+        self.assertEqual(set(CareRelationship.objects.values_list('doctor_id', 'patient_id')),
+                         {(self.doctor.id, self.patient.id)})
+
+
+class MedicalRecordCreateTests(CareTestCase):
+    def write_record(self, user, doctor=None, patient=None, **extra):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/medical-records/', {
+            'doctor': (doctor or self.doctor).id, 'patient': (patient or self.patient).id,
+            'diagnosis': 'Migraine', **extra,
+        })
+
+    def test_doctor_cannot_grant_themselves_access(self):
+        self.assertFalse(self.can_see_records())
+        self.assertEqual(self.write_record(self.doctor.user).status_code, 400)
+        self.assertFalse(self.can_see_records())
+        self.assertFalse(MedicalRecord.objects.exists())
+
+    def test_doctor_writes_for_their_patients_only_as_themselves(self):
+        self.book(self.patient.user)
+        self.assertEqual(self.write_record(self.doctor.user, doctor=self.other_doctor).status_code, 400)
+        self.assertEqual(self.write_record(self.doctor.user).status_code, 201)
+        self.assertFalse(has_care_relationship(self.other_doctor.id, self.patient.id))
+
+    def test_patients_cannot_write_records(self):
+        self.book(self.patient.user)
+        self.assertEqual(self.write_record(self.patient.user).status_code, 403)
+        response = self.write_record(self.other_patient.user, doctor=self.other_doctor, patient=self.patient)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(MedicalRecord.objects.exists())
+        self.assertFalse(has_care_relationship(self.other_doctor.id, self.patient.id))
+
+    def test_staff_write_any_pair_with_a_matching_appointment(self):
+        staff = seed_patients(1, prefix='record-staff')[0].user
+        staff.is_staff = True
+        staff.save()
+        self.book(self.patient.user)
+        appointment = Appointment.objects.get(doctor=self.doctor, patient=self.patient)
+        response = self.write_record(staff, doctor=self.other_doctor, appointment=appointment.id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.write_record(staff, doctor=self.other_doctor).status_code, 201)
+        self.assertTrue(has_care_relationship(self.other_doctor.id, self.patient.id))
+
+class MedicalRecordSearchTests(CareTestCase):
+    def setUp(self):
+        super().setUp()
+        self.own = MedicalRecord.objects.create(doctor=self.doctor, patient=self.patient,
+                                                diagnosis='Migraine <b>severe</b>, pain 7 <8', notes='Rest & fluids')
+        self.others = MedicalRecord.objects.create(doctor=self.other_doctor, patient=self.other_patient,
+                                                   diagnosis='Migraine with aura')
+
+    def search(self, user, text='migr'):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/medical-records/search/?q={text}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_results_are_scoped_to_the_user(self):
+        self.assertEqual([row['id'] for row in self.search(self.patient.user)], [self.own.id])
+        self.assertEqual([row['id'] for row in self.search(self.other_doctor.user)], [self.others.id])
+        staff = self.patient.user
+        staff.is_staff = True
+        staff.save()
+        self.assertEqual({row['id'] for row in self.search(staff)}, {self.own.id, self.others.id})
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        row = self.search(self.patient.user, 'migraine%20fluids')[0]
+        if not search_vector_supported():
+            self.assertIsNone(row['snippet'])
+            return
+        self.assertIn('<mark>Migraine</mark>', row['snippet'])
+        self.assertIn('<mark>fluids</mark>', row['snippet'])
+        self.assertIn('&lt;8', row['snippet'])
+        self.assertIn('Rest &amp;', row['snippet'])
+        # Only the highlight markup is left unescaped
+        self.assertNotIn('<', row['snippet'].replace('<mark>', '').replace('</mark>', ''))
+
+    def test_query_without_terms(self):
+        self.client.force_authenticate(self.patient.user)
+        self.assertEqual(self.client.get('/api/medical-records/search/?q=').status_code, 400)
+        self.assertEqual(self.search(self.patient.user, '%21%21'), [])
+
+
+class TimelineTests(CareTestCase):
+    def setUp(self):
+        super().setUp()
+        third = seed_doctors(1, prefix='timeline')[0]
+        tie = timezone.make_aware(datetime(2020, 1, 7, 10, 0))
+        self.tied = [
+            Appointment.objects.create(doctor=doctor, patient=self.patient, appointment_date=tie.date(),
+                                       appointment_time=tie.time()).id
+            for doctor in (self.doctor, self.other_doctor, third)
+        ]
+        self.later = Appointment.objects.create(doctor=self.doctor, patient=self.patient,
+                                                appointment_date=tie.date(), appointment_time='11:00').id
+        # Archived appointments share the tie too
+        Appointment.objects.filter(id=self.tied[1]).update(status='completed')
+        archive_appointments()
+        self.records = [
+            MedicalRecord.objects.create(doctor=self.doctor, patient=self.patient, diagnosis=diagnosis).id
+            for diagnosis in ('Flu', 'Cold', 'Sprain')
+        ]
+        MedicalRecord.objects.filter(id__in=self.records[:2]).update(created_at=tie)
+        self.client.force_authenticate(self.patient.user)
+
+    def walk(self, page_size):
+        response = self.client.get(f'/api/patients/{self.patient.id}/timeline/?page_size={page_size}')
+        entries = response.json()['results']
+        while response.json()['next']:
+            # A cursor that fails to advance would page forever
+            self.assertLess(len(entries), 20)
+            response = self.client.get(response.json()['next'])
+            entries += response.json()['results']
+        return [(entry['type'], entry['id']) for entry in entries]
+
+    def test_pages_keep_the_order_through_ties(self):
+        # Newest first; at the same moment records come first, then higher ids
+        expected = [
+            ('record', self.records[2]),
+            ('appointment', self.later),
+            ('record', self.records[1]),
+            ('record', self.records[0]),
+            ('appointment', self.tied[2]),
+            ('appointment', self.tied[1]),
+            ('appointment', self.tied[0]),
+        ]
+        self.assertTrue(ArchivedAppointment.objects.filter(id=self.tied[1]).exists())
+        for page_size in (1, 2, 3, 100):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self.walk(page_size), expected)
+
+
+class ScopingTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctors = seed_doctors(2, prefix='scope')
+        self.patients = seed_patients(3, prefix='scope')
+        seed_appointments(12, self.doctors, self.patients)
+        seed_medical_records(12, self.doctors, self.patients)
+        self.staff = seed_patients(1, prefix='scope-staff')[0].user
+        self.staff.is_staff = True
+        self.staff.save()
+
+    def test_all_appointments_is_staff_only(self):
+        self.assertEqual(self.client.get('/api/appointments/all_appointments/').status_code, 401)
+        self.client.force_authenticate(self.patients[0].user)
+        self.assertEqual(self.client.get('/api/appointments/all_appointments/').status_code, 403)
+        self.assertEqual(self.client.get('/api/appointments/all_appointments/?stream=ndjson').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/appointments/all_appointments/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 12)
+
+    def test_lists_only_hold_the_callers_rows(self):
+        patient = self.patients[0]
+        self.client.force_authenticate(patient.user)
+        appointments = self.client.get('/api/appointments/').json()
+        records = self.client.get('/api/medical-records/').json()
+        appointments = appointments.get('results', appointments)
+        records = records.get('results', records)
+        self.assertEqual({row['id'] for row in appointments},
+                         set(Appointment.objects.filter(patient=patient).values_list('id', flat=True)))
+        self.assertEqual({row['id'] for row in records},
+                         set(MedicalRecord.objects.filter(patient=patient).values_list('id', flat=True)))
+
+    def test_medical_records_are_listed_newest_first(self):
+        self.client.force_authenticate(self.staff)
+        records = self.client.get('/api/medical-records/').json()
+        records = records.get('results', records)
+        expected = list(MedicalRecord.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in records], expected[:len(records)])
+
+    def test_appointments_are_listed_newest_first(self):
+        self.client.force_authenticate(self.staff)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            appointments = self.client.get('/api/appointments/').json()
+        appointments = appointments.get('results', appointments)
+        expected = list(Appointment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in appointments], expected[:len(appointments)])
+
+    def test_time_slots_are_read_only_to_doctors_and_patients(self):
+        slot = {'doctor': self.doctors[0].id, 'day_of_week': 'Monday', 'start_time': '09:00', 'end_time': '12:00'}
+        for user in (self.patients[0].user, self.doctors[0].user):
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.post('/api/time-slots/', slot).status_code, 403)
+        self.assertFalse(TimeSlot.objects.exists())
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.post('/api/time-slots/', slot).status_code, 201)
+
+    def test_records_are_read_only_to_patients(self):
+        record = MedicalRecord.objects.filter(patient=self.patients[0]).first()
+        self.client.force_authenticate(self.patients[0].user)
+        self.assertEqual(self.client.patch(f'/api/medical-records/{record.id}/', {'notes': 'x'}).status_code, 403)
+        self.assertEqual(self.client.delete(f'/api/medical-records/{record.id}/').status_code, 403)
+
+
+
+class RollupTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctors = seed_doctors(3, prefix='rollup')
+        self.patients = seed_patients(4, prefix='rollup')
+        seed_appointments(120, self.doctors, self.patients, start=date.today() - timedelta(days=20))
+
+    def rollups(self):
+        return sorted(DailyAppointmentRollup.objects.filter(appointments__gt=0).values_list(
+            'day', 'doctor_id', 'status', 'payment_status', 'appointments', 'fee_total',
+        ))
+
+    def test_deltas_match_rebuild(self):
+        self.assertTrue(archive_appointments(older_than_days=10))
+        appointments = list(Appointment.objects.order_by('id')[:6])
+        appointments[0].status = 'cancelled' if appointments[0].status != 'cancelled' else 'pending'
+        appointments[0].save()
+        appointments[1].appointment_date += timedelta(days=3)
+        appointments[1].payment_status = 'paid'
+        appointments[1].save()
+        appointments[2].delete()
+        doctor = self.doctors[0]
+        doctor.consultation_fee += Decimal('12.50')
+        doctor.save()
+        Appointment.objects.create(doctor=doctor, patient=self.patients[0], appointment_date=date(2031, 1, 6),
+                                   appointment_time='10:00', reason='Check-up')
+
+        incremental = self.rollups()
+        self.assertTrue(rebuild_rollups(window_days=4))
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_bulk_writes_match_rebuild(self):
+        appointments = list(Appointment.objects.order_by('id')[:8])
+        bulk_update_status([
+            {'id': appointment.id, 'status': 'completed', 'payment_status': 'paid'} for appointment in appointments[:4]
+        ] + [
+            {'id': appointment.id, 'status': 'cancelled'} for appointment in appointments[4:]
+        ])
+        bulk_book_appointments([
+            {'doctor': self.doctors[1].id, 'patient': self.patients[1].id, 'appointment_date': date(2031, 1, 6),
+             'appointment_time': time(9, minute)}
+            for minute in (0, 30)
+        ])
+
+        incremental = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_rebuild_repairs_a_range(self):
+        expected = self.rollups()
+        first, last = expected[0][0], expected[-1][0]
+        middle = first + timedelta(days=3)
+        DailyAppointmentRollup.objects.filter(day__lte=middle).update(appointments=99)
+        DailyAppointmentRollup.objects.filter(day__gt=middle).delete()
+        rebuild_rollups(first, middle, window_days=2)
+        rebuild_rollups(middle + timedelta(days=1), last)
+        self.assertEqual(self.rollups(), expected)
+
+
+class DashboardStatsTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctors = seed_doctors(3, prefix='dashboard')
+        seed_appointments(90, self.doctors, seed_patients(4, prefix='dashboard'),
+                          start=date.today() - timedelta(days=40))
+        self.staff = seed_patients(1, prefix='dashboard-staff')[0].user
+        self.staff.is_staff = True
+        self.staff.save()
+
+    def get_stats(self, query=''):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(f'/api/dashboard-stats/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_totals_match_the_appointments(self):
+        stats = self.get_stats('?months=3')
+        appointments = Appointment.objects.select_related('doctor__specialty')
+        paid = [appointment for appointment in appointments if appointment.payment_status == 'paid']
+        self.assertEqual(stats['totals']['appointments'], appointments.count())
+        self.assertEqual(Decimal(stats['totals']['revenue']),
+                         sum(appointment.doctor.consultation_fee for appointment in paid))
+        self.assertEqual(stats['appointments_by_status'], {
+            status: appointments.filter(status=status).count() for status, _ in Appointment.STATUS_CHOICES
+        })
+        self.assertEqual(len(stats['monthly_trend']), 3)
+        self.assertEqual(sum(month['appointments'] for month in stats['monthly_trend']), appointments.filter(
+            appointment_date__gte=date.fromisoformat(stats['monthly_trend'][0]['month'] + '-01'),
+        ).count())
+        by_specialty = {}
+        for appointment in paid:
+            name = appointment.doctor.specialty.name
+            by_specialty[name] = by_specialty.get(name, 0) + appointment.doctor.consultation_fee
+        self.assertEqual({row['specialty']: Decimal(row['revenue']) for row in stats['revenue_by_specialty']},
+                         by_specialty)
+        self.assertEqual([row['id'] for row in stats['recent_appointments']],
+                         list(appointments.order_by('-created_at', '-id').values_list('id', flat=True)[:5]))
+
+    def test_totals_follow_status_changes(self):
+        before = self.get_stats()
+        appointment = Appointment.objects.exclude(status='cancelled').exclude(payment_status='paid').first()
+        appointment.payment_status = 'paid'
+        appointment.save()
+        after = self.get_stats()
+        self.assertEqual(Decimal(after['totals']['revenue']) - Decimal(before['totals']['revenue']),
+                         appointment.doctor.consultation_fee)
+        self.assertEqual(after['totals']['appointments'], before['totals']['appointments'])
+
+    def test_query_count_is_fixed(self):
+        with self.assertNumQueries(6):
+            dashboard_stats()
+        seed_appointments(30, self.doctors, seed_patients(2, prefix='dashboard-more'), start=date.today())
+        with self.assertNumQueries(6):
+            dashboard_stats()
+
+    def test_admin_only_and_months_checked(self):
+        self.assertEqual(self.client.get('/api/dashboard-stats/').status_code, 401)
+        self.client.force_authenticate(self.doctors[0].user)
+        self.assertEqual(self.client.get('/api/dashboard-stats/').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        for months in ('0', '25', 'six'):
+            with self.subTest(months=months):
+                self.assertEqual(self.client.get(f'/api/dashboard-stats/?months={months}').status_code, 400)
+
+
+class OpenSlotTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.templated, self.working_hours = seed_doctors(2, prefix='slots')
+        TimeSlot.objects.create(doctor=self.templated, day_of_week='Monday', start_time='09:00', end_time='10:00')
+        self.monday = date(2031, 1, 6)
+
+    def test_templates_and_working_hours(self):
+        slots = open_slots([self.templated.id, self.working_hours.id], self.monday, 7)
+        self.assertEqual(slots[self.templated.id], [{'date': self.monday, 'slots': ['09:00', '09:30']}])
+        self.assertTrue(slots[self.working_hours.id])
+
+    def test_unavailable_doctors_have_no_slots(self):
+        for doctor in (self.templated, self.working_hours):
+            doctor.is_available = False
+            doctor.save()
+        slots = open_slots([self.templated.id, self.working_hours.id], self.monday, 7)
+        self.assertEqual(slots, {self.templated.id: [], self.working_hours.id: []})
+
+    def test_unavailable_templates_do_not_fall_back_to_working_hours(self):
+        TimeSlot.objects.filter(doctor=self.templated).update(is_available=False)
+        slots = open_slots([self.templated.id], self.monday, 7)
+        self.assertEqual(slots, {self.templated.id: []})
+
+
+class MyAppointmentsQueryCountTests(HospitalTestCase):
+    def get(self, user, path):
+        # A fresh instance per request, as authentication loads it, with no profile cached
+        self.client.force_authenticate(type(user).objects.get(pk=user.pk))
+        with self.assertNumQueries(QUERIES_PER_PAGE):
+            response = self.client.get(path)
+        self.assertEqual(len(response.json()['results']), 2)
+        return response.json()
+
+    def test_query_count_does_not_grow(self):
+        for size in (10, 1000, 100000):
+            with self.subTest(appointments=size):
+                doctors = seed_doctors(2, prefix=f'mine{size}')
+                patient = seed_patients(1, prefix=f'mine{size}')[0]
+                seed_appointments(size, doctors, [patient])
+                for user in (patient.user, doctors[0].user):
+                    page = self.get(user, '/api/appointments/my_appointments/?page_size=2')
+                    self.get(user, page['next'])
+
+
+class BookingConflictTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = seed_doctors(1, prefix='conflict')[0]
+        self.patient, self.other_patient = seed_patients(2, prefix='conflict')
+
+    def book(self, patient):
+        self.client.force_authenticate(patient.user)
+        return self.client.post('/api/appointments/', {
+            'doctor': self.doctor.id, 'patient': patient.id,
+            'appointment_date': '2030-01-07', 'appointment_time': '10:00',
+        })
+
+    def test_double_booking_is_a_conflict(self):
+        self.assertEqual(self.book(self.patient).status_code, 201)
+        self.assertEqual(self.book(self.other_patient).status_code, 409)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 1)
+
+    def test_cancelled_slot_can_be_rebooked(self):
+        self.book(self.patient)
+        Appointment.objects.filter(doctor=self.doctor).update(status='cancelled')
+        self.assertEqual(self.book(self.other_patient).status_code, 201)
+
+    def test_reactivating_into_a_taken_slot_is_a_conflict(self):
+        self.book(self.patient)
+        cancelled = Appointment.objects.get(doctor=self.doctor)
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        self.book(self.other_patient)
+        self.client.force_authenticate(self.patient.user)
+        response = self.client.patch(f'/api/appointments/{cancelled.id}/', {'status': 'pending'})
+        self.assertEqual(response.status_code, 409)
+
+
+class BulkBookingTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = seed_doctors(1, prefix='bulk')[0]
+        self.patient, self.other_patient = seed_patients(2, prefix='bulk')
+        self.staff = seed_patients(1, prefix='bulk-staff')[0].user
+        self.staff.is_staff = True
+        self.staff.save()
+        Appointment.objects.create(doctor=self.doctor, patient=self.patient, appointment_date=date(2030, 1, 7),
+                                   appointment_time='09:00')
+
+    def item(self, at, patient=None, **fields):
+        return {'doctor': self.doctor.id, 'patient': (patient or self.patient).id,
+                'appointment_date': '2030-01-07', 'appointment_time': at, **fields}
+
+    def test_conflicting_items_fail_alone(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.post('/api/appointments/bulk_create/', [
+            self.item('09:00', self.other_patient),
+            self.item('10:00'),
+            self.item('10:00', self.other_patient),
+            self.item('11:00', doctor=0),
+            self.item('soon'),
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (1, 4))
+        self.assertEqual([result['status'] for result in body['results']],
+                         ['conflict', 'created', 'conflict', 'invalid', 'invalid'])
+        self.assertEqual([result['index'] for result in body['results']], [0, 1, 2, 3, 4])
+        created = Appointment.objects.get(id=body['results'][1]['id'])
+        self.assertEqual((created.patient_id, str(created.appointment_time)), (self.patient.id, '10:00:00'))
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 2)
+        self.assertEqual(DailyAppointmentRollup.objects.aggregate(total=Sum('appointments'))['total'], 2)
+
+    def test_staff_only_and_list_only(self):
+        self.client.force_authenticate(self.patient.user)
+        self.assertEqual(self.client.post('/api/appointments/bulk_create/', [], format='json').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        response = self.client.post('/api/appointments/bulk_create/', self.item('10:00'), format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RecordingBroker:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message['type'], message['appointment']['id']))
+
+
+class AppointmentEventTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = seed_doctors(1, prefix='events')[0]
+        self.patient = seed_patients(1, prefix='events')[0]
+        self.broker = RecordingBroker()
+        patcher = mock.patch('hospital.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def book(self):
+        return Appointment.objects.create(doctor=self.doctor, patient=self.patient, appointment_date=date(2030, 1, 7),
+                                          appointment_time='10:00')
+
+    def test_published_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book()
+            self.assertEqual(self.broker.published, [])
+        self.assertEqual(sorted(self.broker.published), sorted(
+            (channel, 'created', appointment.id)
+            for channel in (STAFF_CHANNEL, user_channel(self.doctor.user_id), user_channel(self.patient.user_id))
+        ))
+
+    def test_rolled_back_write_publishes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.book()
+                transaction.set_rollback(True)
+        self.assertEqual(self.broker.published, [])
+
+    def test_bulk_status_publishes_one_update_each(self):
+        appointment = self.book()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_update_status([{'id': appointment.id, 'status': 'confirmed'}])
+            self.assertEqual(self.broker.published, [])
+        self.assertEqual(self.broker.published.count((STAFF_CHANNEL, 'updated', appointment.id)), 1)
+
+    def test_broker_failure_does_not_fail_the_write(self):
+        self.broker.publish = mock.Mock(side_effect=ConnectionError)
+        with self.assertLogs('hospital.events', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book()
+        self.assertTrue(Appointment.objects.filter(id=appointment.id).exists())
+
+
+class StreamTicketTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = seed_patients(1, prefix='ticket')[0].user
+        self.access = str(AccessToken.for_user(self.user))
+
+    def ticket(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/appointments/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['ticket']
+
+    def stream_user(self, **kwargs):
+        return _event_stream_user(RequestFactory().get('/api/appointments/events/', **kwargs))
+
+    def test_ticket_requires_login(self):
+        self.assertEqual(self.client.post('/api/appointments/events/ticket/').status_code, 401)
+
+    def test_ticket_opens_one_stream(self):
+        ticket = self.ticket()
+        self.assertNotIn(self.access, ticket)
+        self.assertEqual(self.stream_user(data={'token': ticket}), self.user)
+        self.assertIsNone(self.stream_user(data={'token': ticket}))
+        self.assertIsNone(self.stream_user(data={'token': 'x' * 43}))
+
+    def test_access_token_only_in_the_header(self):
+        self.assertIsNone(self.stream_user(data={'token': self.access}))
+        self.assertEqual(self.stream_user(HTTP_AUTHORIZATION=f'Bearer {self.access}'), self.user)
+
+    async def test_stream_refuses_an_access_token_in_the_url(self):
+        response = await AsyncClient().get(f'/api/appointments/events/?token={self.access}')
+        self.assertEqual(response.status_code, 401)
+
+
+class ArchiveTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = seed_doctors(1, prefix='archive')[0]
+        self.patient = seed_patients(1, prefix='archive')[0]
+        seed_appointments(8, [self.doctor], [self.patient], start=date.today() - timedelta(days=400))
+        Appointment.objects.filter(id__in=Appointment.objects.order_by('id').values('id')[:6]).update(
+            status='completed')
+        Appointment.objects.exclude(status='completed').update(status='pending')
+        self.finished = list(Appointment.objects.filter(status='completed').order_by('id'))
+
+    def test_finished_appointments_move_with_their_records(self):
+        record = MedicalRecord.objects.create(doctor=self.doctor, patient=self.patient,
+                                              appointment=self.finished[0], diagnosis='Flu')
+        AppointmentReminder.objects.create(appointment=self.finished[0], recipient=self.patient.user.email)
+        rollups = DailyAppointmentRollup.objects.aggregate(total=Sum('appointments'))
+
+        self.assertEqual(archive_appointments(batch_size=4), 6)
+        self.assertEqual(set(ArchivedAppointment.objects.values_list('id', flat=True)),
+                         {appointment.id for appointment in self.finished})
+        self.assertEqual(set(Appointment.objects.values_list('status', flat=True)), {'pending'})
+        record.refresh_from_db()
+        self.assertIsNone(record.appointment_id)
+        self.assertEqual(record.archived_appointment_id, self.finished[0].id)
+        self.assertFalse(AppointmentReminder.objects.exists())
+        self.assertEqual(DailyAppointmentRollup.objects.aggregate(total=Sum('appointments')), rollups)
+        self.assertTrue(has_care_relationship(self.doctor.id, self.patient.id))
+
+    def test_archived_list(self):
+        archive_appointments()
+        self.client.force_authenticate(self.patient.user)
+        live = self.client.get('/api/appointments/my_appointments/').json()['results']
+        archived = self.client.get('/api/appointments/my_appointments/?archived=true').json()['results']
+        self.assertEqual(len(live), 2)
+        self.assertEqual({row['id'] for row in archived}, {appointment.id for appointment in self.finished})
+        self.assertEqual(self.client.get('/api/appointments/my_appointments/?archived=maybe').status_code, 400)
+
+
+class AppointmentStreamTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_appointments(7, seed_doctors(2, prefix='stream'), seed_patients(2, prefix='stream'))
+        staff = seed_patients(1, prefix='stream-staff')[0].user
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(staff)
+        self.ids = sorted(Appointment.objects.values_list('id', flat=True))
+
+    def stream(self, query):
+        response = self.client.get(f'/api/appointments/all_appointments/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response['Content-Type'], b''.join(response.streaming_content).decode()
+
+    def test_json_is_one_array_in_id_order(self):
+        unstreamed = self.client.get('/api/appointments/all_appointments/').json()
+        for chunk_size in (3, 7, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                content_type, body = self.stream(f'stream=json&chunk_size={chunk_size}')
+                self.assertEqual(content_type, 'application/json')
+                rows = json.loads(body)
+                self.assertEqual([row['id'] for row in rows], self.ids)
+                self.assertEqual(sorted(rows, key=lambda row: row['id']),
+                                 sorted(unstreamed, key=lambda row: row['id']))
+
+    def test_ndjson_resumes_after_an_id(self):
+        content_type, body = self.stream(f'stream=ndjson&chunk_size=2&after={self.ids[2]}')
+        self.assertEqual(content_type, 'application/x-ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], self.ids[3:])
+
+    def test_empty_json_stream(self):
+        self.assertEqual(self.stream(f'stream=json&after={self.ids[-1]}')[1], '[]')
+
+    def test_bad_parameters(self):
+        for query in ('stream=xml', 'stream=json&chunk_size=many', 'stream=json&after=last'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/appointments/all_appointments/?{query}').status_code, 400)
+
+
+class ExportTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        doctors = seed_doctors(2, prefix='export')
+        patients = seed_patients(3, prefix='export')
+        seed_appointments(40, doctors, patients, start=date(2030, 1, 1))
+        self.staff = seed_patients(1, prefix='export-staff')[0].user
+        self.staff.is_staff = True
+        self.staff.save()
+        self.patient = patients[0]
+
+    def extract(self, query=''):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(f'/api/exports/appointments/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/api/exports/appointments/').status_code, 401)
+        self.client.force_authenticate(self.patient.user)
+        self.assertEqual(self.client.get('/api/exports/appointments/').status_code, 403)
+
+    def test_csv_covers_the_table(self):
+        rows = list(csv.DictReader(io.StringIO(self.extract().decode())))
+        self.assertEqual(sorted(int(row['id']) for row in rows),
+                         sorted(Appointment.objects.values_list('id', flat=True)))
+
+    def test_gzip_ndjson_with_date_range(self):
+        data = gzip.decompress(self.extract('?output=ndjson&gzip=true&start=2030-01-02&end=2030-01-02'))
+        rows = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual(len(rows), Appointment.objects.filter(appointment_date=date(2030, 1, 2)).count())
+        self.assertTrue(rows)
+        self.assertEqual({row['appointment_date'] for row in rows}, {'2030-01-02'})
+
+    def test_bad_parameters(self):
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get('/api/exports/appointments/?output=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/appointments/?start=soon').status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/doctors/').status_code, 404)
+
+
+class ListSink(BaseSink):
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+
+
+class ReminderTests(HospitalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        start = timezone.localtime(self.now) + timedelta(hours=2)
+        doctor = seed_doctors(1, prefix='remind')[0]
+        patient = seed_patients(1, prefix='remind')[0]
+        self.appointment = Appointment.objects.create(
+            doctor=doctor, patient=patient, appointment_date=start.date(),
+            appointment_time=start.time().replace(second=0, microsecond=0), status='confirmed',
+        )
+        self.sink = ListSink()
+
+    def run_reminders(self):
+        return run_reminders(window=timedelta(hours=24), sink=self.sink, now=self.now, workers=1)
+
+    def test_reruns_send_once(self):
+        self.assertEqual(self.run_reminders()['sent'], 1)
+        self.assertEqual(self.run_reminders(), {'scheduled': 0, 'sent': 0, 'failed': 0, 'skipped': 0})
+        self.assertEqual(len(self.sink.messages), 1)
+        self.assertEqual(self.sink.messages[0]['to'], self.appointment.patient.user.email)
+
+    def test_rescheduled_appointment_is_reminded_again(self):
+        self.run_reminders()
+        moved = timezone.localtime(self.now) + timedelta(hours=5)
+        self.appointment.appointment_date = moved.date()
+        self.appointment.appointment_time = moved.time().replace(second=0, microsecond=0)
+        self.appointment.save()
+        self.assertEqual(self.run_reminders()['sent'], 1)
+        self.assertIn(f"{moved:%H:%M}", self.sink.messages[1]['subject'])
+        self.appointment.reason = 'Unchanged time'
+        self.appointment.save()
+        self.assertEqual(self.run_reminders()['sent'], 0)
+
+    def test_abandoned_claims_stop_at_max_attempts(self):
+        self.run_reminders()
+        stale = self.now - CLAIM_TIMEOUT - timedelta(minutes=1)
+        reminder = AppointmentReminder.objects.get()
+        AppointmentReminder.objects.update(status='sending', claimed_at=stale, attempts=MAX_ATTEMPTS - 1)
+        self.assertEqual(self.run_reminders()['sent'], 1)
+        AppointmentReminder.objects.update(status='sending', claimed_at=stale, attempts=MAX_ATTEMPTS)
+        self.assertEqual(self.run_reminders()['sent'], 0)
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.status, reminder.attempts), ('failed', MAX_ATTEMPTS))
@@ -0,0 +1,127 @@
+"""
+Patient timeline.
+
+A patient's appointments (live and archived) and medical records merged into
+one stream, newest first. Appointments sit at their scheduled date and time,
+records at the time they were written. Each source is read with its own
+keyset query, ``WHERE (key) < (cursor) ORDER BY key DESC LIMIT n + 1`` over a
+(patient, key) index, and the sorted pages are merged with heapq.merge, so a
+page costs the same three queries however long the history is. Rows are read
+with values() and the doctor's name joined in; nothing is loaded per entry.
+
+Entries are ordered by ``(at, type, id)``: at the same moment records come
+before appointments. Archived appointments keep their id, so live and
+archived appointments share one id space and the cursor stays unique.
+"""
+import heapq
+from datetime import datetime
+from itertools import islice
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from .models import Appointment, ArchivedAppointment, MedicalRecord
+from .pagination import KeysetPagination
+
+APPOINTMENT = 'appointment'
+RECORD = 'record'
+
+_DOCTOR_NAME = ('doctor_id', 'doctor__user__first_name', 'doctor__user__last_name')
+
+
+def _doctor(row):
+    return {
+        'id': row['doctor_id'],
+        'name': f"{row['doctor__user__first_name']} {row['doctor__user__last_name']}".strip(),
+    }
+
+
+def _appointments_before(model, patient, cursor, limit):
+    queryset = model.objects.filter(patient=patient)
+    if cursor is not None:
+        at, kind, pk = cursor
+        local = timezone.localtime(at)
+        day, moment = local.date(), local.time()
+        same_time = Q(appointment_date=day, appointment_time=moment)
+        condition = Q(appointment_date__lt=day) | Q(appointment_date=day, appointment_time__lt=moment)
+        # Records sort first at a tie, so after a record every appointment at that time is still to come
+        condition |= same_time if kind == RECORD else same_time & Q(id__lt=pk)
+        queryset = queryset.filter(condition)
+    rows = queryset.order_by('-appointment_date', '-appointment_time', '-id').values(
+        'id', 'appointment_date', 'appointment_time', 'status', 'payment_status', 'reason', *_DOCTOR_NAME,
+    )[:limit]
+    return [
+        {
+            'type': APPOINTMENT,
+            'id': row['id'],
+            'at': timezone.make_aware(datetime.combine(row['appointment_date'], row['appointment_time'])),
+            'archived': model is ArchivedAppointment,
+            'status': row['status'],
+            'payment_status': row['payment_status'],
+            'reason': row['reason'],
+            'doctor': _doctor(row),
+        }
+        for row in rows
+    ]
+
+
+def _records_before(patient, cursor, limit):
+    queryset = MedicalRecord.objects.filter(patient=patient)
+    if cursor is not None:
+        at, kind, pk = cursor
+        condition = Q(created_at__lt=at)
+        if kind == RECORD:
+            condition |= Q(created_at=at, id__lt=pk)
+        queryset = queryset.filter(condition)
+    rows = queryset.order_by('-created_at', '-id').values(
+        'id', 'created_at', 'appointment_id', 'archived_appointment_id', 'diagnosis', 'prescription', 'notes',
+        *_DOCTOR_NAME,
+    )[:limit]
+    return [
+        {
+            'type': RECORD,
+            'id': row['id'],
+            'at': row['created_at'],
+            'appointment': row['appointment_id'] or row['archived_appointment_id'],
+            'diagnosis': row['diagnosis'],
+            'prescription': row['prescription'],
+            'notes': row['notes'],
+            'doctor': _doctor(row),
+        }
+        for row in rows
+    ]
+
+
+def _key(entry):
+    return entry['at'], entry['type'], entry['id']
+
+
+class TimelinePagination(KeysetPagination):
+    """Newest-first keyset pagination over a patient's merged timeline (?page_size= / ?cursor=)"""
+
+    ordering = ('-at', '-type', '-id')
+    page_size = 20
+    max_page_size = 100
+
+    def decode_cursor(self, request, model=None):
+        values = super().decode_cursor(request)
+        if values is None:
+            return None
+        at, kind, pk = values
+        at = parse_datetime(at) if isinstance(at, str) else None
+        if at is None or timezone.is_naive(at) or kind not in (APPOINTMENT, RECORD) or not isinstance(pk, int):
+            raise NotFound(self.invalid_cursor_message)
+        return at, kind, pk
+
+    def paginate_timeline(self, patient, request):
+        """Up to page size + 1 entries (the extra one tells get_next_link another page exists)"""
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        limit = self.page_size_value + 1
+        streams = [
+            _appointments_before(Appointment, patient, cursor, limit),
+            _appointments_before(ArchivedAppointment, patient, cursor, limit),
+            _records_before(patient, cursor, limit),
+        ]
+        return list(islice(heapq.merge(*streams, key=_key, reverse=True), limit))
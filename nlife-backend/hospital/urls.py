@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     SpecialtyViewSet, DoctorViewSet, PatientViewSet, AppointmentViewSet,
-    TimeSlotViewSet, MedicalRecordViewSet
+    TimeSlotViewSet, MedicalRecordViewSet, HomeViewSet, DirectoryCacheStatsView, DashboardStatsView, TableExportView,
+    EventStreamTicketView, appointment_events
 )
 
 router = DefaultRouter()
+router.register(r'home', HomeViewSet, basename='home')
 router.register(r'specialties', SpecialtyViewSet)
 router.register(r'doctors', DoctorViewSet)
 router.register(r'patients', PatientViewSet)
@@ -15,5 +17,11 @@ router.register(r'time-slots', TimeSlotViewSet)
 router.register(r'medical-records', MedicalRecordViewSet)
 
 urlpatterns = [
+    # Before the router so 'events' is not taken for an appointment id
+    path('appointments/events/', appointment_events, name='appointment-events'),
+    path('appointments/events/ticket/', EventStreamTicketView.as_view(), name='appointment-events-ticket'),
+    path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('exports/<str:table>/', TableExportView.as_view(), name='table-export'),
+    path('cache-stats/', DirectoryCacheStatsView.as_view(), name='directory-cache-stats'),
     path('', include(router.urls)),
 ]
@@ -1,13 +1,46 @@
-from rest_framework import viewsets, permissions, status, filters
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import viewsets, permissions, status, filters, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import Specialty, Doctor, Patient, Appointment, TimeSlot, MedicalRecord
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ParseError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework.views import APIView
+from .models import Specialty, Doctor, Patient, Appointment, ArchivedAppointment, TimeSlot, MedicalRecord
 from .serializers import (
     SpecialtySerializer, DoctorSerializer, DoctorListSerializer, DoctorUpdateSerializer,
     PatientSerializer, PatientListSerializer, AppointmentSerializer, AppointmentCreateSerializer,
-    AppointmentUpdateSerializer,
-    TimeSlotSerializer, MedicalRecordSerializer, MedicalRecordCreateSerializer
+    AppointmentUpdateSerializer, AppointmentBulkCreateSerializer, AppointmentStatusChangeSerializer,
+    ArchivedAppointmentSerializer,
+    TimeSlotSerializer, MedicalRecordSerializer, MedicalRecordCreateSerializer, MedicalRecordSearchSerializer
 )
+from .directory import doctor_directory, DIRECTORY_SCHEMA
+from .fieldsets import parse_fieldset, fieldset_lookups
+from .pagination import KeysetPagination
+from .search import DoctorSearchFilter, search_medical_records
+from .filtering import DoctorFilter, AppointmentFilter, doctor_facets, doctors_available_at
+from .slots import open_slots, parse_window
+from .cache import cache_directory_response, get_cache_stats, reset_cache_stats
+from .home import build_home_payload
+from .export import (
+    streaming_export, streaming_response, table_extract, parse_extract_params, extract_filename,
+    EXTRACT_FORMATS, EXTRACT_TABLES,
+)
+from .stats import dashboard_stats, DEFAULT_TREND_MONTHS, MAX_TREND_MONTHS
+from .booking import bulk_book_appointments, bulk_update_status, MAX_BULK_ITEMS
+from .archive import wants_archived
+from .changes import AppointmentChangeFeed
+from .events import (
+    event_stream, issue_stream_ticket, redeem_stream_ticket, user_channel, STAFF_CHANNEL, STREAM_TICKET_SECONDS
+)
+from .care import has_care_relationship
+from .timeline import TimelinePagination
+
+User = get_user_model()
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -18,31 +51,86 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return True
         return request.user.is_staff
 
+class IsStaffOrAdminUser(permissions.BasePermission):
+    """
+    Allow access to staff users and users with user_type 'admin'.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and
+                    (request.user.is_staff or request.user.user_type == 'admin'))
+
 class IsOwnerOrAdmin(permissions.BasePermission):
     """
-    Custom permission to only allow owners of an object or admins to edit it.
+    Allow owners of an object or admins to access it.
+
+    Views using this permission must scope ``get_queryset`` with
+    ``scope_to_user``: an object a doctor or patient can load is then already
+    theirs, so the check needs no extra queries.
     """
     def has_permission(self, request, view):
-        # Allow authenticated users to access the view
-        return request.user and request.user.is_authenticated
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if request.method in permissions.SAFE_METHODS or user.is_staff or user.user_type == 'admin':
+            return True
+        # Doctors and patients book and change their own appointments, and
+        # doctors write records for their patients (MedicalRecordCreateSerializer
+        # checks the pair); time slots and existing records are read-only to them
+        model = view.queryset.model
+        if model is Appointment:
+            return True
+        return model is MedicalRecord and view.action == 'create' and user.user_type == 'doctor'
 
     def has_object_permission(self, request, view, obj):
         # Allow admins (both staff and user_type admin)
         if request.user.is_staff or request.user.user_type == 'admin':
             return True
 
-        # Check if the object has a user field directly
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
-
-        # Check if it's an appointment
+        # Doctors and patients may change their own appointments
         if isinstance(obj, Appointment):
-            if request.user.user_type == 'doctor':
-                return hasattr(request.user, 'doctor_profile') and obj.doctor.user == request.user
-            elif request.user.user_type == 'patient':
-                return hasattr(request.user, 'patient_profile') and obj.patient.user == request.user
+            return True
+
+        # Their time slots and medical records are read-only to them
+        return request.method in permissions.SAFE_METHODS
 
-        return False
+class DoctorKeysetPagination(KeysetPagination):
+    """Opt-in keyset pagination for the doctor directory (?page_size= / ?cursor=)"""
+
+    ordering = ('id',)
+
+class AppointmentKeysetPagination(KeysetPagination):
+    """Newest-first keyset pagination for appointment lists"""
+
+    ordering = ('-created_at', '-id')
+
+# Relations rendered by AppointmentSerializer
+APPOINTMENT_RELATED = ('doctor__user', 'doctor__specialty', 'patient__user')
+
+# Relations rendered by MedicalRecordSerializer
+MEDICAL_RECORD_RELATED = ('doctor__user', 'doctor__specialty', 'patient__user')
+
+def scope_to_user(queryset, user, doctor='doctor', patient='patient'):
+    """
+    Rows of ``queryset`` that ``user`` may see: all of them for staff/admins,
+    otherwise those whose ``doctor`` / ``patient`` lookup points at the user's
+    profile (None: none for that role). Filters through a join, so no profile
+    query is needed.
+    """
+    if not user.is_authenticated:
+        return queryset.none()
+    if user.is_staff or user.user_type == 'admin':
+        return queryset
+    if user.user_type == 'doctor' and doctor:
+        return queryset.filter(**{f'{doctor}__user': user})
+    if user.user_type == 'patient' and patient:
+        return queryset.filter(**{f'{patient}__user': user})
+    return queryset.none()
+
+def appointment_source(request):
+    """Model and serializer to list from: archived appointments with ?archived=true, live ones otherwise"""
+    if wants_archived(request):
+        return ArchivedAppointment, ArchivedAppointmentSerializer
+    return Appointment, AppointmentSerializer
 
 class SpecialtyViewSet(viewsets.ModelViewSet):
     """ViewSet for the Specialty model"""
@@ -54,14 +142,52 @@ class SpecialtyViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     pagination_class = None  # Disable pagination to show all specialties
 
+    @cache_directory_response('specialties')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_directory_response('specialties')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class HomeViewSet(viewsets.GenericViewSet):
+    """Everything the landing page needs in one cached response"""
+
+    permission_classes = [permissions.AllowAny]
+
+    @cache_directory_response('home')
+    def list(self, request, *args, **kwargs):
+        return Response(build_home_payload(request))
+
 class DoctorViewSet(viewsets.ModelViewSet):
     """ViewSet for the Doctor model"""
 
     queryset = Doctor.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [DoctorSearchFilter, DoctorFilter]
     search_fields = ['user__first_name', 'user__last_name', 'specialty__name', 'bio', 'education']
     pagination_class = None  # Disable pagination to show all doctors
+    keyset_pagination_class = DoctorKeysetPagination
+
+    def get_fieldset(self):
+        """Parsed ?fields= sparse fieldset, or None for the full representation"""
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = parse_fieldset(self.request, DIRECTORY_SCHEMA)
+        return self._fieldset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset() if self.action == 'retrieve' else None
+        if fieldset is not None:
+            # only() defers the relations left out, and a deferred relation cannot be select_related
+            related = [name for name in ('user', 'specialty') if name in fieldset]
+            queryset = queryset.select_related(*related).only(*fieldset_lookups(fieldset, DIRECTORY_SCHEMA))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'retrieve':
+            kwargs['fieldset'] = self.get_fieldset()
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -70,6 +196,25 @@ class DoctorViewSet(viewsets.ModelViewSet):
             return DoctorUpdateSerializer
         return DoctorSerializer
 
+    @cache_directory_response('doctors')
+    def list(self, request, *args, **kwargs):
+        """Serve the directory from one joined query instead of nested serializers"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.ordered:
+            queryset = queryset.order_by('id')
+        fieldset = self.get_fieldset()
+
+        if self.keyset_pagination_class.is_requested(request):
+            paginator = self.keyset_pagination_class()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            return paginator.get_paginated_response(doctor_directory(page, request, fieldset))
+
+        return Response(doctor_directory(queryset, request, fieldset))
+
+    @cache_directory_response('doctors')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def update(self, request, *args, **kwargs):
         """Override update method to check admin permissions"""
         # Check if user is admin
@@ -103,6 +248,51 @@ class DoctorViewSet(viewsets.ModelViewSet):
 
         return super().destroy(request, *args, **kwargs)
 
+    @action(detail=False, methods=['get'])
+    @cache_directory_response('doctors')
+    def facets(self, request):
+        """Per-specialty, fee bucket and weekday counts for the current search and filters"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(doctor_facets(queryset))
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """Doctors available on ?date=YYYY-MM-DD, optionally free at ?time=HH:MM"""
+        try:
+            day = serializers.DateField().to_internal_value(request.query_params.get('date', ''))
+            at_time = request.query_params.get('time')
+            at_time = serializers.TimeField().to_internal_value(at_time) if at_time else None
+        except serializers.ValidationError as exc:
+            return Response({"detail": exc.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = doctors_available_at(self.filter_queryset(self.get_queryset()), day, at_time)
+        if not queryset.ordered:
+            queryset = queryset.order_by('id')
+        return Response(doctor_directory(queryset, request, self.get_fieldset()))
+
+    @action(detail=False, methods=['get'])
+    def open_slots(self, request):
+        """Free slots over ?start=YYYY-MM-DD&days=N for every doctor matching the filters"""
+        try:
+            start_date, days = parse_window(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        doctor_ids = list(self.filter_queryset(self.get_queryset()).order_by('id').values_list('id', flat=True))
+        slots = open_slots(doctor_ids, start_date, days)
+        return Response([{'doctor': doctor_id, 'dates': slots[doctor_id]} for doctor_id in doctor_ids])
+
+    @action(detail=True, methods=['get'], url_path='open_slots')
+    def doctor_open_slots(self, request, pk=None):
+        """Free slots for one doctor over ?start=YYYY-MM-DD&days=N (default 14, max 90)"""
+        try:
+            start_date, days = parse_window(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        doctor = self.get_object()
+        return Response({'doctor': doctor.id, 'dates': open_slots([doctor.id], start_date, days)[doctor.id]})
+
     @action(detail=True, methods=['get'])
     def time_slots(self, request, pk=None):
         doctor = self.get_object()
@@ -121,8 +311,9 @@ class DoctorViewSet(viewsets.ModelViewSet):
             return Response({"detail": "You do not have permission to view these appointments."},
                            status=status.HTTP_403_FORBIDDEN)
 
-        appointments = Appointment.objects.filter(doctor=doctor)
-        serializer = AppointmentSerializer(appointments, many=True)
+        model, serializer_class = appointment_source(request)
+        appointments = model.objects.filter(doctor=doctor).select_related(*APPOINTMENT_RELATED)
+        serializer = serializer_class(appointments, many=True)
         return Response(serializer.data)
 
 class PatientViewSet(viewsets.ModelViewSet):
@@ -165,6 +356,18 @@ class PatientViewSet(viewsets.ModelViewSet):
             return PatientListSerializer
         return PatientSerializer
 
+    @action(detail=False, methods=['get'])
+    def my_patients(self, request):
+        """Patients the current doctor has had an appointment with or written a record for"""
+        if request.user.user_type != 'doctor':
+            return Response({"detail": "Only doctors have patients."}, status=status.HTTP_403_FORBIDDEN)
+        patients = self.filter_queryset(
+            Patient.objects.filter(care_relationships__doctor__user=request.user)
+        ).select_related('user').order_by('id')
+        page = self.paginate_queryset(patients)
+        serializer = PatientListSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['get'])
     def appointments(self, request, pk=None):
         patient = self.get_object()
@@ -174,32 +377,51 @@ class PatientViewSet(viewsets.ModelViewSet):
             return Response({"detail": "You do not have permission to view these appointments."},
                            status=status.HTTP_403_FORBIDDEN)
 
-        appointments = Appointment.objects.filter(patient=patient)
-        serializer = AppointmentSerializer(appointments, many=True)
+        model, serializer_class = appointment_source(request)
+        appointments = model.objects.filter(patient=patient).select_related(*APPOINTMENT_RELATED)
+        serializer = serializer_class(appointments, many=True)
         return Response(serializer.data)
 
+    def can_view_history(self, user, patient):
+        """The patient, a doctor caring for them, or admin may see their medical history"""
+        return (user.is_staff or
+                (hasattr(user, 'patient_profile') and user.patient_profile == patient) or
+                (hasattr(user, 'doctor_profile') and has_care_relationship(user.doctor_profile.id, patient.id)))
+
     @action(detail=True, methods=['get'])
     def medical_records(self, request, pk=None):
         patient = self.get_object()
 
-        # Only allow the patient, their doctor, or admin to see medical records
-        if not (request.user.is_staff or
-                (hasattr(request.user, 'patient_profile') and request.user.patient_profile == patient) or
-                (hasattr(request.user, 'doctor_profile') and MedicalRecord.objects.filter(
-                    patient=patient, doctor=request.user.doctor_profile).exists())):
+        if not self.can_view_history(request.user, patient):
             return Response({"detail": "You do not have permission to view these medical records."},
                            status=status.HTTP_403_FORBIDDEN)
 
-        records = MedicalRecord.objects.filter(patient=patient)
+        records = MedicalRecord.objects.filter(patient=patient).select_related(*MEDICAL_RECORD_RELATED)
         serializer = MedicalRecordSerializer(records, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        The patient's appointments (live and archived) and medical records in
+        one stream, newest first, keyset paginated (?page_size= / ?cursor=).
+        """
+        patient = self.get_object()
+
+        if not self.can_view_history(request.user, patient):
+            return Response({"detail": "You do not have permission to view this patient's timeline."},
+                           status=status.HTTP_403_FORBIDDEN)
+
+        paginator = TimelinePagination()
+        entries = paginator.paginate_timeline(patient, request)
+        return paginator.get_paginated_response(entries)
+
 class AppointmentViewSet(viewsets.ModelViewSet):
     """ViewSet for the Appointment model"""
 
     queryset = Appointment.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [filters.SearchFilter, AppointmentFilter]
     search_fields = ['doctor__user__first_name', 'doctor__user__last_name',
                      'patient__user__first_name', 'patient__user__last_name']
 
@@ -210,96 +432,116 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return AppointmentUpdateSerializer
         return AppointmentSerializer
 
-    @action(detail=False, methods=['get'])
-    def my_appointments(self, request):
-        print(f"=== MY_APPOINTMENTS ENDPOINT CALLED ===")
-        print(f"User: {request.user}")
-        print(f"User authenticated: {request.user.is_authenticated}")
-        print(f"User type: {getattr(request.user, 'user_type', 'No user_type')}")
-        print(f"User email: {request.user.email}")
-
-        user = request.user
-
-        try:
-            if user.user_type == 'doctor':
-                # Try to get doctor profile
-                from hospital.models import Doctor
-                try:
-                    doctor_profile = user.doctor_profile
-                    print(f"Doctor profile found: ID={doctor_profile.id}, User={doctor_profile.user.email}")
-                except Doctor.DoesNotExist:
-                    print(f"Doctor profile not found for user {user.email}")
-                    return Response({"detail": "Doctor profile not found. Please contact admin."}, status=status.HTTP_404_NOT_FOUND)
-
-                # Filter appointments specifically for this doctor
-                appointments = Appointment.objects.filter(doctor=doctor_profile).order_by('-created_at')
-                print(f"Found {appointments.count()} appointments for doctor {user.email} (Doctor ID: {doctor_profile.id})")
-
-                # Debug: Show which appointments are being returned
-                for apt in appointments:
-                    print(f"  - Appointment ID: {apt.id}, Patient: {apt.patient.user.email}, Doctor: {apt.doctor.user.first_name} {apt.doctor.user.last_name}, Date: {apt.appointment_date}")
-
-            elif user.user_type == 'patient':
-                # Try to get patient profile
-                from hospital.models import Patient
-                try:
-                    patient_profile = user.patient_profile
-                    print(f"Patient profile found: ID={patient_profile.id}, User={patient_profile.user.email}")
-                except Patient.DoesNotExist:
-                    print(f"Patient profile not found for user {user.email}")
-                    return Response({"detail": "Patient profile not found. Please contact admin."}, status=status.HTTP_404_NOT_FOUND)
-
-                # Filter appointments specifically for this patient ONLY
-                appointments = Appointment.objects.filter(patient=patient_profile).order_by('-created_at')
-                print(f"Found {appointments.count()} appointments for patient {user.email} (Patient ID: {patient_profile.id})")
-
-                # Debug: Show which appointments are being returned
-                for apt in appointments:
-                    print(f"  - Appointment ID: {apt.id}, Patient: {apt.patient.user.email}, Doctor: {apt.doctor.user.first_name} {apt.doctor.user.last_name}, Date: {apt.appointment_date}")
-
-                # Additional verification: Ensure all returned appointments belong to this patient
-                for apt in appointments:
-                    if apt.patient.id != patient_profile.id:
-                        print(f"ERROR: Found appointment {apt.id} that doesn't belong to patient {patient_profile.id}")
-
-            elif user.user_type == 'admin' or user.is_staff:
-                # Admin users can see all appointments
-                appointments = Appointment.objects.all().order_by('-created_at')
-                print(f"Found {appointments.count()} appointments for admin")
+    def get_queryset(self):
+        # A fixed order keeps pages stable
+        queryset = scope_to_user(super().get_queryset(), self.request.user).order_by('-created_at', '-id')
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.select_related(*APPOINTMENT_RELATED)
+        return queryset
 
+    def _run_bulk(self, request, item_serializer, apply, done_status):
+        """Validate a JSON list item by item, apply the valid ones in bulk and report per item"""
+        items = request.data
+        if not isinstance(items, list):
+            raise serializers.ValidationError({'detail': 'Expected a list of items.'})
+        if len(items) > MAX_BULK_ITEMS:
+            raise serializers.ValidationError({'detail': f'At most {MAX_BULK_ITEMS} items per request.'})
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = item_serializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
             else:
-                print(f"Invalid user type: {getattr(user, 'user_type', 'None')}")
-                return Response({"detail": "Invalid user type. Please contact admin."}, status=status.HTTP_400_BAD_REQUEST)
-
-            serializer = AppointmentSerializer(appointments, many=True)
-            print(f"Returning {len(serializer.data)} appointments")
-
-            # Additional debug: Show serialized data for patients
-            if user.user_type == 'patient':
-                print("=== SERIALIZED APPOINTMENT DATA ===")
-                for apt_data in serializer.data:
-                    patient_email = apt_data.get('patient', {}).get('user', {}).get('email', 'Unknown')
-                    print(f"  - Appointment ID: {apt_data.get('id')}, Patient Email: {patient_email}")
-
-            return Response(serializer.data)
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+        if valid:
+            for (index, _), result in zip(valid, apply([data for _, data in valid])):
+                results[index] = {**result, 'index': index}
+
+        succeeded = sum(1 for result in results if result['status'] == done_status)
+        return Response({
+            done_status: succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'], permission_classes=[IsStaffOrAdminUser])
+    def bulk_create(self, request):
+        """Book a list of appointments in one transaction (staff only)"""
+        return self._run_bulk(request, AppointmentBulkCreateSerializer, bulk_book_appointments, 'created')
+
+    @action(detail=False, methods=['post'], permission_classes=[IsStaffOrAdminUser])
+    def bulk_status(self, request):
+        """Move a list of appointments to new status/payment_status values in one transaction (staff only)"""
+        return self._run_bulk(request, AppointmentStatusChangeSerializer, bulk_update_status, 'updated')
+
+    def user_appointments(self, user, model=Appointment):
+        """Appointments ``user`` may list: all for staff/admins, their own for doctors and patients"""
+        if user.is_staff or user.user_type == 'admin':
+            return model.objects.all()
+        if user.user_type == 'doctor':
+            try:
+                return model.objects.filter(doctor=user.doctor_profile)
+            except Doctor.DoesNotExist:
+                raise NotFound("Doctor profile not found. Please contact admin.")
+        if user.user_type == 'patient':
+            try:
+                return model.objects.filter(patient=user.patient_profile)
+            except Patient.DoesNotExist:
+                raise NotFound("Patient profile not found. Please contact admin.")
+        raise ParseError("Invalid user type. Please contact admin.")
 
-        except Exception as e:
-            print(f"Error in my_appointments: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return Response({"detail": "An error occurred while fetching appointments."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    @action(detail=False, methods=['get'])
+    def my_appointments(self, request):
+        """
+        The current user's appointments, newest first, keyset paginated
+        (?page_size= / ?cursor=) and filtered by AppointmentFilter.
+        ?archived=true lists their archived appointments instead.
+        """
+        model, serializer_class = appointment_source(request)
+        appointments = self.user_appointments(request.user, model)
+        appointments = self.filter_queryset(appointments).select_related(*APPOINTMENT_RELATED)
+        paginator = AppointmentKeysetPagination()
+        page = paginator.paginate_queryset(appointments, request, view=self)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
 
-    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync: the current user's appointments created, updated or
+        cancelled since ``?since=`` (a cursor from the previous response or an
+        ISO 8601 timestamp), oldest change first, with the cursor to poll with
+        next. ``?doctor=`` / ``?patient=`` narrow the feed to one calendar.
+        """
+        appointments = self.user_appointments(request.user)
+        for param in ('doctor', 'patient'):
+            value = request.query_params.get(param)
+            if value:
+                if not value.isdigit():
+                    raise serializers.ValidationError({param: ['A valid integer is required.']})
+                appointments = appointments.filter(**{f'{param}_id': int(value)})
+        feed = AppointmentChangeFeed()
+        page = feed.paginate_queryset(appointments.select_related(*APPOINTMENT_RELATED), request, view=self)
+        serializer = AppointmentSerializer(page, many=True, context=self.get_serializer_context())
+        return feed.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsStaffOrAdminUser])
     def all_appointments(self, request):
-        """Public endpoint to show all appointments for demonstration"""
-        print(f"=== ALL_APPOINTMENTS ENDPOINT CALLED ===")
-
-        # Get all appointments
-        appointments = Appointment.objects.all().order_by('-created_at')
-        print(f"Found {appointments.count()} total appointments")
-
-        serializer = AppointmentSerializer(appointments, many=True)
-        print(f"Returning {len(serializer.data)} appointments")
+        """
+        Every appointment, newest first (staff and admins only).
+
+        ``?stream=ndjson`` (or ``?stream=json``) streams the whole table in id
+        order with bounded memory instead of building one response; see
+        hospital/export.py for ``chunk_size`` and ``after``.
+        """
+        appointments = self.filter_queryset(Appointment.objects.select_related(*APPOINTMENT_RELATED))
+        if 'stream' in request.query_params:
+            return streaming_export(appointments, AppointmentSerializer, request,
+                                    context=self.get_serializer_context())
+
+        serializer = AppointmentSerializer(appointments.order_by('-created_at'), many=True)
         return Response(serializer.data)
 
 
@@ -312,7 +554,8 @@ class TimeSlotViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
 
     def get_queryset(self):
-        queryset = TimeSlot.objects.all()
+        # Patients see availability through /api/doctors/ (time_slots, open_slots)
+        queryset = scope_to_user(TimeSlot.objects.all(), self.request.user, patient=None)
         doctor_id = self.request.query_params.get('doctor', None)
         day = self.request.query_params.get('day', None)
 
@@ -329,7 +572,131 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
     queryset = MedicalRecord.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
 
+    def get_queryset(self):
+        # A fixed order keeps pages stable; search re-orders by rank
+        queryset = scope_to_user(super().get_queryset(), self.request.user).order_by('-created_at', '-id')
+        if self.action in ('list', 'retrieve', 'search'):
+            queryset = queryset.select_related(*MEDICAL_RECORD_RELATED)
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'create':
             return MedicalRecordCreateSerializer
+        if self.action == 'search':
+            return MedicalRecordSearchSerializer
         return MedicalRecordSerializer
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search (?q=) over the diagnosis, prescription and notes of
+        the records the user may see, best match first, each with a snippet
+        whose matches are wrapped in <mark>.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise serializers.ValidationError({'q': ['This field is required.']})
+        page = self.paginate_queryset(search_medical_records(self.get_queryset(), text))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class DirectoryCacheStatsView(APIView):
+    """Hit/miss counters for the doctor and specialty directory cache (admin only)"""
+
+    permission_classes = [IsStaffOrAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+    def delete(self, request):
+        reset_cache_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class DashboardStatsView(APIView):
+    """Aggregated figures for the admin dashboard (admin only); ?months= sets the trend length"""
+
+    permission_classes = [IsStaffOrAdminUser]
+
+    def get(self, request):
+        try:
+            months = int(request.query_params.get('months', DEFAULT_TREND_MONTHS))
+        except ValueError:
+            raise serializers.ValidationError({'months': ['A valid integer is required.']})
+        if not 1 <= months <= MAX_TREND_MONTHS:
+            raise serializers.ValidationError({'months': [f'Must be between 1 and {MAX_TREND_MONTHS}.']})
+        return Response(dashboard_stats(months))
+
+class TableExportView(APIView):
+    """
+    Stream a whole table (appointments, archived-appointments or
+    medical-records) as CSV or NDJSON for compliance and analytics extracts
+    (admin only). ?output=csv|ndjson, ?gzip=true, ?start= / ?end= (YYYY-MM-DD)
+    and ?doctor= narrow or shape the extract.
+    """
+
+    permission_classes = [IsStaffOrAdminUser]
+
+    def get(self, request, table):
+        if table not in EXTRACT_TABLES:
+            raise NotFound(f'Unknown table. Expected one of: {", ".join(EXTRACT_TABLES)}')
+        params = parse_extract_params(request.query_params)
+        content_type = 'application/gzip' if params['compress'] else EXTRACT_FORMATS[params['fmt']]
+        response = streaming_response(table_extract(table, **params), request, content_type)
+        filename = extract_filename(table, params['fmt'], params['compress'], params['start'], params['end'])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class EventStreamTicketView(APIView):
+    """
+    Issue a short-lived, single-use ticket for ``GET
+    /api/appointments/events/?token=<ticket>``, so the access token never
+    appears in a URL.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': STREAM_TICKET_SECONDS})
+
+def _event_stream_user(request):
+    """
+    Authenticate a stream ticket from ?token= (EventSource cannot send
+    headers) or a JWT in the Authorization header. Access tokens are not
+    accepted in the URL.
+    """
+    ticket = request.GET.get('token')
+    if ticket:
+        user_id = redeem_stream_ticket(ticket)
+        if user_id is None:
+            return None
+        return User.objects.filter(id=user_id, is_active=True).first()
+    authenticator = JWTAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+@require_GET
+async def appointment_events(request):
+    """
+    Server-Sent Events stream of appointment created/updated events for the
+    current user (all appointments for staff). Needs the ASGI application; see
+    hospital/events.py.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The event stream is only served by the ASGI application.'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    user = await sync_to_async(_event_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+    channels = [user_channel(user.id)]
+    if user.is_staff or user.user_type == 'admin':
+        channels.append(STAFF_CHANNEL)
+    response = StreamingHttpResponse(event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -122,6 +122,58 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Use Redis when available so cached responses and their invalidation are
+# shared by all gunicorn workers; fall back to a per-process memory cache.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Broker relaying appointment push events between workers (see hospital/events.py);
+# the in-process broker only reaches streams served by the same process
+APPOINTMENT_EVENTS_BROKER = os.getenv(
+    'APPOINTMENT_EVENTS_BROKER',
+    'hospital.events.RedisBroker' if REDIS_URL else 'hospital.events.InProcessBroker',
+)
+
+# Seconds a cached doctor/specialty directory response may live
+DIRECTORY_CACHE_TIMEOUT = int(os.getenv('DIRECTORY_CACHE_TIMEOUT', '300'))
+
+
+# Length of one bookable appointment slot, in minutes
+APPOINTMENT_SLOT_MINUTES = int(os.getenv('APPOINTMENT_SLOT_MINUTES', '30'))
+
+# Appointment reminders (hospital/reminders.py): how far ahead to remind, and
+# where to deliver them (ConsoleSink, FileSink or EmailSink)
+APPOINTMENT_REMINDER_HOURS = int(os.getenv('APPOINTMENT_REMINDER_HOURS', '24'))
+APPOINTMENT_REMINDER_SINK = os.getenv('APPOINTMENT_REMINDER_SINK', 'hospital.reminders.ConsoleSink')
+APPOINTMENT_REMINDER_FILE = os.getenv('APPOINTMENT_REMINDER_FILE', str(BASE_DIR / 'reminders.ndjson'))
+
+# Outgoing mail (EmailSink). For a local SMTP stub run
+# `python -m aiosmtpd -n -l localhost:1025` and set EMAIL_PORT=1025
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'NLife <no-reply@nlife.local>')
+
+# Finished appointments dated more than this many days ago are moved to the
+# archive table by ``manage.py archive_appointments``
+APPOINTMENT_ARCHIVE_AFTER_DAYS = int(os.getenv('APPOINTMENT_ARCHIVE_AFTER_DAYS', '365'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -93,7 +93,8 @@ echo "🎉 NLife Backend startup completed successfully!"
 
 # Start the server
 echo "🌐 Starting Gunicorn server..."
-exec gunicorn nlife_project.wsgi:application \
+exec gunicorn nlife_project.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
     --bind 0.0.0.0:$PORT \
     --workers 3 \
     --timeout 120 \
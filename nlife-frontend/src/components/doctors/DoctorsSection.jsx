@@ -138,10 +138,10 @@ const DoctorsSection = () => {
   const fetchTopDoctors = async () => {
     try {
       setLoading(true);
-      const response = await axios.get('https://nlife-backend-debug.onrender.com/api/doctors/');
+      const response = await axios.get('https://nlife-backend-debug.onrender.com/api/home/');
 
-      // Get the first 4 doctors for the homepage
-      const doctorsData = response.data.results || response.data;
+      // Show the first 4 featured doctors from the cached home payload
+      const doctorsData = response.data.featured_doctors;
       const topDoctors = Array.isArray(doctorsData) ? doctorsData.slice(0, 4) : [];
 
       setDoctors(topDoctors);
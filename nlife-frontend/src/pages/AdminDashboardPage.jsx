@@ -53,232 +53,38 @@ const AdminDashboardPage = () => {
     try {
       const authAxios = getAuthAxios();
 
-      // Fetch real data for key metrics
-      console.log('Fetching dashboard data...');
-
-      // Initialize data object with default values
-      let dashboardData = {
-        totalDoctors: 0,
-        totalPatients: 0,
-        totalAppointments: 0,
-        totalRevenue: 0,
-        recentAppointments: [],
-        appointmentsByStatus: [
-          { type: 'Confirmed', value: 0 },
-          { type: 'Completed', value: 0 },
-          { type: 'Pending', value: 0 },
-          { type: 'Cancelled', value: 0 }
-        ],
-        appointmentsTrend: [
-          { month: 'Jan', appointments: 0 },
-          { month: 'Feb', appointments: 0 },
-          { month: 'Mar', appointments: 0 },
-          { month: 'Apr', appointments: 0 },
-          { month: 'May', appointments: 0 },
-          { month: 'Jun', appointments: 0 }
-        ],
-        revenueBySpecialty: []
+      // One request: every figure is aggregated server-side
+      const { data } = await authAxios.get('dashboard-stats/');
+      const capitalize = (value) => value.charAt(0).toUpperCase() + value.slice(1);
+
+      const dashboardData = {
+        totalDoctors: data.totals.doctors,
+        totalPatients: data.totals.patients,
+        totalAppointments: data.totals.appointments,
+        totalRevenue: data.totals.revenue,
+        recentAppointments: data.recent_appointments.map(appointment => ({
+          id: appointment.id,
+          doctorName: appointment.doctor_name ? `Dr. ${appointment.doctor_name}` : 'Unknown Doctor',
+          patientName: appointment.patient_name || 'Unknown Patient',
+          date: appointment.date || 'Not specified',
+          time: appointment.time || 'Not specified',
+          status: appointment.status || 'pending',
+          specialty: appointment.specialty || 'Unknown Specialty'
+        })),
+        appointmentsByStatus: ['confirmed', 'completed', 'pending', 'cancelled'].map(status => ({
+          type: capitalize(status),
+          value: data.appointments_by_status[status] || 0
+        })),
+        appointmentsTrend: data.monthly_trend.map(item => ({
+          month: new Date(`${item.month}-01T00:00:00`).toLocaleString('default', { month: 'short' }),
+          appointments: item.appointments
+        })),
+        revenueBySpecialty: data.revenue_by_specialty.map(item => ({
+          specialty: item.specialty,
+          revenue: item.revenue
+        }))
       };
 
-      // Fetch total doctors
-      try {
-        const doctorsResponse = await authAxios.get('doctors/');
-        console.log('Doctors response:', doctorsResponse);
-
-        if (Array.isArray(doctorsResponse.data)) {
-          dashboardData.totalDoctors = doctorsResponse.data.length;
-        } else if (doctorsResponse.data && typeof doctorsResponse.data === 'object') {
-          // Check if results property exists (common in Django REST Framework)
-          if (Array.isArray(doctorsResponse.data.results)) {
-            dashboardData.totalDoctors = doctorsResponse.data.results.length;
-          } else {
-            // If it's an object but not in the expected format, count the entries
-            const doctorsArray = Object.values(doctorsResponse.data).filter(item =>
-              item && typeof item === 'object'
-            );
-            dashboardData.totalDoctors = doctorsArray.length;
-          }
-        }
-
-        console.log('Total doctors:', dashboardData.totalDoctors);
-      } catch (error) {
-        console.error('Error fetching doctors:', error);
-      }
-
-      // Fetch total patients
-      try {
-        const patientsResponse = await authAxios.get('patients/');
-        console.log('Patients response:', patientsResponse);
-
-        if (Array.isArray(patientsResponse.data)) {
-          dashboardData.totalPatients = patientsResponse.data.length;
-        } else if (patientsResponse.data && typeof patientsResponse.data === 'object') {
-          // Check if results property exists
-          if (Array.isArray(patientsResponse.data.results)) {
-            dashboardData.totalPatients = patientsResponse.data.results.length;
-          } else {
-            // If it's an object but not in the expected format, count the entries
-            const patientsArray = Object.values(patientsResponse.data).filter(item =>
-              item && typeof item === 'object'
-            );
-            dashboardData.totalPatients = patientsArray.length;
-          }
-        }
-
-        console.log('Total patients:', dashboardData.totalPatients);
-      } catch (error) {
-        console.error('Error fetching patients:', error);
-      }
-
-      // Fetch total appointments and calculate revenue
-      try {
-        const appointmentsResponse = await authAxios.get('appointments/');
-        console.log('Appointments response:', appointmentsResponse);
-
-        let appointments = [];
-
-        if (Array.isArray(appointmentsResponse.data)) {
-          appointments = appointmentsResponse.data;
-        } else if (appointmentsResponse.data && typeof appointmentsResponse.data === 'object') {
-          // Check if results property exists
-          if (Array.isArray(appointmentsResponse.data.results)) {
-            appointments = appointmentsResponse.data.results;
-          } else {
-            // If it's an object but not in the expected format, convert to array
-            appointments = Object.values(appointmentsResponse.data).filter(item =>
-              item && typeof item === 'object'
-            );
-          }
-        }
-
-        dashboardData.totalAppointments = appointments.length;
-        console.log('Total appointments:', dashboardData.totalAppointments);
-
-        // Calculate total revenue (assuming each appointment has a payment_amount field)
-        // If not, we'll use a default value based on the number of appointments
-        let totalRevenue = 0;
-
-        appointments.forEach(appointment => {
-          if (appointment.payment_amount) {
-            totalRevenue += parseFloat(appointment.payment_amount);
-          } else if (appointment.doctor && appointment.doctor.consultation_fee) {
-            totalRevenue += parseFloat(appointment.doctor.consultation_fee);
-          } else {
-            // Default value if no payment information is available
-            totalRevenue += 1000; // Default consultation fee
-          }
-        });
-
-        dashboardData.totalRevenue = totalRevenue;
-        console.log('Total revenue:', dashboardData.totalRevenue);
-
-        // Get recent appointments (last 5)
-        dashboardData.recentAppointments = appointments.slice(0, 5).map(appointment => {
-          // Extract doctor name
-          let doctorName = 'Unknown Doctor';
-          if (appointment.doctor) {
-            if (typeof appointment.doctor === 'object') {
-              doctorName = `Dr. ${appointment.doctor.first_name || ''} ${appointment.doctor.last_name || ''}`.trim();
-              if (doctorName === 'Dr. ') doctorName = 'Unknown Doctor';
-            } else if (typeof appointment.doctor_name === 'string') {
-              doctorName = appointment.doctor_name;
-            }
-          }
-
-          // Extract patient name
-          let patientName = 'Unknown Patient';
-          if (appointment.patient) {
-            if (typeof appointment.patient === 'object') {
-              patientName = `${appointment.patient.first_name || ''} ${appointment.patient.last_name || ''}`.trim();
-              if (patientName === '') patientName = 'Unknown Patient';
-            } else if (typeof appointment.patient_name === 'string') {
-              patientName = appointment.patient_name;
-            }
-          }
-
-          // Extract specialty
-          let specialty = 'Unknown Specialty';
-          if (appointment.doctor && appointment.doctor.specialty) {
-            if (typeof appointment.doctor.specialty === 'object') {
-              specialty = appointment.doctor.specialty.name || 'Unknown Specialty';
-            } else if (typeof appointment.doctor.specialty === 'string') {
-              specialty = appointment.doctor.specialty;
-            }
-          }
-
-          return {
-            id: appointment.id,
-            doctorName: doctorName,
-            patientName: patientName,
-            date: appointment.date || 'Not specified',
-            time: appointment.time || 'Not specified',
-            status: appointment.status || 'pending',
-            specialty: specialty
-          };
-        });
-
-        // Count appointments by status
-        const statusCounts = {
-          confirmed: 0,
-          completed: 0,
-          pending: 0,
-          cancelled: 0
-        };
-
-        appointments.forEach(appointment => {
-          const status = appointment.status ? appointment.status.toLowerCase() : 'pending';
-          if (statusCounts.hasOwnProperty(status)) {
-            statusCounts[status]++;
-          }
-        });
-
-        dashboardData.appointmentsByStatus = [
-          { type: 'Confirmed', value: statusCounts.confirmed },
-          { type: 'Completed', value: statusCounts.completed },
-          { type: 'Pending', value: statusCounts.pending },
-          { type: 'Cancelled', value: statusCounts.cancelled }
-        ];
-
-      } catch (error) {
-        console.error('Error fetching appointments:', error);
-      }
-
-      // If we have no real data, use some mock data for the charts
-      if (dashboardData.totalDoctors === 0) dashboardData.totalDoctors = 12;
-      if (dashboardData.totalPatients === 0) dashboardData.totalPatients = 145;
-      if (dashboardData.totalAppointments === 0) dashboardData.totalAppointments = 278;
-      if (dashboardData.totalRevenue === 0) dashboardData.totalRevenue = 156000;
-
-      // If we have no appointments by status data, use mock data
-      const hasAppointmentStatusData = dashboardData.appointmentsByStatus.some(item => item.value > 0);
-      if (!hasAppointmentStatusData) {
-        dashboardData.appointmentsByStatus = [
-          { type: 'Confirmed', value: 45 },
-          { type: 'Completed', value: 120 },
-          { type: 'Pending', value: 25 },
-          { type: 'Cancelled', value: 18 }
-        ];
-      }
-
-      // Use mock data for appointment trends (this would typically come from a dedicated API endpoint)
-      dashboardData.appointmentsTrend = [
-        { month: 'Jan', appointments: 18 },
-        { month: 'Feb', appointments: 22 },
-        { month: 'Mar', appointments: 30 },
-        { month: 'Apr', appointments: 35 },
-        { month: 'May', appointments: 42 },
-        { month: 'Jun', appointments: 38 }
-      ];
-
-      // Use mock data for revenue by specialty
-      dashboardData.revenueBySpecialty = [
-        { specialty: 'Cardiology', revenue: 45000 },
-        { specialty: 'Dermatology', revenue: 32000 },
-        { specialty: 'Neurology', revenue: 28000 },
-        { specialty: 'Orthopedics', revenue: 35000 },
-        { specialty: 'Pediatrics', revenue: 16000 }
-      ];
-
       console.log('Dashboard data:', dashboardData);
       setStats(dashboardData);
       setError('');
@@ -291,7 +97,8 @@ const AdminDashboardPage = () => {
   };
 
   // Calculate total appointments for percentage
-  const totalAppointmentsStatus = stats.appointmentsByStatus.reduce((sum, item) => sum + item.value, 0);
+  const totalAppointmentsStatus = stats.appointmentsByStatus.reduce((sum, item) => sum + item.value, 0) || 1;
+  const maxMonthlyAppointments = Math.max(1, ...stats.appointmentsTrend.map(item => item.appointments));
 
   // Recent appointments table columns
   const columns = [
@@ -460,7 +267,7 @@ const AdminDashboardPage = () => {
                     <Text>{item.appointments} appointments</Text>
                   </div>
                   <Progress
-                    percent={Math.round((item.appointments / 50) * 100)}
+                    percent={Math.round((item.appointments / maxMonthlyAppointments) * 100)}
                     showInfo={false}
                     strokeColor="#6366F1"
                   />
@@ -332,7 +332,13 @@ const AppointmentPage = () => {
 
   const fetchRelatedDoctors = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/doctors/');
+      // Only request the fields rendered in the related doctors list, one small page
+      const response = await axios.get('http://localhost:8000/api/doctors/', {
+        params: {
+          fields: 'id,user.first_name,user.last_name,user.profile_picture,specialty.name',
+          page_size: 6
+        }
+      });
       console.log('Related doctors data:', response.data);
 
       // Process the data
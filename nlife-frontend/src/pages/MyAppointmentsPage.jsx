@@ -3,6 +3,7 @@ import { useLocation, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { getAuthAxios } from '../services/userService';
 import { processImageUrl } from '../utils/imageUtils';
+import { API_URL } from '../config/api';
 
 const MyAppointmentsPage = () => {
   const location = useLocation();
@@ -30,6 +31,88 @@ const MyAppointmentsPage = () => {
     fetchAppointments();
   }, []);
 
+  // Live updates: the server pushes appointment changes over Server-Sent Events
+  useEffect(() => {
+    const token = localStorage.getItem('access_token') || localStorage.getItem('token');
+    if (!token || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+
+    let source = null;
+    let retryTimer = null;
+    let connected = false;
+    let stopped = false;
+
+    const handleAppointment = (event) => {
+      const { type, appointment } = JSON.parse(event.data);
+      if (type === 'created') {
+        // New bookings need the doctor and patient details, so reload the list
+        fetchAppointments();
+        return;
+      }
+      setAppointments(current => current.map(item =>
+        item.id === appointment.id
+          ? {
+              ...item,
+              date: appointment.appointment_date,
+              time: appointment.appointment_time,
+              status: appointment.status,
+              paymentStatus: appointment.payment_status,
+              isPaid: appointment.payment_status === 'paid'
+            }
+          : item
+      ));
+    };
+
+    // The stream URL carries a single-use ticket rather than the access token,
+    // so every connection (including reconnects) asks for a fresh one
+    const connect = async () => {
+      let ticket;
+      try {
+        const response = await getAuthAxios().post('appointments/events/ticket/');
+        ticket = response.data.ticket;
+      } catch (err) {
+        // Signed out or token expired: stop rather than retry forever
+        if (!stopped && err.response?.status !== 401) {
+          retryTimer = setTimeout(connect, 3000);
+        }
+        return;
+      }
+      if (stopped) {
+        return;
+      }
+
+      source = new EventSource(`${API_URL}/appointments/events/?token=${encodeURIComponent(ticket)}`);
+      source.onopen = () => {
+        // Changes made while disconnected were not pushed
+        if (connected) {
+          fetchAppointments();
+        }
+        connected = true;
+      };
+      source.addEventListener('appointment', handleAppointment);
+      // Sent when updates were dropped for this connection
+      source.addEventListener('resync', () => fetchAppointments());
+      source.onerror = () => {
+        // EventSource would retry with the spent ticket; reconnect with a new one
+        source.close();
+        if (!stopped) {
+          retryTimer = setTimeout(connect, 3000);
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (source) {
+        source.close();
+      }
+    };
+  }, []);
+
   const fetchAppointments = async () => {
     setLoading(true);
     try {
@@ -58,12 +141,15 @@ const MyAppointmentsPage = () => {
 
       // Use authenticated axios call to get user's appointments
       const authAxios = getAuthAxios();
-      const response = await authAxios.get('appointments/my_appointments/');
-      console.log('User appointments response:', response.data);
-      console.log('Number of appointments returned:', response.data.length);
-
-      // Process the appointments data - the backend returns appointments with nested doctor and patient data
-      const appointmentsData = Array.isArray(response.data) ? response.data : [];
+      // The endpoint is paginated: follow the `next` cursor links until every page is loaded
+      const appointmentsData = [];
+      let nextUrl = 'appointments/my_appointments/?page_size=100';
+      while (nextUrl) {
+        const response = await authAxios.get(nextUrl);
+        appointmentsData.push(...(response.data.results || []));
+        nextUrl = response.data.next;
+      }
+      console.log('Number of appointments returned:', appointmentsData.length);
       console.log('Processing appointments:', appointmentsData);
 
       // Get current user info for verification